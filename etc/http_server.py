@@ -1,7 +1,11 @@
 try:
-    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from BaseHTTPServer import HTTPServer as BaseHTTPServer
+    from SocketServer import ThreadingMixIn
 except ImportError:
-    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from http.server import BaseHTTPRequestHandler
+    from http.server import HTTPServer as BaseHTTPServer
+    from socketserver import ThreadingMixIn
 
 try:
     from urlparse import parse_qs
@@ -11,22 +15,42 @@ except ImportError:
 import json
 from multiprocessing import Process
 from time import sleep
+import zlib
 
 QUIET = False
 
 
+class HTTPServer(ThreadingMixIn, BaseHTTPServer):
+    """ Kept alive connections hold a handler open, so serve each in a thread
+    """
+    daemon_threads = True
+
+
 def spawn(port):
     server = HTTPServer(("", port), TestHandler)
     server.serve_forever()
 
 
 class TestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = {}  # requests already failed per `/flaky` key
+    delayed = set()  # `once` keys of `/slow` requests that already waited
+
     def handle_one_request(self):
         self.raw_requestline = self.rfile.readline(65537)
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
         self.parse_request()
 
-        params = self.rfile.read(
-            int(self.headers.get('Content-Length', '0'))).decode("UTF-8")
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            params = self.read_chunked()
+        else:
+            params = self.rfile.read(
+                int(self.headers.get('Content-Length', '0')))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            params = zlib.decompress(params, 16 + zlib.MAX_WBITS)
+        params = params.decode("UTF-8")
         params = parse_qs(params)
         for key in params:
             if hasattr(params[key], '__iter__') and len(params[key]) == 1:
@@ -39,7 +63,72 @@ class TestHandler(BaseHTTPRequestHandler):
             "headers": dict(self.headers.items())
         }
 
-        self.send_response(200)
+        if self.path.startswith("/slow"):
+            # answers after `delay` seconds (only the first time for a `once`
+            # key), or redirects to itself `hops` times
+            query = parse_qs(self.path.partition("?")[2])
+            once = query.get("once", [None])[0]
+            if once not in TestHandler.delayed:
+                if once is not None:
+                    TestHandler.delayed.add(once)
+                sleep(float(query.get("delay", ["0"])[0]))
+            hops = int(query.get("hops", ["0"])[0])
+            if hops:
+                self.send_response(302)
+                self.send_header('Location', '/slow?delay={}&hops={}'.format(
+                    query.get("delay", ["0"])[0], hops - 1))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        if self.path.startswith("/flaky"):
+            # fails with a 503 the first `fails` times for each `key`
+            query = parse_qs(self.path.partition("?")[2])
+            key = query.get("key", [""])[0]
+            failed = TestHandler.failures.get(key, 0)
+            if failed < int(query.get("fails", ["1"])[0]):
+                TestHandler.failures[key] = failed + 1
+                self.send_response(503)
+                self.send_header('Retry-After', '0')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        if self.path.startswith("/pages"):
+            # paginated listing, 3 items per page linked through `Link`
+            query = parse_qs(self.path.partition("?")[2])
+            page = int(query.get("page", ["1"])[0])
+            last = int(query.get("last", ["3"])[0])
+            data = [page * 10 + i for i in range(3)]
+            links = ['</pages?page={}&last={}>; rel="last"'.format(last, last)]
+            if page < last:
+                links.append('</pages?page={}&last={}>; rel="next"'.format(
+                    page + 1, last))
+
+            self.send_response(200)
+            self.send_header('Link', ", ".join(links))
+        elif self.path.startswith("/protected") and \
+                self.headers.get('Authorization') != "Bearer valid":
+            self.send_response(401)
+            self.send_header('WWW-Authenticate', 'Bearer')
+        elif self.path.startswith("/quota"):
+            # reports the quota as spent until the window resets in `reset`
+            query = parse_qs(self.path.partition("?")[2])
+            self.send_response(200)
+            self.send_header('X-RateLimit-Remaining', '0')
+            self.send_header('X-RateLimit-Reset',
+                             query.get("reset", ["1"])[0])
+        elif self.path.startswith("/cached"):
+            etag = '"{}"'.format(self.path)
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+        else:
+            self.send_response(200)
         if self.headers.get('Accepts', 'application/json') == \
                 'application/json':
             self.send_header('Content-type', 'application/json')
@@ -49,15 +138,34 @@ class TestHandler(BaseHTTPRequestHandler):
             self.send_header('Content-type',
                              'application/x-www-form-urlencoded')
             data = urlencode(data)
+        try:
+            data = bytes(data, 'UTF-8')
+        except TypeError:
+            pass
+        if self.path.startswith("/gzip") and \
+                'gzip' in self.headers.get('Accept-Encoding', ''):
+            compressor = zlib.compressobj(6, zlib.DEFLATED,
+                                          16 + zlib.MAX_WBITS)
+            data = compressor.compress(data) + compressor.flush()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(data)))
         self.end_headers()
         try:
             self.wfile.write(data)
-        except TypeError:
-            self.wfile.write(bytes(data, 'UTF-8'))
         finally:
             self.wfile.flush()
         return
 
+    def read_chunked(self):
+        body = b""
+        size = int(self.rfile.readline().strip(), 16)
+        while size:
+            body += self.rfile.read(size)
+            self.rfile.readline()
+            size = int(self.rfile.readline().strip(), 16)
+        self.rfile.readline()
+        return body
+
     def log_message(self, *args, **kwargs):
         if not QUIET:
             return BaseHTTPRequestHandler.log_message(self, *args, **kwargs)
@@ -2,7 +2,7 @@ from restler import Restler
 
 
 def build(token, url="https://api.github.com/"):
-    handler = Restler(url)
+    handler = Restler(url, rate_limit=True)  # tuned by the quota headers
     handler._route._default_headers.append(("Authorization",
                                             "token " + token))
 
@@ -2,7 +2,8 @@ from restler import Restler
 
 
 def build(token, key):
-    handler = Restler("https://api.trello.com/1/")
+    # 100 requests per 10 seconds for each token
+    handler = Restler("https://api.trello.com/1/", rate_limit=10)
     handler._route._default_params["token"] = token
     handler._route._default_params["key"] = key
 
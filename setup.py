@@ -29,7 +29,8 @@ tags = [
 
 packages = [
     "restler",
-    "restler.handlers"
+    "restler.handlers",
+    "restler.url"
 ]
 
 setup(
@@ -46,7 +47,8 @@ setup(
     packages=packages,
     package_dir={
         'restler': 'src/restler',
-        'restler.handlers': 'src/restler/handlers'
+        'restler.handlers': 'src/restler/handlers',
+        'restler.url': 'src/restler/url'
     },
     package_data={'': ["LICENSE"]},
     include_package_data=True,
@@ -1,9 +1,16 @@
 __version__ = '0.2.2'
 
+import sys
+
 from restler.core import Restler
 from restler.route import Route
 from restler.response import Response
-from restler.errors import InvalidURLError, RequestError, ServerError
+from restler.errors import InvalidURLError, RequestError, ServerError, \
+    RequestTimeoutError
+from restler.timeout import Timeout, Deadline
+from restler.retry import Retry, RetryBudget
+from restler.hedge import Hedge
+from restler.limiter import RateLimiter
 
 
 # Various custom handlers
@@ -13,4 +20,9 @@ from restler.handlers import date_handler
 from restler.handlers import url_handler
 
 __all__ = ["Restler", "Route", "Response", "InvalidURLError", "RequestError",
-           "ServerError"]
+           "ServerError", "RequestTimeoutError", "Timeout", "Deadline",
+           "Retry", "RetryBudget", "Hedge", "RateLimiter"]
+
+if sys.version_info >= (3, 7):  # asyncio client needs python 3.7+
+    from restler.aio import AsyncRestler
+    __all__.append("AsyncRestler")
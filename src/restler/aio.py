@@ -0,0 +1,488 @@
+""" asyncio flavour of the client, ``AsyncRestler`` keeps the attribute
+chaining API of :class:`Restler <Restler>` but calling a route returns an
+awaitable that is served by a non-blocking HTTP/1.1 transport built on
+``asyncio`` streams.
+
+Usage::
+
+    >> api = AsyncRestler('http://api.github.com/')
+    >> user = await api.users.jdost()
+    <Response: http://api.github.com/users/jdost>
+
+"""
+import asyncio
+import base64
+from functools import partial
+import socket
+import ssl
+import urllib.request as urllib2
+from urllib.parse import urljoin, urlsplit
+
+from restler.body import chunks, is_stream
+from restler.core import Restler
+from restler.hedge import clone
+from restler.errors import ERRORS, InvalidURLError, RequestTimeoutError
+from restler.route import Route
+from restler.timeout import limits
+from restler.url import ConnectionPool
+from restler.utils import BufferedResponse, parse_headers
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# failures to get any response, retried by the retry policy
+TRANSPORT_ERRORS = (OSError, asyncio.IncompleteReadError,
+                    asyncio.TimeoutError)
+
+
+def _unsupported(name, instead):
+    def method(self, *args, **kwargs):
+        raise TypeError("AsyncRestler does not support {}, {}".format(
+            name, instead))
+    method.__name__ = name
+    return method
+
+
+class AsyncRoute(Route):
+    """ :class:`Route <Route>` whose calls return a coroutine resolving to the
+    :class:`Response <Response>` (or the error tuple when
+    ``EXCEPTION_THROWING`` is off) instead of blocking on the request.
+
+    ``stream``, ``paginate`` and ``map`` would block on the synchronous opener
+    and raise a ``TypeError``, batches are awaited with ``asyncio.gather``.
+    """
+    __slots__ = ()
+
+    stream = _unsupported("stream", "await the route instead")
+    paginate = _unsupported("paginate", "follow the Link header instead")
+    map = _unsupported("map", "use asyncio.gather instead")
+
+    async def __submit__(self, request):
+        if self.__base__.__test__:
+            return request
+
+        try:
+            response = await self.__open(request)
+        except (asyncio.TimeoutError, socket.timeout):
+            if self.__base__.EXCEPTION_THROWING:
+                raise RequestTimeoutError(str(self))
+            else:
+                return (ERRORS["Timeout"], RequestTimeoutError(str(self)))
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            if self.__base__.EXCEPTION_THROWING:
+                raise InvalidURLError(str(self))
+            else:
+                return (ERRORS["InvalidURL"], None)
+
+        return self.__response__(response)
+
+    async def __open(self, request):
+        send = self.__base__.__transport__.open
+        limiter = self.__limiter__()
+        if limiter:
+            send = partial(self.__limited, limiter, send)
+        hedge = self.__policy__("hedge")
+        if hedge:
+            send = partial(self.__hedged, hedge, send)
+
+        retry = self.__policy__("retry")
+        if not retry:
+            return await send(request)
+
+        retry.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = await send(request)
+            except TRANSPORT_ERRORS:
+                delay = retry.plan(request, attempt)
+                if delay is None:
+                    raise
+            else:
+                delay = retry.plan(request, attempt, response)
+                if delay is None:
+                    return response
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @staticmethod
+    async def __limited(limiter, send, request):
+        await asyncio.sleep(limiter.reserve())
+        response = await send(request)
+        limiter.observe(response.info())
+        return response
+
+    async def __hedged(self, hedge, open_request, request):
+        if not hedge.eligible(request):
+            return await open_request(request)
+
+        key = hedge.key(str(self))
+        hedge.count(key, "requests")
+        delay = hedge.delay(key)
+
+        async def timed(request):
+            started = asyncio.get_event_loop().time()
+            response = await open_request(request)
+            hedge.record(key, asyncio.get_event_loop().time() - started)
+            return response
+
+        tasks = [asyncio.ensure_future(timed(request))]
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            hedge.count(key, "hedged")
+            tasks.append(asyncio.ensure_future(timed(clone(request))))
+
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if task is tasks[-1] and len(tasks) > 1:
+                        hedge.count(key, "hedge_wins")
+                    return task.result()
+        raise error
+
+
+class AsyncRestler(Restler):
+    """ :class:`Restler <Restler>` for use inside an ``asyncio`` event loop,
+    a single loop can keep any number of requests in flight.  Takes the same
+    arguments as ``Restler``, ``keep_alive`` defaults to on and sizes the idle
+    connection pool per host.  The response ``cache``, ``coalesce`` and
+    ``concurrency_limit`` are not supported and raise a ``TypeError``, as does
+    ``gather`` (use ``asyncio.gather`` on the calls instead).
+
+    Should be closed (or used as an ``async with`` block) to release the
+    pooled connections.
+    """
+    _route_class = AsyncRoute
+
+    def __init__(self, base, cookies=False, follow_redirects=True,
+                 http_auth=False, keep_alive=True, cache=False,
+                 coalesce=False, preemptive_auth=False, token=False,
+                 compression=True, compress_requests=False, timeout=None,
+                 retry=False, hedge=False, rate_limit=False,
+                 concurrency_limit=False, max_routes=None):
+        unsupported = [name for name, option in (
+            ("cache", cache), ("coalesce", coalesce),
+            ("concurrency_limit", concurrency_limit)) if option]
+        if unsupported:
+            raise TypeError("AsyncRestler does not support {}".format(
+                ", ".join(unsupported)))
+        Restler.__init__(self, base, cookies=cookies,
+                         follow_redirects=follow_redirects,
+                         http_auth=http_auth, preemptive_auth=preemptive_auth,
+                         token=token, compression=compression,
+                         compress_requests=compress_requests, timeout=timeout,
+                         retry=retry, hedge=hedge, rate_limit=rate_limit,
+                         max_routes=max_routes)
+
+        size = ConnectionPool.DEFAULT_SIZE if keep_alive is True \
+            else int(keep_alive)
+        self.__transport__ = AsyncTransport(
+            self.__opener__.addheaders, cookies=self.__cookies__,
+            auth=self.__auth__, follow_redirects=follow_redirects, size=size,
+            token=self.__token__)
+
+    gather = _unsupported("gather", "use asyncio.gather instead")
+
+    async def close(self):
+        await self.__transport__.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class TimedReader(object):
+    """ Wraps a stream reader so each read of the response waits at most
+    ``timeout`` seconds, as the read timeout of a socket does, rather than the
+    whole response being bounded by it
+    """
+    __slots__ = ("reader", "timeout")
+
+    def __init__(self, reader, timeout):
+        self.reader = reader
+        self.timeout = timeout
+
+    def readuntil(self, separator):
+        return asyncio.wait_for(self.reader.readuntil(separator),
+                                self.timeout)
+
+    def readexactly(self, size):
+        return asyncio.wait_for(self.reader.readexactly(size), self.timeout)
+
+    def read(self, size=-1):
+        return asyncio.wait_for(self.reader.read(size), self.timeout)
+
+
+class AsyncTransport(object):
+    """ Minimal HTTP/1.1 client over ``asyncio`` streams.  Sends the
+    ``urllib2.Request`` objects built by routes, keeps idle connections per
+    host for reuse and applies the cookie, auth and redirect behaviour the
+    synchronous opener gets from its handlers.
+    """
+    MAX_REDIRECTS = 10
+
+    def __init__(self, headers=(), cookies=None, auth=None,
+                 follow_redirects=True, size=ConnectionPool.DEFAULT_SIZE,
+                 token=None):
+        self.headers = list(headers)
+        self.cookies = cookies
+        self.auth = auth
+        self.token = token
+        self.follow_redirects = follow_redirects
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._idle = {}
+        self._ssl = None
+
+    @property
+    def stats(self):
+        """ Connection reuse counters, same keys as
+        :class:`ConnectionPool <ConnectionPool>`
+        """
+        idle = sum(len(conns) for conns in self._idle.values())
+        return {"hits": self.hits, "misses": self.misses, "idle": idle}
+
+    async def open(self, request):
+        """ Sends the request, following redirects and answering a basic auth
+        challenge (or renewing the bearer token) once, and returns the fully
+        read response.
+        """
+        authorized = False
+        if self.auth and self.auth.preemptive and \
+                not request.has_header("Authorization"):
+            authorized = self.__authorize(request)
+        token = None
+        if self.token and not request.has_header("Authorization"):
+            token = self.token.token() if not self.token.expired() \
+                else await self.__blocking(self.token.token)
+            self.__bearer(request, token)
+
+        for _ in range(self.MAX_REDIRECTS + 1):
+            response = await self.send(request)
+
+            if response.code == 401 and token is not None:
+                token = await self.__blocking(self.token.refresh, token)
+                self.__bearer(request, token)
+                token = None  # the token is only renewed once
+                continue
+            if response.code == 401 and self.auth and not authorized:
+                authorized = self.__authorize(request)
+                if authorized:
+                    continue
+
+            location = response.headers.get("Location")
+            if not self.follow_redirects or \
+                    response.code not in REDIRECT_CODES or not location:
+                return response
+
+            request = self.__redirect(request, response.code,
+                                      urljoin(request.full_url, location))
+
+        return response
+
+    def __authorize(self, request):
+        username, password = self.auth.credentials(request.full_url)
+        if username is None:
+            return False
+
+        token = "{}:{}".format(username, password).encode("UTF-8")
+        request.add_unredirected_header(
+            "Authorization", "Basic " + base64.b64encode(token).decode())
+        return True
+
+    def __bearer(self, request, token):
+        request.add_unredirected_header("Authorization",
+                                        self.token.header(token))
+
+    @staticmethod
+    async def __blocking(function, *args):
+        # fetching a token can block, keep it off of the event loop
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, function, *args)
+
+    @staticmethod
+    def __redirect(request, code, url):
+        method = request.get_method()
+        data = request.data
+        if code == 303 or (code in (301, 302) and method not in
+                           ("GET", "HEAD")):
+            method, data = "GET", None
+
+        headers = dict((k, v) for k, v in request.headers.items()
+                       if k.lower() not in ("content-length",
+                                            "content-type"))
+        new_request = urllib2.Request(url, data=data, headers=headers)
+        new_request.get_method = lambda: method
+        new_request.timeouts = getattr(request, "timeouts", None)
+        new_request.deadline = getattr(request, "deadline", None)
+        return new_request
+
+    async def send(self, request):
+        """ Writes a single request over a pooled connection and reads the
+        response off of it.
+        """
+        parts = urlsplit(request.full_url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(request.full_url)
+
+        key = (parts.scheme, parts.netloc)
+        payload = self.__encode(request, parts)
+        connect, read = limits(request)
+
+        reader, writer, reused = await self.__acquire(key, parts, connect)
+        try:
+            response, reusable = await self.__exchange(
+                TimedReader(reader, read), writer, request, payload)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            writer.close()
+            raise
+        except (OSError, asyncio.IncompleteReadError):
+            writer.close()
+            if not reused:
+                raise
+            # idle connection was dropped by the server, retry on a new one
+            reader, writer = await self.__connect(parts, connect)
+            try:
+                response, reusable = await self.__exchange(
+                    TimedReader(reader, read), writer, request, payload)
+            except BaseException:
+                writer.close()
+                raise
+
+        if reusable and len(self._idle.setdefault(key, [])) < self.size:
+            self._idle[key].append((reader, writer))
+        else:
+            writer.close()
+
+        if self.cookies:
+            self.cookies.jar.extract_cookies(response, request)
+
+        return response
+
+    def __encode(self, request, parts):
+        if self.cookies:
+            self.cookies.jar.add_cookie_header(request)
+
+        headers = dict((k.title(), v) for k, v in self.headers)
+        headers["Host"] = parts.netloc
+        headers["Connection"] = "keep-alive"
+        data = request.data
+        if is_stream(data):  # only the blocking client streams bodies
+            data = b"".join(bytes(chunk) for chunk in chunks(data))
+            request.remove_header("Transfer-encoding")
+        data = bytes(data) if data is not None else b""
+        if request.data is not None:
+            headers["Content-Length"] = str(len(data))
+        if data:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        headers.update((k.title(), v) for k, v in request.header_items())
+
+        selector = parts.path or "/"
+        if parts.query:
+            selector += "?" + parts.query
+
+        lines = ["{} {} HTTP/1.1".format(request.get_method(), selector)]
+        lines += ["{}: {}".format(k, v) for k, v in headers.items()]
+        head = "\r\n".join(lines) + "\r\n\r\n"
+        return head.encode("iso-8859-1") + data
+
+    async def __acquire(self, key, parts, timeout=None):
+        idle = self._idle.get(key)
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                self.hits += 1
+                return reader, writer, True
+            writer.close()
+
+        self.misses += 1
+        reader, writer = await self.__connect(parts, timeout)
+        return reader, writer, False
+
+    async def __connect(self, parts, timeout=None):
+        context = None
+        if parts.scheme == "https":
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+
+        port = parts.port or (443 if context else 80)
+        return await asyncio.wait_for(asyncio.open_connection(
+            parts.hostname, port, ssl=context), timeout)
+
+    async def __exchange(self, reader, writer, request, payload):
+        writer.write(payload)
+        await asyncio.wait_for(writer.drain(), reader.timeout)
+
+        while True:
+            status = await reader.readuntil(b"\r\n")
+            version, code, reason = (status.decode("iso-8859-1").strip()
+                                     .split(" ", 2) + [""])[:3]
+            code = int(code)
+            head = await self.__read_head(reader)
+            if not 100 <= code < 200 or code == 101:
+                break  # interim responses (i.e. `100 Continue`) are skipped
+
+        headers = parse_headers(head)
+        body, reusable = await self.__read_body(
+            reader, headers, request.get_method(), code)
+        reusable = reusable and version == "HTTP/1.1" and \
+            headers.get("Connection", "").lower() != "close"
+
+        return BufferedResponse(request.full_url, code, headers, body,
+                                reason), reusable
+
+    @staticmethod
+    async def __read_head(reader):
+        # the header block up to the empty line, which may be all there is
+        lines = []
+        line = await reader.readuntil(b"\r\n")
+        while line != b"\r\n":
+            lines.append(line)
+            line = await reader.readuntil(b"\r\n")
+        return b"".join(lines) + line
+
+    @staticmethod
+    async def __read_body(reader, headers, method, code):
+        if method == "HEAD" or code in (204, 304):
+            return b"", True
+
+        if "chunked" in headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while True:
+                size = await reader.readuntil(b"\r\n")
+                size = int(size.split(b";", 1)[0], 16)
+                if not size:
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            # discard trailers
+            while await reader.readuntil(b"\r\n") != b"\r\n":
+                pass
+            return b"".join(chunks), True
+
+        length = headers.get("Content-Length")
+        if length is not None:
+            return await reader.readexactly(int(length)), True
+
+        return await reader.read(), False
+
+    async def close(self):
+        """ Closes every idle connection.
+        """
+        idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for _, writer in conns:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
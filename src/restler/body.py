@@ -0,0 +1,113 @@
+""" Request bodies that are sent as given rather than encoded from params.
+Buffers (``bytes``, ``memoryview``, ``mmap``...) are written straight to the
+socket, files are sent with ``sendfile`` where the platform has it and
+iterators are sent chunk by chunk, so a body never has to be copied or held in
+memory as a whole.  Bodies of unknown length go out with chunked transfer
+encoding.
+"""
+import io
+import os
+import stat
+
+from restler.utils import isstr
+
+BLOCK_SIZE = 64 * 1024  # bytes read from a file at a time
+FRAME_LIMIT = 16 * 1024  # smaller chunks are framed in one write
+
+
+def is_buffer(body):
+    try:
+        memoryview(body)
+    except TypeError:
+        return False
+    return True
+
+
+def is_stream(body):
+    """ Whether the body is read while it is sent (a file or an iterator),
+    which means it can only be sent once unless it can be rewound
+    """
+    return hasattr(body, "read") and not is_buffer(body) or \
+        hasattr(body, "__next__") or hasattr(body, "next")
+
+
+def is_body(value):
+    """ Whether a positional argument of a call is a raw body
+    """
+    return not isstr(value) and (is_buffer(value) or is_stream(value))
+
+
+def length(body):
+    """ Size in bytes of what is left of the body, ``None`` when it is only
+    known by reading it
+    """
+    try:
+        return memoryview(body).nbytes
+    except TypeError:
+        pass
+    try:
+        info = os.fstat(body.fileno())
+        if stat.S_ISREG(info.st_mode):
+            return info.st_size - body.tell()
+    except (AttributeError, EnvironmentError, io.UnsupportedOperation):
+        pass
+    return None
+
+
+def position(body):
+    """ Offset a stream body starts from, to rewind it for sending it again,
+    ``None`` if it cannot be rewound
+    """
+    try:
+        return body.tell() if body.seekable() else None
+    except (AttributeError, EnvironmentError, io.UnsupportedOperation):
+        return None
+
+
+def chunks(body):
+    """ Pieces of a stream body, read into one reused buffer for files
+    """
+    if not hasattr(body, "read"):
+        for chunk in body:
+            yield chunk.encode("utf-8") if not is_buffer(chunk) else chunk
+    elif hasattr(body, "readinto"):
+        buf = bytearray(BLOCK_SIZE)
+        view = memoryview(buf)
+        read = body.readinto(buf)
+        while read:
+            yield view[:read]
+            read = body.readinto(buf)
+    else:
+        for chunk in iter(lambda: body.read(BLOCK_SIZE), b""):
+            yield chunk
+
+
+def send(sock, body, chunked=False):
+    """ Writes the body to the socket, with chunked transfer encoding if the
+    request's headers announced it
+    """
+    if is_buffer(body):
+        sock.sendall(body)
+        return
+
+    size = None if chunked else length(body)
+    if size and hasattr(sock, "sendfile") and hasattr(body, "fileno"):
+        sock.sendfile(body, body.tell(), size)
+        return
+
+    for chunk in chunks(body):
+        if not chunked:
+            sock.sendall(chunk)
+            continue
+        size = memoryview(chunk).nbytes
+        if not size:
+            continue  # an empty chunk would end the body
+        head = "{:X}\r\n".format(size).encode("ascii")
+        if size < FRAME_LIMIT:
+            sock.sendall(head + chunk + b"\r\n")
+        else:
+            sock.sendall(head)
+            sock.sendall(chunk)
+            sock.sendall(b"\r\n")
+    if chunked:
+        sock.sendall(b"0\r\n\r\n")
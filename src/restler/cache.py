@@ -0,0 +1,381 @@
+""" HTTP response caching, responses to ``GET`` requests are kept and reused
+while they are fresh (per ``Cache-Control: max-age``/``Expires``) and
+revalidated with ``If-None-Match``/``If-Modified-Since`` once they are not, a
+``304 Not Modified`` answer refreshes the stored response with its headers.
+"""
+from collections import OrderedDict
+from email.utils import parsedate_tz, mktime_tz
+import hashlib
+import json
+import os
+import threading
+import time
+
+from restler.utils import BufferedResponse, parse_headers
+
+try:
+    import sqlite3
+except ImportError:  # python built without sqlite support
+    sqlite3 = None
+
+
+def cache_control(headers):
+    """ Parses the ``Cache-Control`` header into a dictionary of directives,
+    directives without a value map to ``True``
+    """
+    directives = {}
+    for directive in headers.get("Cache-Control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or True
+
+    return directives
+
+
+def expiration(headers, now):
+    """ Timestamp until which a response with the given headers is fresh,
+    ``None`` if it must not be stored at all.
+    """
+    directives = cache_control(headers)
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return now
+
+    try:
+        age = int(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+
+    try:
+        return now + int(directives["max-age"]) - age
+    except (KeyError, ValueError):
+        pass
+
+    expires = parsedate_tz(headers.get("Expires", ""))
+    return mktime_tz(expires) if expires else now
+
+
+# headers of a `304` that describe its own (empty) message, not the stored one
+UNMERGED_HEADERS = ("connection", "content-length", "keep-alive",
+                    "transfer-encoding")
+
+
+def merge_headers(stored, update):
+    """ The stored headers with the ones sent along a ``304`` replacing them
+    (i.e. a new ``ETag``, ``Cache-Control`` or ``Expires``)
+    """
+    names = set(name.lower() for name in update.keys()
+                if name.lower() not in UNMERGED_HEADERS)
+    lines = ["{}: {}\r\n".format(name, value)
+             for name, value in stored.items() if name.lower() not in names]
+    lines += ["{}: {}\r\n".format(name, value)
+              for name, value in update.items() if name.lower() in names]
+    return parse_headers(("".join(lines) + "\r\n").encode("iso-8859-1"))
+
+
+class CacheEntry(object):
+    """ Stored response, holds the raw status, headers and body the
+    :class:`Response <Response>` handed to each caller is built from.
+    """
+    __slots__ = ("url", "code", "headers", "body", "expires", "vary")
+
+    def __init__(self, url, code, headers, body, expires, vary=()):
+        self.url = url
+        self.code = code
+        self.headers = headers
+        self.body = body
+        self.expires = expires
+        self.vary = vary
+
+    @property
+    def etag(self):
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self):
+        return self.headers.get("Last-Modified")
+
+    def fresh(self, now):
+        return self.expires > now
+
+    def raw(self):
+        """ File-like response to rebuild the :class:`Response <Response>`
+        from
+        """
+        return BufferedResponse(self.url, self.code, self.headers, self.body)
+
+
+class ResponseCache(object):
+    """ In memory cache of responses, bounded to ``size`` entries with the
+    least recently used ones evicted first.  Entries are keyed on the method,
+    URL, the values of the request headers named in the response's ``Vary``
+    header and a digest of the credentials the request is sent with, so
+    responses are never shared between users.  Every caller gets a
+    :class:`Response <Response>` of its own, built from the stored body.
+
+    ``stats`` reports ``hits`` (served without touching the network),
+    ``misses``, ``revalidations`` (served after a ``304``) and ``evictions``.
+    """
+    DEFAULT_SIZE = 256
+    METHODS = ("GET",)
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.clock = time.time
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._vary = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "revalidations": self.revalidations,
+                    "evictions": self.evictions,
+                    "entries": len(self._entries)}
+
+    def key(self, method, url, headers, vary=None):
+        """ Cache key of a request with the ``headers`` it is sent with (see
+        :meth:`snapshot <snapshot>`), ``vary`` defaults to the header names
+        the last stored response for the URL varied on.
+        """
+        if vary is None:
+            vary = self.variants(method, url)
+        key = (method, url) + tuple(
+            (name, headers.get(name.capitalize())) for name in vary)
+        if headers.get("Authorization"):
+            key += (("Authorization", headers["Authorization"]),)
+        return key
+
+    @staticmethod
+    def snapshot(request, defaults=(), credentials=None):
+        """ The headers the request goes out with, taken before it is sent so
+        the lookup and the stored entry are keyed the same: the request's own
+        over the opener's ``defaults`` and the ``credentials`` the handlers
+        will authorize it with, kept as a digest.
+        """
+        headers = dict((name.capitalize(), value) for name, value in defaults)
+        headers.update((name.capitalize(), value)
+                       for name, value in request.header_items())
+        credentials = headers.get("Authorization", credentials)
+        if credentials:
+            headers["Authorization"] = hashlib.sha256(
+                credentials.encode("UTF-8")).hexdigest()
+        return headers
+
+    def variants(self, method, url):
+        """ Names of the headers the stored response for the URL varies on
+        """
+        return self._vary.get((method, url), ())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry  # most recently used goes last
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._vary[key[:2]] = entry.vary
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vary.clear()
+
+    def fetch(self, request, send, build, credentials=None, defaults=()):
+        """ Serves the request from the cache when possible.  ``send`` opens
+        the request and returns the raw response and ``build`` turns a raw
+        response into the :class:`Response <Response>`.  ``credentials``
+        stand for the authorization the handlers will add to the request (an
+        ``Authorization`` header already on it takes precedence) and
+        ``defaults`` for the headers the opener adds.
+        """
+        method = request.get_method()
+        if method not in self.METHODS or \
+                request.has_header("If-none-match") or \
+                request.has_header("If-modified-since"):
+            return build(send(request))
+
+        url = request.get_full_url()
+        sent = self.snapshot(request, defaults, credentials)
+        key = self.key(method, url, sent)
+        entry = self.get(key)
+        now = self.clock()
+
+        if entry is not None:
+            if entry.fresh(now):
+                self.__count("hits")
+                return build(entry.raw())
+            if entry.etag:
+                request.add_unredirected_header("If-None-Match", entry.etag)
+            if entry.last_modified:
+                request.add_unredirected_header("If-Modified-Since",
+                                                entry.last_modified)
+
+        raw = send(request)
+        if raw.getcode() == 304 and entry is not None:
+            self.__count("revalidations")
+            raw.read()
+            entry.headers = merge_headers(entry.headers, raw.info())
+            entry.expires = expiration(entry.headers, now) or now
+            self.put(key, entry)
+            return build(entry.raw())
+
+        self.__count("misses")
+        headers = raw.info()
+        expires = expiration(headers, now)
+        validated = headers.get("ETag") or headers.get("Last-Modified")
+        if raw.getcode() != 200 or expires is None or \
+                not (expires > now or validated):
+            return build(raw)
+
+        vary = tuple(name.strip() for name in
+                     headers.get("Vary", "").split(",") if name.strip())
+        entry = CacheEntry(raw.geturl(), raw.getcode(), headers, raw.read(),
+                           expires, vary)
+        self.put(self.key(method, url, sent, vary), entry)
+        return build(entry.raw())
+
+    def __count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class SQLiteCache(ResponseCache):
+    """ Response cache stored in a single SQLite file, so it survives restarts
+    and is shared by every process (and thread) pointed at the same ``path``.
+    Entries hold the raw status, headers and body and the :class:`Response
+    <Response>` is rebuilt from them on a hit.
+
+    :param str path: location of the database file
+    :param int max_bytes: total body size kept, the least recently used
+        entries are evicted past it
+    :param int ttl: seconds an entry is kept for at most, even if it could
+        still be revalidated
+    """
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+    TIMEOUT = 30
+
+    SCHEMA = [
+        "PRAGMA journal_mode=WAL",
+        "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, "
+        "url TEXT, code INTEGER, headers TEXT, body BLOB, expires REAL, "
+        "vary TEXT, stored REAL, accessed REAL, size INTEGER)",
+        "CREATE INDEX IF NOT EXISTS responses_accessed "
+        "ON responses (accessed)",
+        "CREATE TABLE IF NOT EXISTS variants (base TEXT PRIMARY KEY, "
+        "vary TEXT)",
+    ]
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, ttl=None):
+        ResponseCache.__init__(self, size=None)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        for statement in self.SCHEMA:
+            self.db.execute(statement)
+
+    @property
+    def db(self):
+        """ Connection for the current thread (and process)
+        """
+        if getattr(self._local, "pid", None) != os.getpid():
+            self._local.db = sqlite3.connect(self.path, timeout=self.TIMEOUT,
+                                             isolation_level=None)
+            self._local.pid = os.getpid()
+        return self._local.db
+
+    @property
+    def stats(self):
+        stats = ResponseCache.stats.fget(self)
+        stats["entries"], stats["bytes"] = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        return stats
+
+    def variants(self, method, url):
+        row = self.db.execute("SELECT vary FROM variants WHERE base = ?",
+                              (json.dumps([method, url]),)).fetchone()
+        return tuple(json.loads(row[0])) if row else ()
+
+    def get(self, key):
+        now = self.clock()
+        key = json.dumps(key)
+        row = self.db.execute(
+            "SELECT url, code, headers, body, expires, vary, stored "
+            "FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        url, code, headers, body, expires, vary, stored = row
+        if self.ttl is not None and stored + self.ttl <= now:
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            with self._lock:
+                self.evictions += 1
+            return None
+
+        self.db.execute("UPDATE responses SET accessed = ? WHERE key = ?",
+                        (now, key))
+        return CacheEntry(url, code, parse_headers(headers.encode("UTF-8")),
+                          bytes(body), expires, tuple(json.loads(vary)))
+
+    def put(self, key, entry):
+        now = self.clock()
+        headers = "".join("{}: {}\r\n".format(name, value)
+                          for name, value in entry.headers.items())
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("INSERT OR REPLACE INTO variants VALUES (?, ?)",
+                       (json.dumps(list(key[:2])), json.dumps(entry.vary)))
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (json.dumps(key), entry.url, entry.code, headers,
+                 sqlite3.Binary(entry.body), entry.expires,
+                 json.dumps(entry.vary), now, now, len(entry.body)))
+            evicted = self.__evict(db, now)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self.evictions += evicted
+
+    def __evict(self, db, now):
+        evicted = 0
+        if self.ttl is not None:
+            evicted += db.execute("DELETE FROM responses WHERE stored <= ?",
+                                  (now - self.ttl,)).rowcount
+
+        total, = db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        rows = db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed")
+        stale = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        db.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+        return evicted + len(stale)
+
+    def clear(self):
+        self.db.execute("DELETE FROM responses")
+        self.db.execute("DELETE FROM variants")
@@ -0,0 +1,86 @@
+""" ``gzip``/``deflate`` content coding, compressed response bodies are
+decoded incrementally as they are read so neither the whole compressed nor
+the whole decoded body has to be held to get at the data.
+"""
+import zlib
+
+ACCEPT_ENCODING = "gzip, deflate"
+CHUNK_SIZE = 64 * 1024
+COMPRESS_THRESHOLD = 1024  # smaller bodies are not worth compressing
+WBITS = {
+    "gzip": 16 + zlib.MAX_WBITS,
+    "x-gzip": 16 + zlib.MAX_WBITS,
+    "deflate": zlib.MAX_WBITS,
+}
+
+
+def decompressing(response):
+    """ Wraps the raw response in a :class:`Decompressor <Decompressor>` if
+    its body is compressed with a supported coding, otherwise returns it as
+    is.
+    """
+    encoding = response.info().get("Content-Encoding", "").strip().lower()
+    if encoding in WBITS:
+        return Decompressor(response, encoding)
+    return response
+
+
+def compress(data, level=6):
+    """ gzip compresses a request body
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS["gzip"])
+    return compressor.compress(bytes(data)) + compressor.flush()
+
+
+class Decompressor(object):
+    """ File-like view of a compressed response that decodes the body as it
+    is read, reading at most ``CHUNK_SIZE`` compressed bytes at a time.  Any
+    other attribute is looked up on the wrapped response.
+    """
+    def __init__(self, response, encoding):
+        self.response = response
+        self.encoding = encoding
+        self.eof = False
+        self._zlib = zlib.decompressobj(WBITS[encoding])
+        self._started = False
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = []
+            chunk = self.__decompress(CHUNK_SIZE)
+            while chunk or not self.eof:
+                chunks.append(chunk)
+                chunk = self.__decompress(CHUNK_SIZE)
+            return b"".join(chunks)
+
+        while True:
+            data = self.__decompress(size)
+            if data or self.eof:
+                return data
+
+    def __decompress(self, size):
+        # at most `size` decoded bytes, can be empty before the end of the body
+        pending = self._zlib.unconsumed_tail
+        if pending:
+            return self._zlib.decompress(pending, size)
+        if self.eof:
+            return b""
+
+        raw = self.response.read(CHUNK_SIZE)
+        if not raw:
+            self.eof = True
+            return self._zlib.flush()
+
+        if self._started or self.encoding != "deflate":
+            return self._zlib.decompress(raw, size)
+
+        self._started = True
+        try:
+            return self._zlib.decompress(raw, size)
+        except zlib.error:
+            # some servers send a raw deflate stream without the zlib header
+            self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._zlib.decompress(raw, size)
+
+    def __getattr__(self, attr):
+        return getattr(self.response, attr)
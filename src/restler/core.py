@@ -2,12 +2,31 @@ try:
     import urllib2
 except ImportError:
     import urllib.request as urllib2
-    from functools import reduce
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+except ImportError:  # python 2 without the ``futures`` backport
+    ThreadPoolExecutor = None
+
+from collections import OrderedDict
+from itertools import islice
 
 from restler import __version__
-from restler.route import Builder
-from restler.url import URL, AuthManager, Cookies
-from restler.utils import isstr
+from restler.errors import InvalidURLError, RequestError, ServerError, \
+    error_result
+from restler.cache import ResponseCache, SQLiteCache
+from restler.compression import ACCEPT_ENCODING, COMPRESS_THRESHOLD
+from restler.flight import SingleFlight
+from restler.hedge import Hedge
+from restler.limiter import RateLimiter
+from restler.retry import Retry
+from restler.route import Builder, Route
+from restler.template import Template
+from restler.timeout import Timeout
+from restler.url import URL, AuthManager, ConcurrencyLimiter, \
+    ConnectionPool, Cookies, TokenProvider
+from restler.url.pool import KeepAliveHandler
+from restler.utils import isstr, NoRedirectHandler, RedirectHandler
 
 
 class Restler(object):
@@ -24,32 +43,131 @@ class Restler(object):
         'Route: http://api.github.com/user/username/'
     """
     __name__ = "Restler v{}".format(__version__)
+    _route_class = Route
+    GATHER_WORKERS = 10
 
     def __init__(self, base, cookies=False, follow_redirects=True,
-                 http_auth=False):
+                 http_auth=False, keep_alive=False, cache=False,
+                 coalesce=False, preemptive_auth=False, token=False,
+                 compression=True, compress_requests=False, timeout=None,
+                 retry=False, hedge=False, rate_limit=False,
+                 concurrency_limit=False, max_routes=None):
         self.EXCEPTION_THROWING = True  # set to False if you want return codes
+        self.LAZY_PARSING = False  # set to True to only parse data on access
         self.__test__ = False
 
         self.__url__ = URL(base)
-        self._route = Builder(self)
+        # `max_routes` caps the routes kept for reuse, see `Builder`
+        self._route = Builder(self, self._route_class, size=max_routes)
         self.__route = self._route(self.__url__)
-        self.__auth_manager = None
-
-        handlers = []
-        if not follow_redirects:
-            from restler.utils import NoRedirectHandler
-            handlers.append(NoRedirectHandler)
+        self.__cookies__ = None
+        self.__auth__ = None
+        self.__token__ = None
+        self.__compress__ = None
+        # `timeout` can be seconds, a `(connect, read)` pair or a `Timeout`
+        self.__timeout__ = Timeout.coerce(timeout)
+        # `retry` can be a bool, the number of retries or the policy itself
+        self.__retry__ = self.__build_policy(Retry, retry, "total")
+        # `hedge` can be a bool, a fixed delay in seconds or the policy
+        self.__hedge__ = self.__build_policy(Hedge, hedge, "delay")
+        # `rate_limit` can be requests per second or the limiter itself
+        self.__limiter__ = self.__build_policy(RateLimiter, rate_limit,
+                                               "rate")
+        # `concurrency_limit` can be a bool, the starting limit per host or
+        # the limiter itself
+        self.__concurrency__ = self.__build_policy(
+            ConcurrencyLimiter, concurrency_limit, "initial")
 
+        handlers = [RedirectHandler if follow_redirects else NoRedirectHandler]
         if cookies:  # `cookies` can be a bool, the CookieJar or CookiePolicy
-            self.__cookie_manager = Cookies(cookies, self.__url__)
-            handlers.append(self.__cookie_manager.handler)
+            self.__cookies__ = Cookies(cookies, self.__url__)
+            handlers.append(self.__cookies__.handler)
+
+        handlers += self.__auth_handlers(http_auth, preemptive_auth, token)
+
+        self.__pool__ = self.__build_pool(keep_alive)
+        # without keep-alive, the pool handler only applies the separate
+        # timeouts and the concurrency limit
+        handlers.append(KeepAliveHandler(
+            self.__pool__ or ConnectionPool(size=0), self.__concurrency__))
+
+        self.__cache__ = self.__build_cache(cache)
+
+        self.__flights__ = None
+        if isinstance(coalesce, SingleFlight):
+            self.__flights__ = coalesce
+        elif coalesce:
+            self.__flights__ = SingleFlight()
 
-        if http_auth:
-            self.__auth_manager = AuthManager(http_auth, self.__url__)
-            handlers.append(self.__auth_manager.handler)
+        # `compress_requests` can be a bool or the smallest body compressed
+        if compress_requests is True:
+            self.__compress__ = COMPRESS_THRESHOLD
+        elif compress_requests is not False:
+            self.__compress__ = int(compress_requests)
 
         self.__opener__ = urllib2.build_opener(*handlers)
         self.__opener__.addheaders = [('User-agent', self.__name__)]
+        if compression:
+            self.__opener__.addheaders.append(
+                ('Accept-encoding', ACCEPT_ENCODING))
+
+    def __auth_handlers(self, http_auth, preemptive_auth, token):
+        handlers = []
+        # `http_auth` can be credentials, a password manager or the manager
+        if isinstance(http_auth, AuthManager):
+            self.__auth__ = http_auth
+        elif http_auth:
+            self.__auth__ = AuthManager(http_auth, self.__url__,
+                                        preemptive=preemptive_auth)
+
+        if self.__auth__:
+            handlers.append(self.__auth__.handler)
+
+        # `token` can be the provider or the function fetching new tokens
+        if isinstance(token, TokenProvider):
+            self.__token__ = token
+        elif token:
+            self.__token__ = TokenProvider(token)
+
+        if self.__token__:
+            handlers.append(self.__token__.handler)
+
+        return handlers
+
+    @staticmethod
+    def __build_policy(policy, option, setting):
+        if isinstance(option, policy):
+            return option
+        elif option is True:
+            return policy()
+        elif option:
+            return policy(**{setting: option})
+        return None
+
+    @staticmethod
+    def __build_pool(keep_alive):
+        # `keep_alive` can be a bool, the per host pool size or a shared pool
+        if isinstance(keep_alive, ConnectionPool):
+            return keep_alive
+        elif keep_alive is True:
+            return ConnectionPool()
+        elif keep_alive:
+            return ConnectionPool(size=keep_alive)
+        return None
+
+    @staticmethod
+    def __build_cache(cache):
+        # `cache` can be a bool, the max number of entries, the path of an on
+        # disk cache or the cache itself
+        if isinstance(cache, ResponseCache):
+            return cache
+        elif cache is True:
+            return ResponseCache()
+        elif isstr(cache):
+            return SQLiteCache(cache)
+        elif cache:
+            return ResponseCache(size=cache)
+        return None
 
     def __call__(self, *args, **kwargs):
         return self.__route(*args, **kwargs)
@@ -58,11 +176,102 @@ class Restler(object):
         """ Store HTTPAuth credentials, takes an optional ``path`` argument to
         scope the credentials to a certain path in the routes.
         """
-        if not self.__auth_manager:
+        if not self.__auth__:
             return
 
-        path = path if str(path) else self.__url__
-        self.__auth_manager.add_password(None, path, username, password)
+        if path is None:
+            path = self.__url__
+        elif isstr(path) and "://" not in path:
+            path = self[path.strip("/")] if path.strip("/") else self.__url__
+        self.__auth__.add_password(None, str(path), username, password)
+
+    def template(self, path):
+        """ Precompiles a route path with ``{name}`` placeholders, calling the
+        returned :class:`Template <Template>` fills them in and makes the
+        request without building the route one attribute at a time.  Meant
+        for calling the same kind of route over and over.
+
+        Usage::
+
+            >> user_repos = github.template("/users/{user}/repos")
+            >> for name in names:
+            ..     repos = user_repos(user=name)
+
+        """
+        return Template(self, path)
+
+    def gather(self, calls, workers=None, ordered=True):
+        """ Makes a batch of requests concurrently over a bounded pool of
+        ``workers`` threads.  Each call is either a route (or path string) or a
+        ``(route, method, params)`` tuple, where the method and params are
+        optional.
+
+        Returns a generator, with ``ordered`` the results come out in the order
+        the calls were given, otherwise as ``(position, result)`` pairs in the
+        order they complete.  Every result is reported the way it is with
+        ``EXCEPTION_THROWING`` turned off, either ``(0, response)`` or the
+        error code and error, so one failure does not stop the batch.
+
+        The calls are taken from ``calls`` as the results are consumed, no
+        more than twice as many as there are ``workers`` are submitted ahead,
+        so a long (or endless) batch is never held in memory as a whole.
+        Without ``concurrent.futures`` the calls are made one at a time.
+
+        Usage::
+
+            >> calls = [(github.users[name], "GET") for name in names]
+            >> for code, user in github.gather(calls, workers=20):
+            ..     print(user.login)
+
+        """
+        calls = enumerate(self.__gather_call(call) for call in calls)
+        if ThreadPoolExecutor is None:
+            for position, call in calls:
+                result = self.__gather_one(*call)
+                yield result if ordered else (position, result)
+            return
+
+        workers = workers or self.GATHER_WORKERS
+        executor = ThreadPoolExecutor(max_workers=workers)
+        window = OrderedDict()  # future: position, in submission order
+        try:
+            while True:
+                for position, call in islice(calls, 2 * workers - len(window)):
+                    window[executor.submit(self.__gather_one, *call)] = \
+                        position
+                if not window:
+                    return
+                if ordered:
+                    future = next(iter(window))
+                    del window[future]
+                    yield future.result()
+                    continue
+                done, _ = wait(window, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield window.pop(future), future.result()
+        finally:
+            for future in window:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def __gather_call(self, call):
+        if not isinstance(call, tuple):
+            call = (call,)
+        route, method, params = (call + (None, None))[:3]
+        if isstr(route):
+            route = self[route]
+
+        return route, method or route.default_method, params or {}
+
+    def __gather_one(self, route, method, params):
+        request = route.__build__(method, **params)
+        if self.__test__:
+            return request
+
+        try:
+            return 0, route.__fetch__(request)
+        except (InvalidURLError, RequestError, ServerError) as err:
+            return error_result(err)
 
     def __get_path__(self, attr):
         if not isstr(attr):
@@ -110,4 +319,4 @@ class Restler(object):
         return str(self) != str(other)
 
     def __hash__(self):
-        return reduce(lambda s, x: s ^ ord(x), str(self), 0)
+        return hash(self.__url__)
@@ -1,6 +1,7 @@
 # Exceptions/Errors
 ERRORS = {
     'InvalidURL': 1,
+    'Timeout': 2,
     'RequestError': 4,  # 4xx errors
     'ServerError': 5    # 5xx errors
 }
@@ -12,6 +13,13 @@ class InvalidURLError(Exception):
     pass
 
 
+class RequestTimeoutError(InvalidURLError):
+    """ Error raised when connecting to or reading from the server took longer
+    than the timeout allowed, or the request's deadline has passed
+    """
+    pass
+
+
 class RequestError(Exception):
     """ Error for when the request failed for a handled reason (4xx HTTP error
     codes)
@@ -44,3 +52,17 @@ class ServerError(Exception):
 
     def __str__(self):
         return self.body
+
+
+def error_result(err):
+    """ Converts a raised request error into the ``(code, error)`` pair that
+    is returned in place of raising when ``EXCEPTION_THROWING`` is off
+    """
+    if isinstance(err, ServerError):
+        return (ERRORS["ServerError"], err)
+    elif isinstance(err, RequestError):
+        return (ERRORS["RequestError"], err)
+    elif isinstance(err, RequestTimeoutError):
+        return (ERRORS["Timeout"], err)
+
+    return (ERRORS["InvalidURL"], None)
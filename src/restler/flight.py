@@ -0,0 +1,82 @@
+""" Request coalescing, concurrent identical idempotent requests share the one
+that is already in flight instead of each going out on their own.
+"""
+import threading
+
+from restler.body import is_stream
+
+
+class Flight(object):
+    """ A request in flight, followers wait on it for the leader's outcome
+    """
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """ Coalesces concurrent requests with the same method, final URL and
+    headers, only one of them is sent and every caller gets its outcome: the
+    same (shared, so treat it as read only) :class:`Response <Response>` or
+    the same error raised.
+
+    ``stats`` reports the number of ``flights`` sent and the ``coalesced``
+    requests that joined one instead.
+    """
+    METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self):
+        self.flights = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"flights": self.flights, "coalesced": self.coalesced,
+                    "in_flight": len(self._flights)}
+
+    @staticmethod
+    def key(request):
+        return (request.get_method(), request.get_full_url(),
+                bytes(request.data) if request.data is not None else None,
+                tuple(sorted(request.header_items())))
+
+    def fetch(self, request, fetch):
+        """ Runs ``fetch(request)`` unless an identical request is already in
+        flight, in which case its outcome is waited on and shared.
+        """
+        if request.get_method() not in self.METHODS or \
+                is_stream(request.data):
+            return fetch(request)
+
+        key = self.key(request)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+                self.flights += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fetch(request)
+            return flight.result
+        except Exception as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
@@ -12,7 +12,6 @@ class DateHandler(object):
     ``stptime`` function to generate the rich ``datetime`` object of the raw
     string value.
     """
-    current = None
     types = []
 
     @classmethod
@@ -26,34 +25,34 @@ class DateHandler(object):
 
     @classmethod
     def detection(cls, response, value):
-        """ Goes through registered string format types and provides whether
-        any of them match the provided string value.  Keeps track of which
-        format was matched so that it may later be used for conversion.
+        """ Goes through registered string format types and returns the
+        ``strptime`` format of the first one that matches the provided string
+        value (``None`` if none do), which is the match context later used for
+        conversion.
         """
+        if not isstr(value):
+            return None
+
         for dateset in cls.types:
-            if not isstr(value):
-                continue
             if dateset.matcher.match(value):
-                cls.current = dateset.parser
-                return True
+                return dateset.parser
 
-        cls.current = None
-        return False
+        return None
 
     @classmethod
-    def handler(cls, response, value):
+    def handler(cls, response, value, parser=None):
         """ Converts the raw value into a rich ``datetime`` object using the
-        most recently detected format as the parsing definition.
+        detected format as the parsing definition, detecting it again if it is
+        not passed in.
         """
-        if not cls.current:
+        parser = parser or cls.detection(response, value)
+        if not parser:
             return value
 
-        new_date = datetime.strptime(value, cls.current)
-        cls.current = None
-
-        return new_date
+        return datetime.strptime(value, parser)
 
 DateHandler.register("[0-3][0-9]/[0-3][0-9]/[0-9]{2}", "%m/%d/%y")
 
 from restler import Response
-Response.add_datatype(DateHandler.detection, DateHandler.handler)
+Response.add_datatype(DateHandler.detection, DateHandler.handler,
+                      contextual=True, patterns=DateHandler.types)
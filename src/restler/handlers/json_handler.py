@@ -1,4 +1,11 @@
+import codecs
 import json
+from restler.utils import isstr
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+NUMBER_START = "-0123456789"
+NUMBER_CHARS = "0123456789.eE+-"
 
 
 def handler(response, body):
@@ -8,5 +15,128 @@ def handler(response, body):
     """
     return json.loads(body)
 
+
+def iterparse(fp, path=(), chunk_size=CHUNK_SIZE):
+    """ Incrementally parses the JSON array found at ``path`` (a sequence of
+    object keys and array indexes, empty for a top level array) out of the
+    file-like ``fp``, yielding each element as soon as it has been read.  Only
+    about one element plus one ``chunk_size`` read is held in memory at a time.
+    """
+    stream = JSONStream(fp, chunk_size)
+    stream.descend(path)
+    for item in stream.array():
+        yield item
+
+
+class JSONStream(object):
+    """ Cursor over a JSON document that is read from a file-like object in
+    chunks as it is consumed, values are decoded one at a time with the
+    standard ``json`` decoder.
+    """
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("UTF-8")()
+
+    def fill(self, size=None):
+        """ Reads another chunk onto the buffer, dropping what has already
+        been consumed.  Returns ``False`` once the body is exhausted.
+        """
+        if self.eof:
+            return False
+
+        raw = self.fp.read(size or self.chunk_size)
+        if not raw:
+            self.eof = True
+        if isinstance(raw, bytes):
+            raw = self._text.decode(raw, final=self.eof)
+
+        self.buffer = self.buffer[self.pos:] + raw
+        self.pos = 0
+        return not self.eof
+
+    def peek(self):
+        """ Next non whitespace character, empty at the end of the document
+        """
+        while True:
+            while self.pos < len(self.buffer) and \
+                    self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError("Expected one of {!r} at {!r}".format(
+                chars, self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+        return char
+
+    def value(self):
+        """ Decodes the next complete value, reading more of the body until
+        the decoder can finish it.
+        """
+        size = self.chunk_size
+        self.peek()
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # a number cut off by the end of the buffer ("12." or "1e"
+                # decode as 12 and 1) only ends before a non number character
+                if self.eof or self.buffer[self.pos] not in NUMBER_START or \
+                        self.buffer[end:end + 1] not in NUMBER_CHARS:
+                    self.pos = end
+                    return obj
+            except ValueError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2
+
+    def descend(self, path):
+        """ Moves the cursor to the value at ``path``
+        """
+        if isstr(path) or isinstance(path, int):
+            path = (path,)
+
+        for key in path:
+            if isinstance(key, int):
+                self.expect("[")
+                for _ in range(key):
+                    self.value()
+                    self.expect(",")
+                continue
+
+            self.expect("{")
+            while True:
+                if self.peek() == "}":
+                    raise KeyError(key)
+                current = self.value()
+                self.expect(":")
+                if current == key:
+                    break
+                self.value()
+                if self.expect(",}") == "}":
+                    raise KeyError(key)
+
+    def array(self):
+        """ Yields the elements of the array at the cursor
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
 from restler import Response
-Response.add_mimetype("application/json", handler)
+Response.add_mimetype("application/json", handler, iterator=iterparse)
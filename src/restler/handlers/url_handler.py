@@ -18,6 +18,12 @@ class URLHandler(object):
         return value.startswith('/') or \
             value.startswith(str(response.__parent__))
 
+    @classmethod
+    def prefixes(cls, response):
+        """ The prefixes checked by the detection, resolved once per response
+        """
+        return ('/', str(response.__parent__))
+
     @classmethod
     def handler(cls, response, value):
         """ Generates a representative :class:`Route <Route>`
@@ -25,4 +31,5 @@ class URLHandler(object):
         return response.__parent__[value]
 
 from restler import Response
-Response.add_datatype(URLHandler.detection, URLHandler.handler)
+Response.add_datatype(URLHandler.detection, URLHandler.handler,
+                      prefixes=URLHandler.prefixes)
@@ -0,0 +1,233 @@
+""" Hedged requests, an idempotent request that has not been answered within
+a delay (fixed, or a percentile of the route's recent latencies) is sent a
+second time and whichever copy is answered first is used, cutting off the
+slow tail of the latency distribution.
+"""
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # python 2 without the ``futures`` backport
+    ThreadPoolExecutor = None
+
+from collections import OrderedDict, deque
+import copy
+import threading
+import time
+
+from restler.body import is_stream
+
+try:
+    clock = time.monotonic
+except AttributeError:  # python 2
+    clock = time.time
+
+
+def clone(request):
+    """ Copy of a ``urllib2.Request`` that can be sent alongside the original,
+    the handlers modify the headers of the request they send
+    """
+    duplicate = copy.copy(request)
+    duplicate.headers = dict(request.headers)
+    duplicate.unredirected_hdrs = dict(request.unredirected_hdrs)
+    return duplicate
+
+
+class Race(object):
+    """ Requests sent in parallel for the same answer, the first response (or
+    the last error, if every one of them fails) wins and the responses that
+    arrive after it are closed.  Requests are run with ``submit`` and each
+    holds one of the ``slots`` while it is in flight.
+    """
+    def __init__(self, submit, slots):
+        self.result = None
+        self.running = 0
+        self.started = 0
+        self._submit = submit
+        self._slots = slots
+        self._done = threading.Condition()
+
+    def start(self, send, request, finished):
+        """ Sends the request on a worker, ``finished`` is called with the
+        seconds it took once it succeeds.  Returns ``False`` without sending
+        it when there is no slot free.
+        """
+        if not self._slots.acquire(False):
+            return False
+        with self._done:
+            self.running += 1
+            self.started += 1
+            index = self.started - 1
+        self._submit(self.__run, send, request, finished, index)
+        return True
+
+    def wait(self, timeout=None):
+        """ The winning ``(response, error, index)``, with ``index`` the
+        order the request was started in, ``None`` if there is no winner
+        within ``timeout`` seconds
+        """
+        with self._done:
+            if timeout is None:
+                while self.result is None:
+                    self._done.wait()
+            elif self.result is None:
+                self._done.wait(timeout)
+            return self.result
+
+    def __run(self, send, request, finished, index):
+        started = clock()
+        try:
+            response, error = send(request), None
+            finished(clock() - started)
+        except Exception as err:
+            response, error = None, err
+        finally:
+            self._slots.release()
+
+        with self._done:
+            self.running -= 1
+            if self.result is None and (error is None or not self.running):
+                self.result = (response, error, index)
+                self._done.notify_all()
+                return
+
+        if response is not None:  # lost the race, free up its connection
+            response.close()
+
+
+class Hedge(object):
+    """ Policy for hedging requests.
+
+    :param float delay: seconds to wait on the first request before sending
+        the second one, if not set it is the ``percentile`` of the route's
+        recent latencies
+    :param float percentile: latency percentile used as the delay
+    :param int window: number of recent latencies kept per route
+    :param int min_samples: latencies needed for a route before it is hedged
+        on a learned delay
+    :param methods: methods that are safe to send twice
+    :param int workers: most requests in flight on the shared workers, once
+        they are all busy requests are sent without a hedge
+    :param int max_routes: most routes latencies and counters are kept for,
+        the least recently used one is dropped first
+    :param key: function of a route's URL giving the key its latencies and
+        counters are kept under (i.e. one key for every ``/users/<id>``), the
+        URL itself by default
+    """
+    METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+
+    def __init__(self, delay=None, percentile=95, window=100, min_samples=20,
+                 methods=METHODS, workers=16, max_routes=1000, key=None):
+        self.fixed_delay = delay
+        self.percentile = percentile
+        self.window = window
+        self.min_samples = min_samples
+        self.methods = frozenset(method.upper() for method in methods)
+        self.workers = workers
+        self.max_routes = max_routes
+        self.key = key if key is not None else str
+        self._latencies = OrderedDict()
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers)
+        self._executor = None
+
+    @property
+    def stats(self):
+        """ Counters per route, ``requests`` eligible for hedging, ``hedged``
+        ones that had a second request sent and ``hedge_wins`` where the
+        second one answered first, along with the resulting ``hedge_rate``
+        """
+        with self._lock:
+            return dict((key, self.__summary(counters))
+                        for key, counters in self._counters.items())
+
+    @staticmethod
+    def __summary(counters):
+        summary = dict(counters)
+        summary["hedge_rate"] = float(counters["hedged"]) / \
+            counters["requests"] if counters["requests"] else 0.0
+        return summary
+
+    def eligible(self, request):
+        return request.get_method().upper() in self.methods and \
+            not is_stream(request.data)
+
+    def count(self, key, counter):
+        with self._lock:
+            counters = self.__used(self._counters, key, lambda: {
+                "requests": 0, "hedged": 0, "hedge_wins": 0})
+            counters[counter] += 1
+
+    def record(self, key, seconds):
+        with self._lock:
+            latencies = self.__used(self._latencies, key,
+                                    lambda: deque(maxlen=self.window))
+            latencies.append(seconds)
+
+    def __used(self, table, key, default):
+        # most recently used goes last, the least recently used is dropped
+        value = table.pop(key, None)
+        table[key] = value if value is not None else default()
+        while len(table) > self.max_routes:
+            table.popitem(last=False)
+        return table[key]
+
+    def delay(self, key):
+        """ Seconds to wait on a request to the route before hedging it,
+        ``None`` while too little is known about the route to decide
+        """
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+
+        with self._lock:
+            latencies = sorted(self._latencies.get(key, ()))
+        if len(latencies) < self.min_samples:
+            return None
+        index = int(len(latencies) * self.percentile / 100.0)
+        return latencies[min(index, len(latencies) - 1)]
+
+    def call(self, url, request, send):
+        """ Sends the request with ``send``, sending a copy of it as well if
+        it takes longer than the delay for the route at ``url``.
+        """
+        if not self.eligible(request):
+            return send(request)
+
+        key = self.key(url)
+        self.count(key, "requests")
+        delay = self.delay(key)
+
+        def finished(seconds):
+            self.record(key, seconds)
+
+        race = Race(self.__submit, self._slots)
+        # still learning the latencies of the route or no worker is free
+        if delay is None or not race.start(send, request, finished):
+            started = clock()
+            response = send(request)
+            finished(clock() - started)
+            return response
+
+        result = race.wait(delay)
+        if result is None:
+            if race.start(send, clone(request), finished):
+                self.count(key, "hedged")
+            result = race.wait()
+            if result[2] == 1:
+                self.count(key, "hedge_wins")
+
+        response, error, _ = result
+        if error is not None:
+            raise error
+        return response
+
+    def __submit(self, function, *args):
+        if ThreadPoolExecutor is None:
+            worker = threading.Thread(target=function, args=args)
+            worker.daemon = True
+            worker.start()
+            return
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._executor.submit(function, *args)
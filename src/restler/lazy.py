@@ -0,0 +1,162 @@
+""" Lazily parsed views of decoded response data.  The datatype handlers are
+only run on the values that are actually read and the converted value is
+written back, so reading a couple of fields out of a large document does not
+pay for converting all of it.
+"""
+
+
+def convert(value, handle):
+    """ Wraps nested containers in lazy views and runs the datatype handling
+    function on anything else.
+    """
+    if type(value) is dict:
+        return LazyDict(value, handle)
+    elif type(value) is list:
+        return LazyList(value, handle)
+
+    return handle(value)
+
+
+class LazyDict(dict):
+    """ ``dict`` that converts its values on access.  Stored values stay raw
+    until read, every accessor (including ``dict(...)``, ``update`` and
+    ``**`` unpacking of the view, which copy through the keys and item access
+    since ``__iter__`` is overridden, and ``json.dumps``) sees the converted
+    values.
+    """
+    __slots__ = ("_handle",)
+
+    def __init__(self, data, handle):
+        dict.__init__(self, data)
+        self._handle = handle
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        converted = convert(value, self._handle)
+        if converted is not value:
+            dict.__setitem__(self, key, converted)
+        return converted
+
+    def __iter__(self):
+        # not the `dict` slot, so copies into other dicts read each item
+        return dict.__iter__(self)
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+
+        value = self[key]
+        dict.__delitem__(self, key)
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        return key, convert(value, self._handle)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            dict.__setitem__(self, key, default)
+        return self[key]
+
+    def copy(self):
+        return dict(self.items())
+
+    def __eq__(self, other):
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class LazyList(list):
+    """ ``list`` that converts its elements on access, see
+    :class:`LazyDict <LazyDict>`.
+    """
+    __slots__ = ("_handle",)
+
+    def __init__(self, data, handle):
+        list.__init__(self, data)
+        self._handle = handle
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        value = list.__getitem__(self, index)
+        converted = convert(value, self._handle)
+        if converted is not value:
+            list.__setitem__(self, index, converted)
+        return converted
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reversed__(self):
+        for index in range(len(self) - 1, -1, -1):
+            yield self[index]
+
+    def pop(self, index=-1):
+        value = self[index]
+        list.__delitem__(self, index)
+        return value
+
+    def __contains__(self, value):
+        return any(item == value for item in self)
+
+    def index(self, value, *bounds):
+        return list(self).index(value, *bounds)
+
+    def count(self, value):
+        return list(self).count(value)
+
+    def remove(self, value):
+        del self[self.index(value)]
+
+    def sort(self, *args, **kwargs):
+        for _ in self:  # converts every element
+            pass
+        list.sort(self, *args, **kwargs)
+
+    def __add__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return list(other) + list(self)
+
+    def __mul__(self, times):
+        return list(self) * times
+
+    __rmul__ = __mul__
+
+    def copy(self):
+        return list(self)
+
+    def __eq__(self, other):
+        return list(self) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
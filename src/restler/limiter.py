@@ -0,0 +1,120 @@
+""" Client side rate limiting.  A :class:`RateLimiter <RateLimiter>` is a
+token bucket that spaces requests out evenly at its rate (letting ``burst`` of
+them through back to back), and retunes itself from the rate limit headers
+APIs report so the whole quota gets used without ever running into it.
+"""
+import threading
+import time
+
+try:
+    clock = time.monotonic
+except AttributeError:  # python 2
+    clock = time.time
+
+EPOCH_THRESHOLD = 10 ** 9  # larger reset values are timestamps, not seconds
+REMAINING_HEADERS = ("X-RateLimit-Remaining", "RateLimit-Remaining")
+RESET_HEADERS = ("X-RateLimit-Reset", "RateLimit-Reset")
+
+
+def quota(headers, now=None):
+    """ The ``(remaining, reset_in)`` requests and seconds left in the
+    current rate limit window according to the response headers, ``None`` if
+    they are not reported
+    """
+    remaining = reset = None
+    for name in REMAINING_HEADERS:
+        remaining = remaining or headers.get(name)
+    for name in RESET_HEADERS:
+        reset = reset or headers.get(name)
+    try:
+        remaining, reset = int(remaining), float(reset)
+    except (TypeError, ValueError):
+        return None
+
+    if reset > EPOCH_THRESHOLD:
+        reset -= time.time() if now is None else now
+    return max(remaining, 0), max(reset, 0)
+
+
+class RateLimiter(object):
+    """ Token bucket limiting requests to ``rate`` per second, ``None`` for
+    no limit until the response headers set one.  Requests are reserved a
+    slot in order (so waiting callers are served first come, first served)
+    and wait until it comes up.
+
+    :param float rate: requests per second
+    :param int burst: requests that can go out at once before the rate
+        spacing applies
+    :param bool tune: follow the ``X-RateLimit-Remaining``/``-Reset``
+        headers, spreading the remaining requests evenly over what is left of
+        the window and holding off entirely once none are left
+    """
+    def __init__(self, rate=None, burst=1, tune=True):
+        self.burst = burst
+        self.tune = tune
+        self.clock = clock
+        self.sleep = time.sleep
+        self.requests = 0
+        self.waited = 0.0
+        self._interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0  # when the next request is due if none were saved
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return 1.0 / self._interval if self._interval else None
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "waited": self.waited,
+                    "rate": self.rate}
+
+    def reserve(self):
+        """ Takes the next slot, returns the seconds to wait for it.  Does not
+        block, so it also serves callers that wait their own way (i.e. on an
+        event loop).
+        """
+        now = self.clock()
+        with self._lock:
+            due = max(self._next, now)
+            wait = max(due - (self.burst - 1) * self._interval - now, 0)
+            self._next = due + self._interval
+            self.requests += 1
+            self.waited += wait
+            return wait
+
+    def acquire(self):
+        """ Blocks until the request is allowed to go out
+        """
+        wait = self.reserve()
+        if wait:
+            self.sleep(wait)
+
+    def update(self, remaining, reset_in):
+        """ Retunes to ``remaining`` requests over the next ``reset_in``
+        seconds
+        """
+        now = self.clock()
+        with self._lock:
+            if remaining <= 0:
+                # nothing left until the window resets
+                burst = (self.burst - 1) * self._interval
+                self._next = max(self._next, now + reset_in + burst)
+            elif reset_in > 0:
+                self._interval = float(reset_in) / remaining
+
+    def observe(self, headers):
+        """ Retunes from the headers of a response, if it reports its quota
+        """
+        found = quota(headers) if self.tune else None
+        if found is not None:
+            self.update(*found)
+
+    def call(self, request, send):
+        """ Sends the request with ``send`` once it is allowed to go out
+        """
+        self.acquire()
+        response = send(request)
+        self.observe(response.info())
+        return response
@@ -0,0 +1,200 @@
+""" Iteration over paginated listings that link their pages through the
+``Link`` header (``rel="next"``), pages are fetched ahead in the background so
+the network round trips overlap with consuming the items.  When the listing
+also links its ``rel="last"`` page, the pages in between can be fetched
+concurrently instead.
+"""
+try:
+    from urlparse import urljoin, urlsplit, urlunsplit
+    from Queue import Queue, Empty, Full
+except ImportError:
+    from urllib.parse import urljoin, urlsplit, urlunsplit
+    from queue import Queue, Empty, Full
+import threading
+
+from restler.errors import InvalidURLError
+from restler.url import URL
+from restler.utils import isstr
+
+DONE = object()  # marks the end of the prefetched pages
+
+
+def page_link(response, rel):
+    """ Raw URL of the ``rel`` link of the response, ``None`` if there is no
+    such link
+    """
+    links = response.__dict__.get("links")
+    return links.links.get(rel) if links else None
+
+
+class Paginator(object):
+    """ Iterable over the items of every page of a listing, starting with
+    ``route`` and following each page's ``next`` link.
+
+    :param items: where the items are in a page's data, a key (or sequence of
+        keys) or a function of the response, by default the data itself when
+        it is a list, otherwise the whole page is one item
+    :param int prefetch: number of pages read ahead on a background thread
+        while the current one is consumed, ``0`` fetches them in line
+    :param int max_pages: stop after this many pages
+    :param int max_items: stop after this many items
+    :param int concurrency: if set and the first page links the ``last``
+        page, every page up to it is built by number (the ``page_param`` of
+        the link's query) and fetched with this many requests at a time,
+        pages still come out in order and only a few are fetched ahead
+    :param str page_param: query parameter holding the page number
+    """
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, route, method=None, params=None, items=None,
+                 prefetch=1, max_pages=None, max_items=None,
+                 concurrency=None, page_param="page"):
+        self.route = route
+        self.method = method or route.default_method
+        self.params = params or {}
+        self.items = items
+        self.prefetch = prefetch
+        self.max_pages = max_pages
+        self.max_items = max_items
+        self.concurrency = concurrency
+        self.page_param = page_param
+
+    def __iter__(self):
+        count = 0
+        for page in self.pages():
+            for item in self.extract(page):
+                if self.max_items is not None and count >= self.max_items:
+                    return
+                count += 1
+                yield item
+
+    def extract(self, response):
+        """ The items of a page
+        """
+        if callable(self.items):
+            return self.items(response)
+        elif self.items is None:
+            data = response.data
+            return data if isinstance(data, list) else [data]
+
+        data = response.data
+        for key in ((self.items,) if isstr(self.items) else self.items):
+            data = data[key]
+        return data
+
+    def fetch(self, route, params):
+        return route.__fetch__(route.__build__(self.method, **params))
+
+    def follow(self, url, page=None):
+        """ The route and params for a linked page, the query of the link is
+        passed as params so the shared route's defaults are left untouched.
+        The link is resolved against the URL of the ``page`` it is on (or the
+        paginated route), a link to another host gives ``(None, {})`` as its
+        pages are not sent the base's credentials.
+        """
+        base = self.route.__base__
+        parts = urlsplit(urljoin(page.url if page else str(self.route), url))
+        if (parts.scheme, parts.netloc) != (base.__url__.protocol,
+                                            base.__url__.domain):
+            return None, {}
+
+        route = base[parts.path or "/"]
+        if isstr(route):  # outside of the base's path, not a cached route
+            route = base._route_class(
+                URL(urlunsplit(parts[:3] + ("", ""))), base)
+        return route, URL.translate_query(parts.query)
+
+    def pages(self):
+        """ Iterates over the :class:`Response <Response>` of each page
+        """
+        if self.concurrency:
+            return self.__parallel()
+        elif self.prefetch > 0:
+            return self.__prefetched()
+        return self.__walk(lambda: False)
+
+    def __walk(self, stopped, response=None):
+        route, params = self.route, self.params
+        count = 0
+        while not stopped():
+            if response is None:
+                if self.max_pages is not None and count >= self.max_pages:
+                    return
+                response = self.fetch(route, params)
+            count += 1
+            yield response
+
+            url = page_link(response, "next")
+            if not url:
+                return
+            route, params = self.follow(url, response)
+            if route is None:
+                return
+            response = None
+
+    def __parallel(self):
+        first = self.fetch(self.route, self.params)
+        last = page_link(first, "last")
+        route, query = self.follow(last, first) if last else (None, {})
+        try:
+            current = int(self.params.get(
+                self.page_param,
+                self.route._default_params.get(self.page_param, 1)))
+            last = int(query[self.page_param])
+        except (KeyError, ValueError):
+            # no numbered last page, walk the `next` links instead
+            for response in self.__walk(lambda: False, first):
+                yield response
+            return
+
+        if self.max_pages is not None:
+            last = min(last, current + self.max_pages - 1)
+
+        yield first
+        # the calls are built as `gather` takes them, which only keeps a
+        # couple of pages per worker in flight ahead of the one yielded
+        calls = ((route, self.method, dict(query, **{self.page_param: str(n)}))
+                 for n in range(current + 1, last + 1))
+        base = self.route.__base__
+        for code, response in base.gather(calls, workers=self.concurrency):
+            if code:
+                raise response or InvalidURLError(str(route))
+            yield response
+
+    def __prefetched(self):
+        pages = Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        worker = threading.Thread(target=self.__produce, args=(pages, stop))
+        worker.daemon = True
+        worker.start()
+        try:
+            while True:
+                try:
+                    response, error = pages.get(timeout=self.POLL_INTERVAL)
+                except Empty:
+                    if not worker.is_alive() and pages.empty():
+                        return
+                    continue
+                if error is not None:
+                    raise error
+                if response is DONE:
+                    return
+                yield response
+        finally:
+            stop.set()
+
+    def __produce(self, pages, stop):
+        # runs on the background thread, feeding `__prefetched`
+        try:
+            for response in self.__walk(stop.is_set):
+                self.__put(pages, stop, (response, None))
+        except Exception as err:
+            self.__put(pages, stop, (None, err))
+        self.__put(pages, stop, (DONE, None))
+
+    def __put(self, pages, stop, value):
+        while not stop.is_set():
+            try:
+                return pages.put(value, timeout=self.POLL_INTERVAL)
+            except Full:
+                continue
@@ -0,0 +1,60 @@
+""" Requests built once and sent many times, for polling loops and the like
+that keep sending the same call.  The defaults are merged and the body is
+encoded when the request is prepared, each send only copies the built request
+and applies the few fields that change.
+"""
+from restler.hedge import clone
+from restler.timeout import Timeout
+
+
+class PreparedRequest(object):
+    """ Frozen request for a call to ``route``, as built by
+    :meth:`Route.prepare <Route.prepare>`.  Calling it sends a copy of the
+    request, so it is never changed by the sends (the handlers add their
+    headers to the copy), and returns what calling the route would.
+
+    Each send can override a few fields without preparing the request again:
+    ``headers`` to add or replace, the raw body ``data`` and the ``timeout``
+    and ``deadline`` of the call.
+    """
+    __slots__ = ("route", "request")
+
+    def __init__(self, route, request):
+        data = request.data
+        if isinstance(data, bytearray):  # freeze the encoded body
+            request.data = None  # the setter skips a value equal to the old
+            request.data = bytes(data)
+        self.route = route
+        self.request = request
+
+    @property
+    def method(self):
+        return self.request.get_method()
+
+    @property
+    def url(self):
+        return self.request.get_full_url()
+
+    @property
+    def data(self):
+        return self.request.data
+
+    @property
+    def headers(self):
+        return dict(self.request.header_items())
+
+    def __call__(self, headers=None, data=None, timeout=None, deadline=None):
+        request = clone(self.request)
+        if headers:
+            for name, value in headers.items():
+                request.add_header(name, value)
+        if data is not None:
+            request.data = data
+        if timeout is not None:
+            request.timeouts = Timeout.coerce(timeout)
+        if deadline is not None:
+            request.deadline = deadline
+        return self.route.__submit__(request)
+
+    def __repr__(self):
+        return "<PreparedRequest: {} {}>".format(self.method, self.url)
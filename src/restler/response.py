@@ -3,12 +3,18 @@ try:
 except ImportError:
     import http.client as httplib
 
+from restler.compression import decompressing
+from restler.lazy import convert as lazy_convert
 from restler.utils import isstr, cstrip
 from restler.errors import ServerError, RequestError
 from collections import namedtuple
+import re
 
 
-DatatypeHandler = namedtuple("DatatypeHandler", ['detector', 'handler'])
+DatatypeHandler = namedtuple("DatatypeHandler",
+                             ['detector', 'handler', 'contextual', 'patterns',
+                              'prefixes'])
+NO_MATCH = object()  # context of a value that a datatype does not handle
 
 
 class Response(object):
@@ -20,9 +26,11 @@ class Response(object):
     """
     datatypes = []
     mimetypes = {}
+    iterators = {}
+    _dispatcher = None
 
-    def __init__(self, response, base):
-        self.__base__ = response
+    def __init__(self, response, base, lazy=None, stream=False):
+        self.__base__ = decompressing(response)
         self.__parent__ = base
         self.url = self.__base__.geturl()
         self.headers = self.__base__.info()
@@ -35,32 +43,70 @@ class Response(object):
         elif self.code >= httplib.BAD_REQUEST:
             raise RequestError(self.code, self.__base__.read())
 
-        self.convert()
-        self.data = self.parse(self.data)
+        if lazy is None:
+            lazy = getattr(base, "LAZY_PARSING", False) is True
+        self.__lazy = lazy
+
+        if not stream:  # streamed bodies are left unread for `iter_items`
+            self.convert()
+            self.data = self.lazy(self.data) if lazy else self.parse(self.data)
         self.parse_headers()
 
     @classmethod
-    def add_datatype(cls, datatype, handler):
+    def dispatcher(cls):
+        """ The :class:`Dispatcher <Dispatcher>` compiled from the registered
+        datatypes, it is rebuilt whenever they (or their patterns) change.
+        """
+        dispatcher = cls._dispatcher
+        if dispatcher is None or \
+                dispatcher.signature != Dispatcher.signature_of(cls.datatypes):
+            dispatcher = Dispatcher(cls.datatypes)
+            Response._dispatcher = dispatcher
+
+        return dispatcher
+
+    @classmethod
+    def add_datatype(cls, datatype, handler, contextual=False, patterns=None,
+                     prefixes=None):
         """ Register a new datatype handler for :class:`Response <Response>`
         parsing.  Takes two functions, a detection function that will be used
         to detect if the raw response value is viable to be handled, and a
         handling function which, if the detection is valid, will convert the
         raw response data into the rich datatype.
 
-        :param function datatype: returns a boolean on whether the passed in
-            data is handleable, the signature is `handler(response, value)`
+        :param function datatype: returns whether the passed in data is
+            handleable, the signature is `datatype(response, value)`
         :param function handler: returns the parsed output of the raw input as
             handled by the handling function, it has the same signature as the
-            handler
+            detector
+        :param bool contextual: if set, whatever (truthy) value the detector
+            returned is passed to the handler as a third argument, so the
+            match (i.e. which format was detected) is handed over directly
+            instead of being kept as state between the two calls
+        :param list patterns: optional ``(regex, context)`` pairs that match
+            exactly the values the detector accepts, these are compiled
+            together with every other datatype's patterns into one regex so a
+            value is only scanned once, the context of the matching pair is
+            what a contextual handler receives (patterns may not use numbered
+            backreferences)
+        :param function prefixes: optional alternative to ``patterns``, takes
+            the response and returns the tuple of string prefixes a value has
+            to start with to be handled
+
+        The detector is only called for datatypes that give neither
+        ``patterns`` nor ``prefixes``.
 
         For examples on use, look at :module:`DateHandler <date_handler>` or
         :module:`URLHandler <url_handler>`.
         """
         cls.datatypes.append(DatatypeHandler(detector=datatype,
-                                             handler=handler))
+                                             handler=handler,
+                                             contextual=contextual,
+                                             patterns=patterns,
+                                             prefixes=prefixes))
 
     @classmethod
-    def add_mimetype(cls, mime, handler):
+    def add_mimetype(cls, mime, handler, iterator=None):
         """ Register a new mimetype handler to handle converting the raw data
         string into the represented rich data structure.  Relies entirely on
         the response's reported content type to register the handling function.
@@ -69,21 +115,32 @@ class Response(object):
         :param function handler: handling function that will return the
             structured data representation based on the passed in raw response
             body
+        :param function iterator: optional incremental parser, called with
+            the file-like raw response, a path into the document and a chunk
+            size and yielding the elements of the array found there, used by
+            :meth:`iter_items <iter_items>`
 
         For examples on use, look at :module:`JSONHandler <json_handler>` or
         :module:`FormHandler <form_handler>`
         """
         cls.mimetypes[mime] = handler
+        if iterator:
+            cls.iterators[mime] = iterator
+
+    def mimetype(self):
+        """ The MIMEtype reported in the response's ``Content-Type`` header
+        """
+        try:
+            return self.__base__.info().gettype()
+        except AttributeError:
+            return self.__base__.info().get_content_type()
 
     def convert(self):
         """ Goes through registered MIMEtype strings and attempts to convert
         the raw response body into the structured data based on the handlers
         registered.
         """
-        try:
-            mime = self.__base__.info().gettype()
-        except AttributeError:
-            mime = self.__base__.info().get_content_type()
+        mime = self.mimetype()
         for mimetype, handler in self.mimetypes.items():
             if mimetype == mime:
                 raw = self.__base__.read()
@@ -104,33 +161,50 @@ class Response(object):
         that will convert a string like ``2013-03-12`` into the rich
         ``datetime`` object.
         """
-        # handle is just a function that is mapped against a list
-        def handle(val):
-            for datatype in self.datatypes:
-                if datatype.detector(self, val):
-                    return datatype.handler(self, val)
-
-            return val
-
-        if isinstance(data, list):
-            return list(map(self.parse, data))
-        elif not isinstance(data, dict):
-            return handle(data)
-
-        for key, value in data.items():
-            if isinstance(value, dict):
-                data[key] = self.parse(value)
-                continue
-
-            if isinstance(value, list):
-                data[key] = map(self.parse, value)
-
-            if not isstr(value):
-                continue
-
-            data[key] = handle(value)
-
-        return data
+        handle = self.dispatcher().bind(self)
+        containers = (dict, list)
+
+        def walk(data):
+            if isinstance(data, dict):
+                items = data.items()
+            elif isinstance(data, list):
+                items = enumerate(data)
+            else:
+                return handle(data)
+
+            for key, value in list(items):
+                if isstr(value):
+                    data[key] = handle(value)
+                elif isinstance(value, containers):
+                    walk(value)
+
+            return data
+
+        return walk(data)
+
+    def iter_items(self, path=(), chunk_size=None):
+        """ Incrementally reads the array at ``path`` in the body (a key or
+        sequence of keys and indexes, empty for a top level array) and yields
+        each element already run through the datatype handlers, the body is
+        never held in memory as a whole.  Only usable on a response that was
+        created with ``stream`` set and has a MIMEtype with a registered
+        iterator.
+        """
+        mime = self.mimetype()
+        if mime not in self.iterators:
+            raise ValueError("No iterator registered for " + mime)
+
+        options = {"chunk_size": chunk_size} if chunk_size else {}
+        convert = self.lazy if self.__lazy else self.parse
+        for item in self.iterators[mime](self.__base__, path, **options):
+            yield convert(item)
+
+    def lazy(self, data):
+        """ Lazy alternative to :meth:`parse <parse>`, wraps the data
+        structure in ``dict``/``list`` views that only convert the values that
+        are read (and remember the result).
+        """
+        return lazy_convert(data, self.dispatcher().bind(self))
 
     def parse_headers(self):
         """ Goes through the list of headers on the response and converts known
@@ -170,6 +244,92 @@ class Response(object):
         return self.code < httplib.BAD_REQUEST
 
 
+class Dispatcher(object):
+    """ Single pass matcher for the registered datatypes.  Every datatype
+    that registered ``patterns`` gets a group in one combined alternation
+    regex (in registration order), so one ``match`` call tells which of them,
+    if any, claims a string.  Datatypes with ``prefixes`` are checked with a
+    single ``startswith`` and only the remaining ones fall back to calling
+    their detector.
+    """
+    def __init__(self, datatypes):
+        self.datatypes = list(datatypes)
+        self.signature = Dispatcher.signature_of(self.datatypes)
+        self.owners = {}
+
+        alternatives = []
+        for position, datatype in enumerate(self.datatypes):
+            for matcher, context in datatype.patterns or ():
+                name = "dt{}".format(len(alternatives))
+                alternatives.append("(?P<{}>{})".format(
+                    name, getattr(matcher, "pattern", matcher)))
+                self.owners[name] = (position, context)
+
+        self.matcher = None
+        if alternatives:
+            self.matcher = re.compile("|".join(alternatives))
+            # `lastindex` of a match is the outermost group, i.e. the pattern
+            self.owners = dict((self.matcher.groupindex[name], owner)
+                               for name, owner in self.owners.items())
+
+    @staticmethod
+    def context(response, value, datatype, prefixes, owned, owned_context):
+        """ The match context of a value for a datatype, ``NO_MATCH`` if it
+        is not of that type.  ``prefixes`` is ``None`` for pattern based
+        datatypes (where ``owned`` tells if the combined pattern matched one
+        of theirs) and ``False`` for ones using their detector.
+        """
+        if prefixes is None:
+            return owned_context if owned else NO_MATCH
+        elif prefixes is not False:
+            return True if value.startswith(prefixes) else NO_MATCH
+
+        context = datatype.detector(response, value)
+        return context if context else NO_MATCH
+
+    @staticmethod
+    def signature_of(datatypes):
+        return tuple((id(datatype), len(datatype.patterns)
+                      if datatype.patterns is not None else -1)
+                     for datatype in datatypes)
+
+    def bind(self, response):
+        """ Builds the function that converts a single value for the
+        response, prefixes are resolved once here rather than per value.
+        """
+        checks = []
+        for datatype in self.datatypes:
+            if datatype.patterns is not None:
+                checks.append((datatype, None))
+            elif datatype.prefixes is not None:
+                checks.append((datatype, tuple(datatype.prefixes(response))))
+            else:
+                checks.append((datatype, False))
+        matcher = self.matcher
+        owners = self.owners
+
+        def handle(value):
+            if not isstr(value):
+                return value
+
+            match = matcher.match(value) if matcher else None
+            owner = owners[match.lastindex] if match else (None, None)
+            for position, (datatype, prefixes) in enumerate(checks):
+                context = Dispatcher.context(response, value, datatype,
+                                             prefixes, owner[0] == position,
+                                             owner[1])
+                if context is NO_MATCH:
+                    continue
+
+                if datatype.contextual:
+                    return datatype.handler(response, value, context)
+                return datatype.handler(response, value)
+
+            return value
+
+        return handle
+
+
 class Links(object):
     """ Rich representation of the ``Link`` Header field.
     """
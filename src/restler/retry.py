@@ -0,0 +1,162 @@
+""" Retrying of failed requests.  A :class:`Retry <Retry>` policy resends
+idempotent requests that failed to connect or were answered with a transient
+error status, backing off exponentially with full jitter (or as long as the
+server's ``Retry-After`` asks for), and draws every retry from a
+:class:`RetryBudget <RetryBudget>` so that retries can only add a bounded
+fraction on top of the regular traffic while an upstream is struggling.
+"""
+from email.utils import parsedate_tz, mktime_tz
+import random
+import threading
+import time
+
+from restler.body import is_stream
+from restler.errors import InvalidURLError
+
+
+class RetryBudget(object):
+    """ Allowance of retries shared by every request made under a policy.
+    Each request adds ``ratio`` of a retry to the balance, each retry takes a
+    whole one, and the balance never goes over ``reserve`` (which is also what
+    it starts at), so a long healthy stretch does not bank up a flood of
+    retries.
+
+    :param float ratio: retries allowed per request
+    :param int reserve: retries available before any traffic, and the most
+        that can be saved up
+    """
+    def __init__(self, ratio=0.2, reserve=10):
+        self.ratio = ratio
+        self.reserve = reserve
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+        self._balance = float(reserve)
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "retries": self.retries,
+                    "rejected": self.rejected, "balance": self._balance}
+
+    def deposit(self):
+        with self._lock:
+            self.requests += 1
+            self._balance = min(self._balance + self.ratio, self.reserve)
+
+    def withdraw(self):
+        """ Takes a retry out of the budget, ``False`` if there is none left
+        """
+        with self._lock:
+            if self._balance < 1:
+                self.rejected += 1
+                return False
+            self._balance -= 1
+            self.retries += 1
+            return True
+
+
+def retry_after(value, now=None):
+    """ Seconds to wait according to a ``Retry-After`` header value, either
+    a number of seconds or an HTTP date, ``None`` if it is not set or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(mktime_tz(date) - (time.time() if now is None else now), 0)
+
+
+class Retry(object):
+    """ Policy for resending failed requests.
+
+    :param int total: most retries made for one request
+    :param float backoff: base delay in seconds, the ``n``-th retry waits a
+        random time up to ``backoff * 2 ** n`` (capped at ``max_backoff``)
+    :param methods: methods that are safe to resend, the idempotent ones by
+        default
+    :param statuses: response codes that are retried
+    :param float max_retry_after: longest ``Retry-After`` honoured, a server
+        asking for more is not retried
+    :param budget: the :class:`RetryBudget <RetryBudget>` the retries are
+        drawn from, each policy has its own by default
+    """
+    METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"])
+    STATUSES = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, total=3, backoff=0.1, max_backoff=10, methods=METHODS,
+                 statuses=STATUSES, max_retry_after=60, budget=None):
+        self.total = total
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.methods = frozenset(method.upper() for method in methods)
+        self.statuses = frozenset(statuses)
+        self.max_retry_after = max_retry_after
+        self.budget = budget if budget is not None else RetryBudget()
+        self.sleep = time.sleep
+        self.random = random.random
+
+    def delay(self, attempt, headers=None):
+        """ Seconds to wait before retry number ``attempt`` (from ``0``),
+        ``None`` if the server asked to wait longer than allowed
+        """
+        wait = retry_after(headers.get("Retry-After")) if headers else None
+        if wait is not None:
+            return wait if wait <= self.max_retry_after else None
+
+        # full jitter, anywhere between nothing and the exponential backoff
+        return self.random() * min(self.max_backoff,
+                                   self.backoff * 2 ** attempt)
+
+    def plan(self, request, attempt, response=None):
+        """ Decides on retrying a request after its ``attempt``-th try failed,
+        with ``response`` the raw response if one came back.  Returns the
+        seconds to wait first, or ``None`` to give up.
+        """
+        if attempt >= self.total or \
+                request.get_method().upper() not in self.methods:
+            return None
+        if is_stream(request.data):  # read while it was sent
+            return None
+        if response is not None and response.getcode() not in self.statuses:
+            return None
+
+        delay = self.delay(attempt, response.info()
+                           if response is not None else None)
+        deadline = getattr(request, "deadline", None)
+        if delay is None or \
+                (deadline is not None and deadline.remaining() <= delay):
+            return None
+        if not self.budget.withdraw():
+            return None
+        return delay
+
+    def call(self, request, send):
+        """ Sends the request with ``send`` (which returns the raw response
+        and raises :class:`InvalidURLError <InvalidURLError>` when no response
+        came back), retrying it while the policy allows.
+        """
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                response = send(request)
+            except InvalidURLError:
+                delay = self.plan(request, attempt)
+                if delay is None:
+                    raise
+            else:
+                delay = self.plan(request, attempt, response)
+                if delay is None:
+                    return response
+                response.close()
+
+            self.sleep(delay)
+            attempt += 1
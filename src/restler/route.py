@@ -2,12 +2,44 @@ try:
     import urllib2
 except ImportError:
     import urllib.request as urllib2
-    from functools import reduce
 
+from restler.body import is_body, length
+from restler.compression import compress
+from restler.limiter import RateLimiter
+from restler.paging import Paginator
+from restler.prepared import PreparedRequest
 from restler.response import Response
 from restler.utils import isstr, to_urlstr
-from restler.errors import ERRORS, InvalidURLError, ServerError, RequestError
+from restler.errors import InvalidURLError, ServerError, RequestError, \
+    RequestTimeoutError, error_result
+from restler.timeout import Timeout, limits
+from collections import OrderedDict
+from functools import partial
 import json
+import socket
+import sys
+import threading
+import weakref
+
+
+class Shared(object):
+    """ Route setting that lives on the class, shared by every route (and
+    forwarded by the :class:`Builder <Builder>`), until a route is given its
+    own value, which is kept in the route's ``slot``.
+    """
+    def __init__(self, slot, value):
+        self.slot = slot
+        self.value = value
+
+    def __get__(self, route, owner=None):
+        if route is None:
+            return self.value
+        own = getattr(route, self.slot)
+        return self.value if own is None else own
+
+    def __set__(self, route, value):
+        setattr(route, self.slot, value)
+        route.__retain__()
 
 
 class Route(object):
@@ -29,17 +61,26 @@ class Route(object):
         { users: [ { username: "jdost" } ] }
 
     """
-    _default_params = {}
-    _default_headers = []
+    # routes are cached by the thousand, keep them free of a `__dict__`
+    __slots__ = ("__path__", "__base__", "__response_class",
+                 "default_method", "_params", "_own_headers", "_own_retry",
+                 "_own_hedge", "__weakref__")
+    _default_params = Shared("_params", {})
+    _default_headers = Shared("_own_headers", [])
+    # retry policy, falls back to the `Restler` one
+    _retry = Shared("_own_retry", None)
+    # hedging policy, falls back to the `Restler` one
+    _hedge = Shared("_own_hedge", None)
     TRAILING_SLASH = False
 
     def __init__(self, url, base, default="GET"):
+        self.__path__ = url
+        self.__base__ = base
+        self._own_headers = self._own_retry = self._own_hedge = None
         self._default_params = Route._default_params.copy()
         if url.query:
             self.add_params(**url.query)
 
-        self.__path__ = url
-        self.__base = base
         self.__response_class = Response
         self.default_method = default
 
@@ -49,20 +90,249 @@ class Route(object):
         collisions.
         """
         self._default_params.update(params)
+        self.__retain__()
+
+    def __settings__(self):
+        """ The route's default method, params, headers and policies, a route
+        built for the same URL starts with the same ones unless they were
+        changed on this one
+        """
+        return (self.default_method, self._default_params,
+                self._default_headers, self._retry, self._hedge)
+
+    def __retain__(self):
+        # settings given to a route the `Builder` dropped put it back, pinned
+        builder = getattr(self.__base__, "_route", None)
+        if builder is not None:
+            builder.retain(self)
 
     def __call__(self, method=None, *args, **kwargs):
         method = method if isinstance(method, str) else self.default_method
-        return self.__request__(method=method, *args, **kwargs)
+        return self.__request__(method, *args, **kwargs)
 
     def __request__(self, method, headers={}, *args, **kwargs):
         """ Makes a request to the represented URL of the object.  The method
         passed in will be used for the request and the rest of the arguments
         will be used to attempt to build the request body/data.
         """
+        request = self.__build__(method, headers, *args, **kwargs)
+        return self.__submit__(request)
+
+    def __submit__(self, request):
+        """ Sends a built request, returning the :class:`Response <Response>`
+        or, with ``EXCEPTION_THROWING`` off, the result tuple.
+        """
+        if self.__base__.__test__:
+            return request
+
+        try:
+            response = self.__fetch__(request)
+        except (InvalidURLError, RequestError, ServerError) as err:
+            if self.__base__.EXCEPTION_THROWING:
+                raise err
+            return error_result(err)
+
+        if not self.__base__.EXCEPTION_THROWING:
+            return 0, response
+        return response
+
+    def __fetch__(self, request, stream=False):
+        """ Sends the built request and wraps the result in a
+        :class:`Response <Response>`, always raising on failures regardless of
+        the ``EXCEPTION_THROWING`` setting.
+        """
+        def build(response):
+            try:
+                return self.__response_class(response, self.__base__,
+                                             stream=stream)
+            except socket.timeout:
+                raise RequestTimeoutError(str(self))
+
+        def fetch(request):
+            cache = self.__base__.__cache__
+            if cache is not None and not stream:
+                return cache.fetch(request, self.__send__, build,
+                                   self.__credentials__(request),
+                                   self.__base__.__opener__.addheaders)
+            return build(self.__send__(request))
+
+        flights = self.__base__.__flights__
+        if flights is not None and not stream:
+            return flights.fetch(request, fetch)
+
+        return fetch(request)
+
+    def __credentials__(self, request):
+        """ What the base's token or auth handler will authorize the request
+        with, ``None`` if neither does
+        """
+        token = self.__base__.__token__
+        if token is not None:
+            return token.header(token.token())
+        auth = self.__base__.__auth__
+        if auth is not None:
+            username, password = auth.credentials(request.get_full_url())
+            if username is not None:
+                return "{}:{}".format(username, password)
+        return None
+
+    def __send__(self, request):
+        """ Opens the request through the base's opener, HTTP error statuses
+        are returned as the raw response (for :class:`Response <Response>` to
+        raise on) rather than raised.  Failures are retried as the route's (or
+        else the base's) :class:`Retry <Retry>` policy allows.
+        """
+        send = self.__open__
+        limiter = self.__limiter__()
+        if limiter:
+            send = partial(limiter.call, send=send)
+        hedge = self.__policy__("hedge")
+        if hedge:
+            send = partial(hedge.call, str(self), send=send)
+
+        retry = self.__policy__("retry")
+        if retry:
+            return retry.call(request, send)
+        return send(request)
+
+    def __limiter__(self):
+        """ The :class:`RateLimiter <RateLimiter>` of the closest route up the
+        path that has one, else the base's
+        """
+        builder = getattr(self.__base__, "_route", None)
+        limiter = builder.limiter(self.__path__) if builder else None
+        if limiter is not None:
+            return limiter
+        return getattr(self.__base__, "__limiter__", None)
+
+    def rate_limit(self, limiter):
+        """ Limits the requests to this route and every route under it with
+        the :class:`RateLimiter <RateLimiter>` (or requests per second),
+        instead of the base's limiter.  Returns the limiter.
+
+        Usage::
+
+            >> github.search.rate_limit(30 / 60.0)
+
+        """
+        if not isinstance(limiter, RateLimiter):
+            limiter = RateLimiter(limiter)
+        self.__base__._route.limit(self.__path__, limiter)
+        return limiter
+
+    def __policy__(self, name):
+        """ The ``retry`` or ``hedge`` policy requests to this route follow,
+        the route's own or else the base's
+        """
+        policy = getattr(self, "_" + name)
+        if policy is not None:
+            return policy
+        return getattr(self.__base__, "__{}__".format(name), None)
+
+    def __open__(self, request):
+        try:
+            limit = [t for t in limits(request) if t is not None]
+            # only used by handlers that do not read `request.timeouts`
+            options = {"timeout": max(limit)} if limit else {}
+            return self.__base__.__opener__.open(request, **options)
+        except urllib2.HTTPError as err:
+            return err
+        except urllib2.URLError as err:
+            if isinstance(err.reason, socket.timeout):
+                raise RequestTimeoutError(str(self))
+            raise InvalidURLError(str(self))
+        except socket.timeout:
+            raise RequestTimeoutError(str(self))
+
+    def prepare(self, method=None, headers={}, *args, **kwargs):
+        """ Builds the request for a call once, taking the same arguments as
+        calling the route, and returns it as a :class:`PreparedRequest
+        <PreparedRequest>` that can be sent any number of times without
+        merging the defaults and encoding the body again.
+
+        Usage::
+
+            >> poll = api.jobs["1234"].prepare(fields="status")
+            >> while poll().data["status"] == "running":
+            ..     time.sleep(1)
+
+        """
+        method = method if isinstance(method, str) else self.default_method
+        request = self.__build__(method, headers, *args, **kwargs)
+        return PreparedRequest(self, request)
+
+    def stream(self, method=None, path=(), *args, **kwargs):
+        """ Makes the request like calling the route does, but instead of
+        reading the whole body, returns an iterator over the elements of the
+        array at ``path`` in the response (see :meth:`Response.iter_items
+        <Response.iter_items>`), parsed as they arrive off the wire.
+
+        Usage::
+
+            >> for event in api.export.stream(path=("data", "events")):
+            ..     handle(event)
+
+        """
+        method = method if isinstance(method, str) else self.default_method
+        request = self.__build__(method, *args, **kwargs)
+
+        if self.__base__.__test__:
+            return request
+
+        try:
+            response = self.__fetch__(request, stream=True)
+        except (InvalidURLError, RequestError, ServerError) as err:
+            if self.__base__.EXCEPTION_THROWING:
+                raise err
+            return error_result(err)
+
+        return self.__timed(response.iter_items(path))
+
+    def __timed(self, items):
+        # the body is read as it is iterated, past the request's own handling
+        try:
+            for item in items:
+                yield item
+        except socket.timeout:
+            raise RequestTimeoutError(str(self))
+
+    def __build__(self, method, headers={}, *args, **kwargs):
+        """ Builds the ``urllib2.Request`` for a call to the represented URL,
+        merging in the default headers and params and encoding the body.  The
+        ``_timeout`` and ``_deadline`` keywords set the time limits of the
+        request instead of being sent as params.  Without params, a string or
+        raw body (bytes or another buffer, a file or an iterator of chunks)
+        given after the method (or the headers) is sent as the body.
+        """
+        if not hasattr(headers, "items"):  # the body was given right away
+            headers, args = {}, (headers,) + args
+        timeout = Timeout.coerce(kwargs.pop("_timeout", None))
+        deadline = kwargs.pop("_deadline", None)
         headers = dict(self._default_headers + list(headers.items()))
 
-        params = dict(list(self._default_params.items()) +
-                      list(kwargs.items()))
+        params = dict(self._default_params, **kwargs)
+        if not len(params) and len(args) > 0 and is_body(args[0]):
+            data, params = self.__raw_body(args[0], headers), ""
+        else:
+            params = self.__encode(params, headers, args)
+            # Use the query string for GET ?
+            data = self.__compress(bytearray(params, 'utf-8'), method,
+                                   headers)
+
+        if method.upper() == 'GET' and len(params):
+            request = urllib2.Request(
+                "?".join([str(self), params]), data=data, headers=headers)
+        else:
+            request = urllib2.Request(str(self), data=data, headers=headers)
+
+        request.get_method = lambda: method.upper()
+        request.timeouts = timeout if timeout is not None \
+            else getattr(self.__base__, "__timeout__", None)
+        request.deadline = deadline
+        return request
+
+    @staticmethod
+    def __encode(params, headers, args):
         if len(params):
             default_MIME = "application/x-www-form-urlencoded"
             if headers.setdefault("Content-type", default_MIME) == \
@@ -77,56 +347,85 @@ class Route(object):
             if len(args) > 0 and isstr(args[0]):
                 params = args[0]
                 headers.setdefault("Content-type", "text/plain")
-
-        # Use the query string for GET ?
-        if method.upper() == 'GET' and len(params):
-            request = urllib2.Request(
-                "?".join([str(self), params]),
-                data=bytearray(params, 'utf-8'), headers=headers)
+        return params
+
+    def __compress(self, data, method, headers):
+        threshold = getattr(self.__base__, "__compress__", None)
+        if threshold is not None and len(data) >= threshold and \
+                method.upper() != 'GET' and \
+                "content-encoding" not in [k.lower() for k in headers]:
+            data = bytearray(compress(data))
+            headers["Content-encoding"] = "gzip"
+        return data
+
+    @staticmethod
+    def __raw_body(body, headers):
+        # buffers, files and iterators are sent as they are, see `body.send`
+        headers.setdefault("Content-type", "application/octet-stream")
+        size = length(body)
+        if size is None:
+            headers.setdefault("Transfer-encoding", "chunked")
         else:
-            request = urllib2.Request(
-                str(self), data=bytearray(params, 'utf-8'),
-                headers=headers)
-
-        request.get_method = lambda: method.upper()
-
-        if self.__base.__test__:
-            return request
-
-        try:
-            response = self.__base.__opener__.open(request)
-            return self.__response__(response)
-        except urllib2.URLError:
-            if self.__base__.EXCEPTION_THROWING:
-                raise InvalidURLError(str(self))
-            else:
-                return (ERRORS["InvalidURL"], None)
+            headers.setdefault("Content-length", str(size))
+        return body
 
     def __response__(self, response):
         """ Response handler, takes a raw response body and attempts to build
         a :class:`Response <Response>` object with the returned data.
         """
         try:
-            response = self.__response_class(response, self.__base)
-            if not self.__base.EXCEPTION_THROWING:
-                return 0, response
-            return response
-        except ServerError as err:
-            if self.__base.EXCEPTION_THROWING:
-                raise err
-            else:
-                return (ERRORS["ServerError"], err)
-        except RequestError as err:
-            if self.__base.EXCEPTION_THROWING:
+            response = self.__response_class(response, self.__base__)
+        except (RequestError, ServerError) as err:
+            if self.__base__.EXCEPTION_THROWING:
                 raise err
-            else:
-                return (ERRORS["RequestError"], err)
+            return error_result(err)
+
+        if not self.__base__.EXCEPTION_THROWING:
+            return 0, response
+        return response
+
+    def map(self, suffixes, method=None, params=None, **options):
+        """ Calls the child route for each of the path ``suffixes`` (i.e. ids)
+        concurrently, see :meth:`Restler.gather <Restler.gather>` for the
+        ``workers`` and ``ordered`` options and how results are reported.
+
+        Usage::
+
+            >> for code, user in github.users.map(user_ids):
+            ..     print(user.login)
+
+        """
+        params = params or {}
+        return self.__base__.gather(
+            ((self[str(suffix)], method, params) for suffix in suffixes),
+            **options)
+
+    def paginate(self, method=None, params=None, **options):
+        """ Iterates over the items of every page of the listing at this
+        route, following the ``rel="next"`` link of each page's ``Link``
+        header and fetching the next page in the background while the current
+        one is consumed.  See :class:`Paginator <Paginator>` for the
+        ``items``, ``prefetch``, ``max_pages``, ``max_items``,
+        ``concurrency`` and ``page_param`` options.  In test mode the built
+        request for the first page is returned instead.
+
+        Usage::
+
+            >> for repo in github.users.jdost.repos.paginate(max_items=50):
+            ..     print(repo["name"])
+
+        """
+        if self.__base__.__test__:
+            method = method if isinstance(method, str) else self.default_method
+            return self.__build__(method, **(params or {}))
+        return Paginator(self, method, params, **options)
 
     @classmethod
     def copy(cls):
         class RouteClone(cls):
-            _default_params = {}
-            _default_headers = []
+            __slots__ = ()
+            _default_params = Shared("_params", {})
+            _default_headers = Shared("_own_headers", [])
             TRAILING_SLASH = False
 
         return RouteClone
@@ -149,16 +448,13 @@ class Route(object):
             <Route: http://myweb.app/users/test/>
 
         """
-        if attr in self.__dict__:
-            return self.__dict__[attr]
-
         return self.__getitem__(attr)
 
     def __getitem__(self, item):
         if item.startswith('/'):
-            return self.__base[item]
+            return self.__base__[item]
 
-        return self.__base.__get_path__(self.__path__ + item)
+        return self.__base__.__get_path__(self.__path__ + item)
 
     def __repr__(self):
         return '<Route: {!s}>'.format(self.__path__)
@@ -173,7 +469,7 @@ class Route(object):
         return str(self) != str(other)
 
     def __hash__(self):
-        return reduce(lambda s, x: s ^ ord(x), str(self), 0)
+        return hash(self.__path__)
 
 
 class Builder(object):
@@ -182,25 +478,98 @@ class Builder(object):
     to be generated.  Handles normalization of the URL, caches references to
     previously generated :class:`Route <Route>` objects, allowing for default
     overrides to carry forward to referencing the route again.
+
+    With a ``size``, at most that many routes are cached and the least
+    recently used one is dropped to make room for a new one.  The base route
+    and routes whose settings differ from those of a newly built route (see
+    :meth:`Route.__settings__ <Route.__settings__>`) are pinned instead and
+    never dropped, nor counted against the ``size``.  A dropped route that is
+    still referenced is handed out again for its URL, and put back (pinned)
+    if it is given settings.
     """
     BASE_ATTRIBUTE_FORWARDING = ["_default_headers", "_default_params"]
 
-    def __init__(self, base, build_class=Route):
+    def __init__(self, base, build_class=Route, size=None):
         self.lookup = {}
+        self.size = size
+        self.evictions = 0
+        self._recent = OrderedDict()  # paths of unpinned routes, oldest first
+        self._pinned = set()
+        self._dropped = weakref.WeakValueDictionary()  # still referenced
+        self._lock = threading.Lock()
         self._build_class = build_class
         for attribute in self.BASE_ATTRIBUTE_FORWARDING:
             self.__dict__[attribute] = getattr(self._build_class, attribute)
         self.base = base
 
-    def __call__(self, url, query=None):
+    def limit(self, url, limiter):
+        """ Attaches a rate limiter to the URL's node of the lookup, routes
+        at or under it are limited by it
+        """
+        with self._lock:
+            current_lookup = self.lookup
+            for level in url.path:
+                current_lookup = current_lookup.setdefault(level, {})
+            current_lookup["__limiter__"] = limiter
+
+    def limiter(self, url):
+        """ The rate limiter attached closest to the URL up its path
+        """
         current_lookup = self.lookup
+        limiter = current_lookup.get("__limiter__")
         for level in url.path:
-            current_lookup = current_lookup.setdefault(level, {})
+            current_lookup = current_lookup.get(level)
+            if current_lookup is None:
+                break
+            limiter = current_lookup.get("__limiter__", limiter)
+        return limiter
+
+    def memory(self):
+        """ Report on the route cache, the trie ``nodes``, cached ``routes``
+        (``pinned`` ones among them), ``evictions`` so far and a rough count
+        of the ``bytes`` it all takes up
+        """
+        with self._lock:
+            nodes = routes = pinned = size = 0
+            pending = [self.lookup]
+            while pending:
+                node = pending.pop()
+                nodes += 1
+                size += sys.getsizeof(node)
+                for key, value in node.items():
+                    if key == "__route__":
+                        routes += 1
+                        pinned += self.__pinned(value)
+                        size += self.__route_size(value)
+                    elif key != "__limiter__":
+                        size += sys.getsizeof(key)
+                        pending.append(value)
+
+            return {"nodes": nodes, "routes": routes,
+                    "pinned": pinned, "evictions": self.evictions,
+                    "bytes": size}
+
+    @staticmethod
+    def __route_size(route):
+        # the path levels are the trie keys, already counted with the nodes
+        url = route.__path__
+        return sum(sys.getsizeof(part) for part in (
+            route, url, url.path, url.query, route._default_params))
 
-        route = current_lookup.get("__route__")
-        if not route:
-            route = self._build_class(url, self.base)
-            current_lookup["__route__"] = route
+    def __call__(self, url, query=None):
+        with self._lock:  # routes are shared between threads
+            current_lookup = self.lookup
+            for level in url.path:
+                current_lookup = current_lookup.setdefault(level, {})
+
+            route = current_lookup.get("__route__")
+            if not route:
+                route = self._dropped.pop(url.path, None)
+                if route is None:
+                    route = self._build_class(url, self.base)
+                current_lookup["__route__"] = route
+            if self.size is not None:
+                self.__used(url.path)
 
         if url.query:
             route.add_params(**url.query)
@@ -208,3 +577,54 @@ class Builder(object):
             route.add_params(**query)
 
         return route
+
+    def retain(self, route):
+        """ Puts the route back in the cache if it was dropped from it, pinned
+        so the settings it was given are not lost with it
+        """
+        path = route.__path__.path
+        if self._dropped.get(path) is not route:
+            return  # cached or never was (i.e. built from a template)
+        with self._lock:
+            if self._dropped.pop(path, None) is not route:
+                return
+            current_lookup = self.lookup
+            for level in path:
+                current_lookup = current_lookup.setdefault(level, {})
+            current_lookup.setdefault("__route__", route)
+            self._recent.pop(path, None)
+            self._pinned.add(path)
+
+    def __pinned(self, route):
+        url = route.__path__
+        if url.path == self.base.__url__.path:
+            return True
+        fresh = self._build_class(url, self.base)
+        return route.__settings__() != fresh.__settings__()
+
+    def __used(self, path):
+        if path in self._pinned:
+            return
+        self._recent.pop(path, None)
+        self._recent[path] = True
+        while len(self._recent) > self.size:
+            self.__evict(self._recent.popitem(last=False)[0])
+
+    def __evict(self, path):
+        trail = [self.lookup]
+        for level in path:
+            trail.append(trail[-1][level])
+
+        route = trail[-1]["__route__"]
+        if self.__pinned(route):
+            self._pinned.add(path)
+            return
+        del trail[-1]["__route__"]
+        self._dropped[path] = route
+        self.evictions += 1
+
+        # prune the nodes left empty, keeping the ones with a limiter
+        for depth in range(len(path), 0, -1):
+            if trail[depth]:
+                break
+            del trail[depth - 1][path[depth - 1]]
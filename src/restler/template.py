@@ -0,0 +1,76 @@
+""" Precompiled route templates, a path like ``/users/{uid}/repos`` is parsed
+once and each call fills in the placeholders and builds the route directly,
+skipping the attribute chain, the path parsing and the route cache that
+building the same route hop by hop goes through.
+"""
+try:
+    from urllib import quote
+except ImportError:
+    from urllib.parse import quote
+from string import Formatter
+
+from restler.url import URL
+
+
+class Template(object):
+    """ Route path with ``{name}`` placeholders under the ``base``
+    :class:`Restler <Restler>`, relative to its URL (a leading ``/`` is
+    ignored).  Placeholder values are quoted, so a value is always a single
+    level of the path.  A query string in the template becomes default params
+    of the routes built from it.
+
+    Routes built from a template are not cached, so they do not pick up
+    settings made on the cached route of the same path (i.e. ``add_params``).
+
+    Usage::
+
+        >> repos = github.template("/users/{user}/repos")
+        >> repos(user="jdost", type="owner")
+        <Response: https://api.github.com/users/jdost/repos>
+
+    """
+    def __init__(self, base, path):
+        self.base = base
+        self.path = path
+        levels, self.query = URL.split(path)
+        self.fields = set()
+        # each level is a string as is or, with placeholders, the fields in it
+        self.levels = []
+        for level in levels:
+            fields = [field for _, field, _, _ in Formatter().parse(level)
+                      if field is not None]
+            self.levels.append((level, fields))
+            self.fields.update(fields)
+
+    def url(self, **values):
+        """ The :class:`URL <URL>` with the placeholders filled in
+        """
+        missing = self.fields.difference(values)
+        if missing:
+            raise KeyError("no value for " + ", ".join(sorted(missing)))
+
+        quoted = dict((name, quote(str(value), safe=""))
+                      for name, value in values.items())
+        return self.base.__url__.child([level.format(**quoted) if fields
+                                        else level
+                                        for level, fields in self.levels])
+
+    def route(self, **values):
+        """ The :class:`Route <Route>` with the placeholders filled in
+        """
+        route = self.base._route_class(self.url(**values), self.base)
+        if self.query:
+            route.add_params(**self.query)
+        return route
+
+    def __call__(self, method=None, *args, **kwargs):
+        """ Makes a request to the route, the placeholders are filled in from
+        the keyword arguments of the same name and the others are passed on
+        as for calling the route.
+        """
+        values = dict((name, kwargs.pop(name)) for name in self.fields
+                      if name in kwargs)
+        return self.route(**values)(method, *args, **kwargs)
+
+    def __repr__(self):
+        return "<Template: {!s}/{}>".format(self.base, self.path.lstrip("/"))
@@ -0,0 +1,103 @@
+""" Request time limits, a :class:`Timeout <Timeout>` bounds connecting and
+each wait on the socket separately while a :class:`Deadline <Deadline>` is a
+time budget for a whole chain of requests (redirects, retries or calls made
+one after the other) that shrinks as it is spent.
+"""
+import numbers
+import socket
+import time
+
+try:
+    clock = time.monotonic
+except AttributeError:  # python 2
+    clock = time.time
+
+
+class Timeout(object):
+    """ Seconds allowed to establish a connection (``connect``) and to wait
+    on any single read of the response (``read``), ``None`` for no limit.
+    """
+    __slots__ = ("connect", "read")
+
+    def __init__(self, connect=None, read=None):
+        self.connect = connect
+        self.read = read
+
+    @classmethod
+    def coerce(cls, value):
+        """ Builds the timeout from a number of seconds (used for both
+        limits), a ``(connect, read)`` pair or a timeout, ``None`` stays
+        ``None``.
+        """
+        if value is None or isinstance(value, cls):
+            return value
+        limit = value if isinstance(value, tuple) else (value, value)
+        if len(limit) != 2 or not all(map(_seconds, limit)):
+            raise TypeError("timeout should be seconds, a (connect, read) "
+                            "pair or a Timeout, not {!r}".format(value))
+        return cls(*limit)
+
+    def __eq__(self, other):
+        return isinstance(other, Timeout) and \
+            (self.connect, self.read) == (other.connect, other.read)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Timeout(connect={!r}, read={!r})".format(self.connect,
+                                                         self.read)
+
+
+def _seconds(value):
+    return value is None or isinstance(value, numbers.Real) \
+        and not isinstance(value, bool)
+
+
+class Deadline(object):
+    """ Point in time by which a chain of requests has to be done, built from
+    the number of ``seconds`` left.  Pass the same deadline to every call in
+    the chain, each one is limited to what remains of it.
+    """
+    __slots__ = ("expires",)
+
+    def __init__(self, seconds):
+        self.expires = clock() + seconds
+
+    def remaining(self):
+        return max(self.expires - clock(), 0)
+
+    @property
+    def expired(self):
+        return self.expires <= clock()
+
+    def limit(self, seconds):
+        """ The smaller of ``seconds`` and the time remaining, raises
+        ``socket.timeout`` once the deadline has passed
+        """
+        remaining = self.expires - clock()
+        if remaining <= 0:
+            raise socket.timeout("deadline exceeded")
+        return remaining if seconds is None else min(seconds, remaining)
+
+    def __repr__(self):
+        return "<Deadline: {:.3f}s left>".format(self.remaining())
+
+
+def limits(request):
+    """ The ``(connect, read)`` seconds allowed for sending a request, from
+    its ``timeouts`` and ``deadline`` (as set on it by the route) or the
+    ``timeout`` given to the opener.
+    """
+    timeouts = getattr(request, "timeouts", None)
+    if timeouts is not None:
+        connect, read = timeouts.connect, timeouts.read
+    else:
+        connect = read = getattr(request, "timeout", None)
+        if connect is socket._GLOBAL_DEFAULT_TIMEOUT:
+            connect = read = socket.getdefaulttimeout()
+
+    deadline = getattr(request, "deadline", None)
+    if deadline is not None:
+        connect, read = deadline.limit(connect), deadline.limit(read)
+    return connect, read
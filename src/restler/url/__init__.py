@@ -1,3 +1,6 @@
 from restler.url.url import URL
 from restler.url.cookies import Cookies
 from restler.url.auth import AuthManager
+from restler.url.pool import ConnectionPool
+from restler.url.concurrency import ConcurrencyLimiter
+from restler.url.token import TokenProvider
@@ -1,35 +1,143 @@
+import base64
 try:
     import urllib2
+    from urlparse import urlsplit
 except ImportError:
     import urllib.request as urllib2
+    from urllib.parse import urlsplit
+
+from restler.utils import isstr
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def scope_key(url):
+    """ Splits a URL into the ``(host, port)`` authority and the path
+    segments its credentials are indexed under
+    """
+    parts = urlsplit(str(url))
+    port = parts.port or DEFAULT_PORTS.get(parts.scheme)
+    segments = parts.path.rstrip("/").split("/") if parts.path else [""]
+    return ((parts.hostname or "").lower(), port), segments
 
 
 class AuthManager(object):
     """ Simple wrapper around HTTP Auth registration and lookup.  Wraps the
     ``urllib2`` manager and provides a simple interface to add in new
     credentials.
+
+    With ``preemptive`` the ``Authorization`` header is sent up front to any
+    URL under a registered scope rather than after the server has answered
+    ``401``, saving the extra round trip.  Scopes are indexed by authority and
+    then path prefix, so a lookup costs one dictionary hit per path segment
+    regardless of the number of credentials.  A password manager passed in
+    is indexed as well, both the credentials it already holds and the ones
+    added to it later on.
     """
-    def __init__(self, auths, url):
+    def __init__(self, auths, url, preemptive=False):
         self.url = url
+        self.preemptive = preemptive
+        self._scopes = {}
         if isinstance(auths, urllib2.HTTPPasswordMgr):
             self._manager = auths
         else:
             self._manager = urllib2.HTTPPasswordMgrWithDefaultRealm()
+        self.__watch(self._manager)
 
         self + auths
 
+    def __watch(self, manager):
+        # every `add_password` of the manager goes through the index
+        add_password = manager.add_password
+
+        def indexed(realm, uri, user, passwd, *args, **kwargs):
+            add_password(realm, uri, user, passwd, *args, **kwargs)
+            for one in ([uri] if isstr(uri) else uri):
+                self.__index(one, user, passwd)
+
+        for domains in getattr(manager, "passwd", {}).values():
+            for uris, (user, passwd) in domains.items():
+                for authority, path in uris:
+                    self.__index("//" + authority + path, user, passwd)
+        manager.add_password = indexed
+
     @property
     def handler(self):
         """ Valid ``urllib2`` request handler
         """
+        if self.preemptive:
+            return PreemptiveBasicAuthHandler(self)
         return urllib2.HTTPBasicAuthHandler(self._manager)
 
+    def add_password(self, realm, uri, username, password):
+        """ Registers credentials for every URL under ``uri``, same arguments
+        as the ``urllib2`` password managers.
+        """
+        self._manager.add_password(realm, str(uri), username, password)
+
+    def __index(self, uri, username, password):
+        authority, segments = scope_key(uri)
+        token = "{}:{}".format(username, password).encode("UTF-8")
+        header = "Basic " + base64.b64encode(token).decode("ascii")
+        self._scopes.setdefault(authority, {})["/".join(segments)] = \
+            (username, password, header)
+
+    def lookup(self, url):
+        """ The ``(username, password, header)`` of the most specific scope
+        the URL falls under, ``None`` if there is none.
+        """
+        authority, segments = scope_key(url)
+        scopes = self._scopes.get(authority)
+        if not scopes:
+            return None
+
+        for end in range(len(segments), 0, -1):
+            found = scopes.get("/".join(segments[:end]))
+            if found is not None:
+                return found
+        return None
+
+    def credentials(self, url):
+        """ Looks up the ``(username, password)`` registered for the URL,
+        ``(None, None)`` if there are none.
+        """
+        found = self.lookup(url)
+        if found is not None:
+            return found[:2]
+        return self._manager.find_user_password(None, str(url))
+
+    def authorization(self, url):
+        """ Value of the ``Authorization`` header for the URL, ``None`` if no
+        credentials are registered for it.
+        """
+        found = self.lookup(url)
+        return found[2] if found is not None else None
+
     def __add__(self, auth):
         if isinstance(auth, tuple):
-            self._manager.add_password(None, self.url, auth[0], auth[1])
+            self.add_password(None, self.url, auth[0], auth[1])
         elif isinstance(auth, dict):
-            self._manager.add_password(None, self.url, auth["username"],
-                                       auth["password"])
+            self.add_password(None, self.url, auth["username"],
+                              auth["password"])
         elif isinstance(auth, list):
             for a in auth:
                 self + a
+
+
+class PreemptiveBasicAuthHandler(urllib2.HTTPBasicAuthHandler):
+    """ Basic auth handler that attaches the credentials of the
+    :class:`AuthManager <AuthManager>` to requests before they are sent, a
+    ``401`` still falls back to the regular challenge handling.
+    """
+    def __init__(self, auth):
+        urllib2.HTTPBasicAuthHandler.__init__(self, auth._manager)
+        self.auth = auth
+
+    def http_request(self, request):
+        if not request.has_header("Authorization"):
+            header = self.auth.authorization(request.get_full_url())
+            if header is not None:
+                request.add_unredirected_header("Authorization", header)
+        return request
+
+    https_request = http_request
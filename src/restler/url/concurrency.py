@@ -0,0 +1,136 @@
+""" Adaptive limit on the requests in flight against each host.  The limit
+follows AIMD (additive increase, multiplicative decrease): it grows by about
+one per round of requests that come back quickly and cleanly while it is
+fully used, and is cut by a fraction as soon as a request fails or is slow
+compared to the best latency seen, so a struggling upstream is not buried
+under more and more concurrent requests.  Requests over the limit wait their
+turn in a bounded FIFO queue.
+"""
+from collections import deque
+import socket
+import threading
+
+
+class QueueFullError(Exception):
+    """ Raised when a request finds the queue of its host already full
+    """
+    pass
+
+
+class HostLimit(object):
+    """ Concurrency state of a single host
+    """
+    __slots__ = ("limit", "in_flight", "queue", "baseline")
+
+    def __init__(self, limit):
+        self.limit = float(limit)
+        self.in_flight = 0
+        self.queue = deque()
+        self.baseline = None  # decaying minimum of the latencies seen
+
+
+class ConcurrencyLimiter(object):
+    """ Per host AIMD concurrency limiter, used by the connection pool's
+    handler for every request.  A request counts against its host from being
+    sent until its response headers are in.
+
+    :param int initial: starting limit of a host
+    :param int min_limit: lowest the limit is cut to
+    :param int max_limit: highest the limit grows to
+    :param float backoff: factor the limit is multiplied by on a failure
+    :param float tolerance: a response is slow when its latency is more than
+        this many times the host's baseline latency
+    :param float latency: fixed latency target in seconds, used in place of
+        the baseline
+    :param int max_queue: requests that can wait per host, more are rejected
+    :param float max_wait: seconds a request waits in the queue at most,
+        ``None`` to wait as long as it takes
+    """
+    DECAY = 0.01  # how quickly the baseline drifts up to slower latencies
+
+    def __init__(self, initial=10, min_limit=1, max_limit=200, backoff=0.9,
+                 tolerance=2.0, latency=None, max_queue=100, max_wait=10):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.latency = latency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self):
+        """ Current ``limit``, requests ``in_flight`` and ``queued`` per host
+        """
+        with self._lock:
+            return dict((key, {"limit": int(host.limit),
+                               "in_flight": host.in_flight,
+                               "queued": len(host.queue)})
+                        for key, host in self._hosts.items())
+
+    def __host(self, key):
+        host = self._hosts.get(key)
+        if host is None:
+            host = self._hosts[key] = HostLimit(self.initial)
+        return host
+
+    def acquire(self, key, timeout=None):
+        """ Takes a slot for a request to the host, waiting in line if the
+        host is at its limit.  Raises :class:`QueueFullError
+        <QueueFullError>` if the line is full and ``socket.timeout`` if the
+        wait runs past ``max_wait`` (or ``timeout``, if that is shorter).
+        """
+        with self._lock:
+            host = self.__host(key)
+            if host.in_flight < int(host.limit) and not host.queue:
+                host.in_flight += 1
+                return
+            if len(host.queue) >= self.max_queue:
+                raise QueueFullError("{} requests already waiting for {}"
+                                     .format(len(host.queue), key))
+            turn = threading.Event()
+            host.queue.append(turn)
+
+        waits = [wait for wait in (self.max_wait, timeout) if wait is not None]
+        if turn.wait(min(waits) if waits else None):
+            return
+        with self._lock:
+            if turn.is_set():  # the slot came up just as the wait ran out
+                return
+            host.queue.remove(turn)
+        raise socket.timeout("waited too long for {}".format(key))
+
+    def release(self, key, latency=None, failed=False):
+        """ Gives back a request's slot, adjusting the host's limit on how
+        the request went and letting the requests waiting in line through
+        """
+        with self._lock:
+            host = self.__host(key)
+            saturated = host.in_flight >= int(host.limit)
+            host.in_flight -= 1
+
+            if failed or self.__slow(host, latency):
+                host.limit = max(host.limit * self.backoff, self.min_limit)
+            elif saturated:
+                host.limit = min(host.limit + 1.0 / host.limit,
+                                 self.max_limit)
+
+            while host.queue and host.in_flight < int(host.limit):
+                host.in_flight += 1
+                host.queue.popleft().set()
+
+    def __slow(self, host, latency):
+        if latency is None:
+            return False
+        if self.latency is not None:
+            return latency > self.latency
+
+        baseline = host.baseline
+        if baseline is None or latency < baseline:
+            host.baseline = latency
+        else:
+            host.baseline = baseline + (latency - baseline) * self.DECAY
+        return baseline is not None and latency > baseline * self.tolerance
@@ -0,0 +1,316 @@
+try:
+    import urllib2
+    import httplib
+except ImportError:
+    import urllib.request as urllib2
+    import http.client as httplib
+import select
+import socket
+import threading
+
+from restler import body
+from restler.timeout import clock, limits
+from restler.url.concurrency import QueueFullError
+
+# Failures seen when the server has silently dropped an idle connection
+STALE_ERRORS = (socket.error, httplib.BadStatusLine)
+if hasattr(httplib, "RemoteDisconnected"):
+    STALE_ERRORS += (httplib.RemoteDisconnected,)
+# Methods that can be sent again when a reused connection turns out stale
+IDEMPOTENT = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"])
+
+
+def still_open(conn):
+    """ Whether an idle connection is still open, a socket with something to
+    read before a request is sent has either been closed by the server or is
+    out of step with it
+    """
+    try:
+        if hasattr(select, "poll"):
+            poller = select.poll()
+            poller.register(conn.sock, select.POLLIN)
+            return not poller.poll(0)
+        return not select.select([conn.sock], [], [], 0)[0]
+    except (socket.error, ValueError):
+        return False
+
+
+class ConnectionPool(object):
+    """ Per host store of idle HTTP/1.1 keep-alive connections.  Connections
+    are checked out for the lifetime of a single request/response and put back
+    once the response body has been fully read, so sequential requests to the
+    same host share a socket instead of paying for a new connect (and TLS
+    handshake) every time.
+
+    :param int size: maximum number of idle connections kept per host, extra
+        connections are closed when they are released
+    """
+    DEFAULT_SIZE = 10
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    @property
+    def handler(self):
+        """ Valid ``urllib2`` request handler
+        """
+        return KeepAliveHandler(self)
+
+    @property
+    def stats(self):
+        """ Snapshot of the pool counters, ``hits`` are requests that reused
+        an idle connection and ``misses`` are ones that had to open a new one.
+        """
+        with self._lock:
+            idle = sum(len(conns) for conns in self._idle.values())
+            return {"hits": self.hits, "misses": self.misses, "idle": idle}
+
+    def acquire(self, key, factory, usable=None):
+        """ Checks out an idle connection for ``key`` (a ``(scheme, host)``
+        pair), builds a new one with ``factory`` if there is none.  With
+        ``usable`` idle connections are checked with it first and closed if
+        they fail.  Returns the connection and whether it was reused.
+        """
+        while True:
+            with self._lock:
+                conns = self._idle.get(key)
+                if not conns:
+                    self.misses += 1
+                    return factory(), False
+                conn = conns.pop()
+                if usable is None:
+                    self.hits += 1
+                    return conn, True
+
+            if usable(conn):
+                with self._lock:
+                    self.hits += 1
+                return conn, True
+            conn.close()
+
+    def release(self, key, conn):
+        """ Returns a connection to the pool, closing it instead if the pool
+        for the host is already full.
+        """
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if conn.sock is not None and len(idle) < self.size:
+                idle.append(conn)
+                return
+
+        conn.close()
+
+    def clear(self):
+        """ Closes and forgets every idle connection.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+class PooledResponse(object):
+    """ File-like response that hands its connection back to the pool as soon
+    as the body has been read to the end.  Mimics the interface of the object
+    returned by ``urllib2.urlopen``.
+    """
+    def __init__(self, response, url, release, before_read=None):
+        self._response = response
+        self._release = release
+        self._before_read = before_read
+        self.url = url
+        self.code = self.status = response.status
+        self.msg = response.reason
+        self.headers = response.msg
+        self.__check()
+
+    def __check(self):
+        if self._release is not None and self._response.isclosed():
+            release, self._release = self._release, None
+            release(self._response.will_close)
+
+    def read(self, amt=None):
+        if self._before_read is not None:
+            self._before_read()
+        data = self._response.read() if amt is None \
+            else self._response.read(amt)
+        self.__check()
+        return data
+
+    def close(self):
+        if self._release is not None:
+            # body was not consumed, the socket cannot be shared any more
+            release, self._release = self._release, None
+            release(True)
+        self._response.close()
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
+
+    def getcode(self):
+        return self.code
+
+
+try:
+    HTTPSHandler = urllib2.HTTPSHandler
+except AttributeError:  # python built without SSL support
+    HTTPSHandler = object
+
+
+class KeepAliveHandler(urllib2.HTTPHandler, HTTPSHandler):
+    """ ``urllib2`` handler for ``http`` and ``https`` URLs that sends
+    requests over connections checked out of a :class:`ConnectionPool
+    <ConnectionPool>` rather than opening a fresh connection per request.
+    With a :class:`ConcurrencyLimiter <restler.url.concurrency.
+    ConcurrencyLimiter>` the requests in flight to each host are capped by it
+    as well.
+    """
+    # statuses that tell the host is overloaded, and count as failures
+    OVERLOADED = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, pool, limiter=None):
+        if HTTPSHandler is object:
+            urllib2.HTTPHandler.__init__(self)
+        else:
+            HTTPSHandler.__init__(self)
+        self.pool = pool
+        self.limiter = limiter
+
+    def http_open(self, req):
+        return self.do_pooled(httplib.HTTPConnection, req)
+
+    def https_open(self, req):
+        return self.do_pooled(httplib.HTTPSConnection, req,
+                              context=getattr(self, "_context", None))
+
+    def do_pooled(self, http_class, req, **http_conn_args):
+        host = req.host if hasattr(req, "host") else req.get_host()
+        if not host:
+            raise urllib2.URLError("no host given")
+
+        try:
+            connect, read = limits(req)
+        except socket.timeout as err:
+            raise urllib2.URLError(err)
+
+        tunnel = getattr(req, "_tunnel_host", None)
+        key = (req.type if hasattr(req, "type") else req.get_type(), host,
+               tunnel)
+        headers, tunnel_headers = self.__headers(req, tunnel)
+
+        def factory():
+            conn = http_class(host, timeout=connect, **http_conn_args)
+            if tunnel:
+                conn.set_tunnel(tunnel, headers=tunnel_headers)
+            return conn
+
+        conn, response = self.__limited(
+            host, getattr(req, "deadline", None),
+            lambda: self.__open(req, key, factory, headers, read))
+
+        def release(will_close):
+            if will_close:
+                conn.close()
+            else:
+                self.pool.release(key, conn)
+
+        deadline = getattr(req, "deadline", None)
+
+        def before_read():  # keep each read within the deadline
+            if conn.sock is not None:
+                conn.sock.settimeout(deadline.limit(read))
+
+        return PooledResponse(response, req.get_full_url(), release,
+                              before_read if deadline is not None else None)
+
+    def __limited(self, host, deadline, send):
+        """ Sends the request once the limiter lets it through to ``host``,
+        reporting back how long the response took to start and whether it
+        failed
+        """
+        if self.limiter is None:
+            return send()
+
+        try:
+            self.limiter.acquire(
+                host, deadline.remaining() if deadline is not None else None)
+        except (QueueFullError, socket.timeout) as err:
+            raise urllib2.URLError(err)
+
+        started = clock()
+        try:
+            conn, response = send()
+        except Exception:
+            self.limiter.release(host, failed=True)
+            raise
+        self.limiter.release(host, clock() - started,
+                             response.status in self.OVERLOADED)
+        return conn, response
+
+    def __headers(self, req, tunnel):
+        headers = dict(req.unredirected_hdrs)
+        headers.update((k, v) for k, v in req.headers.items()
+                       if k not in headers)
+        headers["Connection"] = "keep-alive" if self.pool.size else "close"
+        headers = dict((name.title(), val) for name, val in headers.items())
+
+        tunnel_headers = {}
+        if tunnel and "Proxy-Authorization" in headers:
+            tunnel_headers["Proxy-Authorization"] = \
+                headers.pop("Proxy-Authorization")
+        return headers, tunnel_headers
+
+    def __open(self, req, key, factory, headers, timeout):
+        # a request that is not safe to send twice is never resent, so the
+        # idle connection it goes out on is checked before instead
+        resend = req.get_method() in IDEMPOTENT
+        conn, reused = self.pool.acquire(key, factory,
+                                         None if resend else still_open)
+        stream = body.is_stream(req.data)
+        start = body.position(req.data) if stream else None
+        try:
+            return conn, self.__send(conn, req, headers, timeout)
+        except socket.timeout as err:
+            conn.close()
+            raise urllib2.URLError(err)
+        except STALE_ERRORS as err:
+            conn.close()
+            # a stream body already read from can only be resent if rewound
+            if not reused or not resend or (stream and start is None):
+                raise urllib2.URLError(err)
+        except httplib.HTTPException as err:
+            conn.close()
+            raise urllib2.URLError(err)
+
+        # the idle socket was dropped by the server, retry on a new one
+        if stream:
+            req.data.seek(start)
+        conn = factory()
+        try:
+            return conn, self.__send(conn, req, headers, timeout)
+        except (socket.error, httplib.HTTPException) as err:
+            conn.close()
+            raise urllib2.URLError(err)
+
+    @staticmethod
+    def __send(conn, req, headers, timeout):
+        if conn.sock is None:
+            conn.connect()  # with the connect timeout the conn was built with
+        conn.sock.settimeout(timeout)
+        selector = req.selector if hasattr(req, "selector") \
+            else req.get_selector()
+        # the headers go out first, the body is written to the socket as is
+        conn.request(req.get_method(), selector, None, headers)
+        if req.data is not None:
+            body.send(conn.sock, req.data,
+                      chunked="Transfer-Encoding" in headers)
+        return conn.getresponse()
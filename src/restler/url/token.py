@@ -0,0 +1,154 @@
+""" Bearer (i.e. OAuth) token handling, the current token is cached and
+renewed on a background thread shortly before it expires so requests keep
+going out with a valid token without waiting on the renewal.
+"""
+import threading
+import time
+try:
+    import urllib2
+except ImportError:
+    import urllib.request as urllib2
+
+from restler.hedge import clone
+
+
+class TokenProvider(object):
+    """ Keeps the token returned by ``fetch``, a function returning either
+    the token or a ``(token, expires_in)`` tuple with its lifetime in seconds
+    (``None`` for a token that does not expire).
+
+    Once the token is within ``margin`` seconds of expiring, it is renewed on
+    a background thread while the current one keeps being handed out.
+    Callers only wait on ``fetch`` when there is no token yet or it has
+    actually expired.
+
+    :param str scheme: ``Authorization`` scheme the token is sent with
+    :param int margin: seconds before expiry the renewal starts
+    """
+    MARGIN = 60
+    RETRY_INTERVAL = 5  # wait between failed background renewals
+
+    def __init__(self, fetch, scheme="Bearer", margin=MARGIN):
+        self.fetch = fetch
+        self.scheme = scheme
+        self.margin = margin
+        self.clock = time.time
+        self.refreshes = 0
+        self._token = None
+        self._expires = None
+        self._retry_at = 0
+        self._worker = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def handler(self):
+        """ Valid ``urllib2`` request handler
+        """
+        return TokenHandler(self)
+
+    @property
+    def stats(self):
+        with self._lock:
+            return {"refreshes": self.refreshes, "expires": self._expires}
+
+    def expired(self, now=None):
+        now = self.clock() if now is None else now
+        return self._token is None or \
+            (self._expires is not None and self._expires <= now)
+
+    def token(self):
+        """ The current token, renewed in line only if it has expired
+        """
+        now = self.clock()
+        with self._lock:
+            token, expires = self._token, self._expires
+        if self.expired(now):
+            return self.refresh(token)
+
+        if expires is not None and expires - self.margin <= now:
+            self.__refresh_background(token, now)
+        return token
+
+    def header(self, token):
+        return "{} {}".format(self.scheme, token)
+
+    def refresh(self, stale=None):
+        """ Fetches a new token, unless another thread has already replaced
+        ``stale`` (the token the caller found wanting) with a valid one.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                if self._token != stale and not self.expired():
+                    return self._token
+
+            result = self.fetch()
+            token, lifetime = result if isinstance(result, tuple) \
+                else (result, None)
+            with self._lock:
+                self._token = token
+                self._expires = None if lifetime is None \
+                    else self.clock() + lifetime
+                self.refreshes += 1
+            return token
+
+    def __refresh_background(self, token, now):
+        with self._lock:
+            if (self._worker and self._worker.is_alive()) or \
+                    now < self._retry_at:
+                return
+            self._retry_at = now + self.RETRY_INTERVAL
+            self._worker = threading.Thread(target=self.__renew,
+                                            args=(token,))
+            self._worker.daemon = True
+            self._worker.start()
+
+    def __renew(self, token):
+        try:
+            self.refresh(token)
+        except Exception:
+            pass  # the current token is still valid, retried later
+
+
+class TokenHandler(urllib2.BaseHandler):
+    """ Adds the provider's token to outgoing requests and, if the server
+    still answers ``401``, renews it and retries the request once.  Every
+    send of a request gets the current token, the token and whether the send
+    is the retry are only kept with that send, so requests that are sent
+    again (retried, hedged or prepared) start over.
+    """
+    def __init__(self, provider):
+        self.provider = provider
+
+    def http_request(self, request):
+        # an `Authorization` of the caller's own is left alone
+        if "Authorization" not in request.headers and \
+                self.__sent(request) is not False:
+            request.add_unredirected_header(
+                "Authorization", self.provider.header(self.provider.token()))
+        return request
+
+    https_request = http_request
+
+    def http_error_401(self, request, fp, code, msg, headers):
+        token = self.__sent(request)
+        if not token or getattr(request, "token_retried", False):
+            return None
+
+        token = self.provider.refresh(token)
+        retry = clone(request)  # sent in place of this attempt only
+        retry.add_unredirected_header("Authorization",
+                                      self.provider.header(token))
+        retry.token_retried = True
+        fp.read()
+        fp.close()
+        return self.parent.open(retry, timeout=request.timeout)
+
+    def __sent(self, request):
+        # the token in the request's `Authorization`, `None` without one and
+        # `False` if the header is not one of the provider's
+        header = request.unredirected_hdrs.get("Authorization")
+        if header is None:
+            return None
+        scheme, _, token = header.partition(" ")
+        return token if scheme == self.provider.scheme else False
@@ -1,7 +1,8 @@
 try:
     from urlparse import urlparse, parse_qs
+    from urllib import urlencode
 except ImportError:
-    from urllib.parse import urlparse, parse_qs
+    from urllib.parse import urlparse, parse_qs, urlencode
 from restler.utils import isstr
 
 
@@ -9,25 +10,59 @@ class URL(object):
     """ URL representation and manipulation structure, used for parsing,
     manipulating, and interacting with a rich URL string.  Handles parsing out
     protocol, domain, path, and query strings from a raw URL string.
+
+    URLs are immutable values, the path is a tuple of its levels and the
+    string form and hash are worked out once when the URL is built, so routes
+    can be compared and looked up without rebuilding the string every time.
+    Extending a URL reuses the parsed parts and string of the one it extends.
     """
+    __slots__ = ("protocol", "domain", "path", "query", "_str", "_hash")
     PATH_DELIMITER = '/'
     QUERY_DELIMITER = '?'
 
     def __init__(self, base, path=None):
-        if path is None:
-            path = []
         url_info = urlparse(base)
+        path = path or ()
 
-        self.protocol = ""
-        self.protocol = url_info.scheme if len(url_info.scheme) else 'http'
-        if self.protocol is "unix":
-            self.domain = "/" + url_info.path
-            self.path, _ = URL.split(path)
+        protocol = url_info.scheme if len(url_info.scheme) else 'http'
+        if protocol == "unix":
+            domain = "/" + url_info.path
+            levels = URL.split(path)[0]
         else:
-            self.domain = url_info.netloc
-            self.path = URL.split(url_info.path)[0] + path
-
-        self.query = URL.translate_query(url_info.query)
+            domain = url_info.netloc
+            levels = URL.split(url_info.path)[0] + list(path)
+
+        self.__init(protocol, domain, tuple(levels),
+                    URL.translate_query(url_info.query),
+                    "{}://{}/".format(protocol, domain), levels)
+
+    def __init(self, protocol, domain, path, query, prefix, levels):
+        # `prefix` is the string form the new `levels` are appended to
+        string = prefix + "/".join(levels)
+        init = object.__setattr__
+        init(self, "protocol", protocol)
+        init(self, "domain", domain)
+        init(self, "path", path)
+        init(self, "query", query)
+        init(self, "_str", string)
+        init(self, "_hash", hash(string))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("URL objects are immutable")
+
+    def __reduce__(self):
+        # rebuilt from its parts as the attributes can't be set one by one
+        domain = self.domain[1:] if self.protocol == "unix" else self.domain
+        base = "{}://{}".format(self.protocol, domain)
+        if self.query:
+            base += "?" + urlencode(self.query)
+        return URL, (base, self.path)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __add__(self, path):
         return self.__extend__(path)
@@ -35,6 +70,8 @@ class URL(object):
     def __div__(self, path):
         return self.__extend__(path)
 
+    __truediv__ = __div__
+
     def __extend__(self, path):
         """ Generates a new :class:`URL <URL>` with the added path extended to
         the end of the existing path.  Can be triggered with the division and
@@ -49,26 +86,43 @@ class URL(object):
             URL<http://foo.bar/back/>
 
         """
-        new_url = self.clone()
-
-        path, query = URL.split(path)
-        new_url.path += path
-        new_url.query = dict(list(self.query.items()) + list(query.items)) \
+        levels, query = URL.split(path)
+        query = dict(list(self.query.items()) + list(query.items())) \
             if query else self.query.copy()
+        return self.child(levels, query)
 
+    def child(self, levels, query=None):
+        """ Extends the path with a list of ``levels`` that are already split
+        up (the query is the same as this URL's unless given), without parsing
+        anything
+        """
+        new_url = URL.__new__(URL)
+        new_url.__init(self.protocol, self.domain, self.path + tuple(levels),
+                       self.query if query is None else query,
+                       self._str + "/" if self.path and levels else self._str,
+                       levels)
         return new_url
 
     def clone(self):
-        new_url = URL("{}://{}".format(self.protocol, self.domain), self.path)
-        return new_url
+        return self  # nothing to copy, URLs never change
 
     def __str__(self):
-        return "{}://{}/{}".format(self.protocol, self.domain,
-                                   "/".join(self.path))
+        return self._str
 
     def __repr__(self):
         return "URL<{!s}>".format(self)
 
+    def __eq__(self, other):
+        if isinstance(other, URL):
+            return self._str == other._str and self.query == other.query
+        return self._str == str(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return self._hash
+
     @classmethod
     def split(cls, path):
         """ Break the path down into a list of the levels and the query string
@@ -1,9 +1,12 @@
 try:
     from urllib import urlencode
     from urllib2 import HTTPRedirectHandler
+    import httplib
 except ImportError:
     from urllib.parse import urlencode
     from urllib.request import HTTPRedirectHandler
+    import http.client as httplib
+from io import BytesIO
 
 
 def isstr(s):
@@ -43,9 +46,59 @@ def to_urlstr(p):
     return urlencode(list(p.items()) + params)
 
 
-class NoRedirectHandler(HTTPRedirectHandler):
+class RedirectHandler(HTTPRedirectHandler):
+    """ carries the time limits of a request over to the redirected request so
+    a deadline keeps shrinking across the hops
+    """
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new = HTTPRedirectHandler.redirect_request(self, req, fp, code, msg,
+                                                   headers, newurl)
+        if new is not None:
+            new.timeouts = getattr(req, "timeouts", None)
+            new.deadline = getattr(req, "deadline", None)
+        return new
+
+
+class NoRedirectHandler(RedirectHandler):
     def http_error_302(self, req, fp, code, msg, headers):
-        return HTTPRedirectHandler.http_error_302(self, req, fp, code,
-                                                  msg, headers)
+        return RedirectHandler.http_error_302(self, req, fp, code, msg,
+                                              headers)
 
     http_error_301 = http_error_303 = http_error_307 = http_error_302
+
+
+def parse_headers(raw):
+    """ builds the ``HTTPMessage`` headers object of a response out of the raw
+    header block
+    """
+    try:
+        return httplib.parse_headers(BytesIO(raw))
+    except AttributeError:
+        return httplib.HTTPMessage(BytesIO(raw))
+
+
+class BufferedResponse(object):
+    """ In memory stand in for the file-like object returned by
+    ``urllib2.urlopen``, used when the body has already been read off the wire
+    """
+    def __init__(self, url, code, headers, body, msg=""):
+        self.url = url
+        self.code = self.status = code
+        self.msg = msg
+        self.headers = headers
+        self.__body = BytesIO(body)
+
+    def read(self, amt=None):
+        return self.__body.read() if amt is None else self.__body.read(amt)
+
+    def close(self):
+        self.__body.close()
+
+    def info(self):
+        return self.headers
+
+    def geturl(self):
+        return self.url
+
+    def getcode(self):
+        return self.code
@@ -1,4 +1,5 @@
 import unittest
+import restler
 from restler import Restler, Route
 import http_server
 
@@ -48,6 +49,43 @@ class TestRestler(unittest.TestCase):
             "http://127.0.0.1:9001/a/long/route/making/a/request")
         self.assertIsInstance(response.data['path'], Route)
 
+    def test_template(self):
+        ''' Test that a template call reaches the filled in path '''
+        items = self.local.template("/users/{user}/items")
+        response = items(user="test", foo="bar")
+        self.assertEqual(str(response.data["path"]),
+                         "http://127.0.0.1:9001/users/test/items")
+        self.assertEqual(response.data["method"], "GET")
+
+    def test_prepare(self):
+        ''' Test that a prepared request can be sent repeatedly '''
+        prepared = self.local.users.prepare("POST", foo="bar")
+        for _ in range(2):
+            response = prepared(headers={"X-Poll": "1"})
+            self.assertEqual(response.data["method"], "POST")
+            self.assertEqual(response.data["params"], {"foo": "bar"})
+            self.assertEqual(response.data["headers"]["X-Poll"], "1")
+
+    def test_upload(self):
+        ''' Test that file and iterator bodies are streamed to the server
+        The file goes out with its length, the iterator chunked, and both
+        arrive whole.
+        '''
+        import tempfile
+
+        with tempfile.TemporaryFile() as upload:
+            upload.write(b"foo=bar&baz=1")
+            upload.seek(0)
+            response = self.local.upload("POST", upload)
+        self.assertEqual(response.data["params"], {"foo": "bar", "baz": "1"})
+        self.assertEqual(response.data["headers"]["Content-Length"], "13")
+
+        parts = iter([b"foo=", b"bar"])
+        response = self.local.upload("PUT", parts)
+        self.assertEqual(response.data["params"], {"foo": "bar"})
+        self.assertEqual(response.data["headers"]["Transfer-Encoding"],
+                         "chunked")
+
     def test_params(self):
         ''' Test that params go through
         Sends a variety of types to the test server and sees if they are
@@ -60,3 +98,247 @@ class TestRestler(unittest.TestCase):
         except AttributeError:
             self.assertDictEqual(response.data['params'],
                                  {"foo": "bar", "bar": "1", "baz": "True"})
+
+    def test_keep_alive(self):
+        ''' Test that sequential requests reuse a pooled connection
+        Makes several requests through a keep-alive enabled `Restler` and
+        checks that only the first one had to open a new connection.
+        '''
+        local = Restler("http://127.0.0.1:9001", keep_alive=2)
+        for _ in range(3):
+            response = local.users()
+            self.assertEqual(response.data['method'], "GET")
+
+        self.assertEqual(local.__pool__.stats["misses"], 1)
+        self.assertEqual(local.__pool__.stats["hits"], 2)
+        self.assertEqual(local.__pool__.stats["idle"], 1)
+
+    def test_stream(self):
+        ''' Test streaming an array out of a response
+        Sends a list of values and streams them back out of the echoed
+        params instead of parsing the full body.
+        '''
+        items = self.local.test.stream("POST", path=("params", "ids"),
+                                       ids=["1", "2", "3"])
+        self.assertEqual(list(items), ["1", "2", "3"])
+
+    def test_cache(self):
+        ''' Test that cached responses are revalidated against the server
+        The test server tags `/cached` responses with an `ETag`, a repeated
+        request should get a `304` and be served from the stored response.
+        '''
+        local = Restler("http://127.0.0.1:9001", cache=True)
+        first = local.cached.item()
+        second = local.cached.item()
+
+        self.assertIsNot(first, second)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(local.__cache__.stats["revalidations"], 1)
+
+    def test_token(self):
+        ''' Test that a rejected token is renewed and the request retried
+        The first token handed out is refused, the request should go through
+        with the renewed one without the caller noticing.
+        '''
+        tokens = iter(["expired", "valid", "unused"])
+        local = Restler("http://127.0.0.1:9001", token=lambda: next(tokens))
+        response = local.protected()
+        self.assertEqual(response.data["headers"]["Authorization"],
+                         "Bearer valid")
+        local.protected()
+        self.assertEqual(local.__token__.refreshes, 2)
+
+    def test_compression(self):
+        ''' Test that compressed bodies are negotiated both ways
+        The server gzips its response when asked to and the client should
+        decode it, large request bodies should be sent gzipped.
+        '''
+        response = self.local.gzip()
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(str(response.data["path"]),
+                         "http://127.0.0.1:9001/gzip")
+
+        local = Restler("http://127.0.0.1:9001", compress_requests=16)
+        response = local.gzip("POST", foo="bar" * 20)
+        self.assertEqual(response.data["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(response.data["params"], {"foo": "bar" * 20})
+
+    def test_timeout(self):
+        ''' Test that slow responses are cut off by the timeouts
+        Both the `Restler` wide and the per call timeout should raise the
+        timeout error, as the returned error code when not throwing.
+        '''
+        local = Restler("http://127.0.0.1:9001", timeout=0.2)
+        self.assertRaises(restler.RequestTimeoutError, local.slow,
+                          delay="0.5")
+        response = local.slow(delay="0.3", _timeout=(0.2, 1))
+        self.assertEqual(response.data["method"], "GET")
+        response = local.slow(delay="0", timeout="30")
+        self.assertEqual(response.data["params"]["timeout"], "30")
+
+        local.EXCEPTION_THROWING = False
+        code, err = local.slow(delay="0.5")
+        self.assertEqual(code, 2)
+        self.assertIsInstance(err, restler.RequestTimeoutError)
+
+    def test_deadline(self):
+        ''' Test that a deadline is shared across calls and redirects
+        Every hop spends from the same budget, so the chain fails once it has
+        been used up even though each hop is quick enough on its own.
+        '''
+        deadline = restler.Deadline(0.5)
+        self.local.slow(delay="0.2", _deadline=deadline)
+        self.assertRaises(restler.RequestTimeoutError, self.local.slow,
+                          delay="0.2", hops="2", _deadline=deadline)
+        self.assertTrue(deadline.expired)
+
+    def test_retry(self):
+        ''' Test that transient failures are retried
+        Idempotent requests should go through after the failures, others
+        should fail right away.
+        '''
+        local = Restler("http://127.0.0.1:9001", retry=3)
+        response = local.flaky(key="get", fails="2")
+        self.assertEqual(response.data["method"], "GET")
+        self.assertEqual(local.__retry__.budget.stats["retries"], 2)
+
+        self.assertRaises(restler.ServerError, local.flaky.__call__, "POST")
+        self.assertEqual(local.__retry__.budget.stats["retries"], 2)
+
+    def test_hedge(self):
+        ''' Test that a slow request is hedged with a second one
+        The first request stalls, the hedge sent after the delay should answer
+        well before it.
+        '''
+        import asyncio
+        import time
+
+        local = Restler("http://127.0.0.1:9001", hedge=0.1)
+        started = time.time()
+        response = local.slow(delay="2", once="hedge")
+        self.assertTrue(time.time() - started < 1)
+        self.assertEqual(response.data["method"], "GET")
+        stats = local.__hedge__.stats[str(local.slow)]
+        self.assertEqual((stats["hedged"], stats["hedge_wins"]), (1, 1))
+
+        async def hedged():
+            async with restler.AsyncRestler("http://127.0.0.1:9001",
+                                            hedge=0.1) as api:
+                return await api.slow(delay="2", once="async_hedge")
+
+        started = time.time()
+        asyncio.run(hedged())
+        self.assertTrue(time.time() - started < 1)
+
+    def test_rate_limit(self):
+        ''' Test that the limiter holds off once the quota is spent
+        The server reports no requests left until its window resets, the next
+        request should wait for the reset.
+        '''
+        import time
+
+        local = Restler("http://127.0.0.1:9001", rate_limit=True)
+        local.quota(reset="0.3")
+        started = time.time()
+        local.quota(reset="0.3")
+        self.assertTrue(time.time() - started >= 0.25)
+
+    def test_concurrency_limit(self):
+        ''' Test that requests over the host's limit wait their turn
+        With a limit of one the gathered requests go out one after the other,
+        and a request that waits longer than allowed fails with a timeout.
+        '''
+        import time
+        from restler.url import ConcurrencyLimiter
+
+        limiter = ConcurrencyLimiter(initial=1, max_limit=1, max_wait=2)
+        local = Restler("http://127.0.0.1:9001", concurrency_limit=limiter)
+        started = time.time()
+        list(local.gather([(local.slow, "GET", {"delay": "0.1"})] * 3))
+        self.assertTrue(time.time() - started >= 0.3)
+        self.assertEqual(limiter.stats["127.0.0.1:9001"],
+                         {"limit": 1, "in_flight": 0, "queued": 0})
+
+        limiter.max_wait = 0.05
+        slow = (local.slow, "GET", {"delay": "0.3"})
+        results = list(local.gather([slow, slow]))
+        codes = sorted(code for code, _ in results)
+        self.assertEqual(codes, [0, 2])
+
+    def test_paginate(self):
+        ''' Test iterating over the items of a paginated listing
+        Follows the `next` links of the test server's pages, with and without
+        reading ahead, and respects the page and item caps.
+        '''
+        expected = [10, 11, 12, 20, 21, 22, 30, 31, 32]
+        pages = self.local.pages
+        self.assertEqual(list(pages.paginate()), expected)
+        self.assertEqual(list(pages.paginate(prefetch=0)), expected)
+        self.assertEqual(list(pages.paginate(prefetch=2, max_pages=2)),
+                         expected[:6])
+        self.assertEqual(list(pages.paginate(max_items=4)), expected[:4])
+
+    def test_parallel_pages(self):
+        ''' Test fetching the pages up to the `last` link concurrently
+        The pages should be built from the `last` link and still come out in
+        page order.
+        '''
+        pages = self.local.pages
+        items = list(pages.paginate(params={"last": "6"}, concurrency=3))
+        self.assertEqual(items, [page * 10 + i for page in range(1, 7)
+                                 for i in range(3)])
+        items = list(pages.paginate(concurrency=3, max_pages=2))
+        self.assertEqual(items, [10, 11, 12, 20, 21, 22])
+        # more pages than the two workers keep in flight
+        items = list(pages.paginate(params={"last": "20"}, concurrency=2))
+        self.assertEqual(items, [page * 10 + i for page in range(1, 21)
+                                 for i in range(3)])
+
+    def test_gather(self):
+        ''' Test that a batch of calls fans out and keeps its order
+        Maps a route over a set of ids, results should come back in the same
+        order and failures reported as error codes instead of raising.
+        '''
+        results = list(self.local.users.map(range(20), workers=4))
+        self.assertEqual(len(results), 20)
+        for i, (code, response) in enumerate(results):
+            self.assertEqual(code, 0)
+            self.assertEqual(str(response.data['path']),
+                             "http://127.0.0.1:9001/users/{}".format(i))
+
+        missing = Restler("http://127.0.0.1:9")
+        results = dict(missing.gather(["/a", "/b"], ordered=False))
+        self.assertEqual(results, {0: (1, None), 1: (1, None)})
+
+    @unittest.skipUnless(hasattr(restler, "AsyncRestler"), "needs asyncio")
+    def test_async_requests(self):
+        ''' Test that the asyncio client fans requests out on one loop
+        Runs a batch of concurrent calls through `AsyncRestler` and checks each
+        returns the parsed `Response` for its own path.
+        '''
+        import asyncio
+
+        async def fetch():
+            async with restler.AsyncRestler("http://127.0.0.1:9001") as api:
+                responses = await asyncio.gather(
+                    *[api.users[str(i)]("POST", foo="bar") for i in range(5)])
+                return responses, api.__transport__.stats
+
+        responses, stats = asyncio.run(fetch())
+        for i, response in enumerate(responses):
+            self.assertEqual(response.data['method'], "POST")
+            self.assertEqual(response.data['params'], {"foo": "bar"})
+            self.assertEqual(str(response.data['path']),
+                             "http://127.0.0.1:9001/users/{}".format(i))
+        self.assertEqual(stats["misses"], 5)
+
+        async def protected():
+            tokens = iter(["expired", "valid"])
+            api = restler.AsyncRestler("http://127.0.0.1:9001",
+                                       token=lambda: next(tokens))
+            async with api:
+                return await api.protected()
+
+        response = asyncio.run(protected())
+        self.assertEqual(response.data["headers"]["Authorization"],
+                         "Bearer valid")
@@ -0,0 +1,85 @@
+import unittest
+
+try:
+    import asyncio
+    from restler import AsyncRestler
+except (ImportError, SyntaxError):
+    AsyncRestler = None
+
+
+def serve(replies, received):
+    ''' Starts a server answering each connection with the `replies`, a list
+    of byte strings written with a short pause between them
+    '''
+    async def handle(reader, writer):
+        received.append(await reader.readuntil(b"\r\n\r\n"))
+        for position, reply in enumerate(replies):
+            if position:
+                await asyncio.sleep(0.3)
+            writer.write(reply)
+            await writer.drain()
+        writer.close()
+
+    return asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+@unittest.skipIf(AsyncRestler is None, "needs python 3.7+")
+class TestAsync(unittest.TestCase):
+    def fetch(self, replies, timeout=None, **kwargs):
+        received = []
+
+        async def run():
+            server = await serve(replies, received)
+            port = server.sockets[0].getsockname()[1]
+            async with AsyncRestler("http://127.0.0.1:{}".format(port),
+                                    timeout=timeout) as api:
+                response = await api.status(**kwargs)
+            server.close()
+            return response
+
+        return asyncio.run(run()), received[0].decode("iso-8859-1")
+
+    def test_interim(self):
+        ''' Tests that interim responses are skipped, with or without headers
+        '''
+        response, _ = self.fetch([
+            b"HTTP/1.1 100 Continue\r\n\r\n",
+            b"HTTP/1.1 102 Processing\r\nX-Step: 1\r\n\r\n",
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            b"Content-Length: 2\r\n\r\n[]"])
+        self.assertEqual(response.data, [])
+        self.assertNotIn("X-Step", response.headers)
+
+    def test_read_timeout(self):
+        ''' Tests that the read timeout bounds each wait, not the response
+        The reply takes longer than the timeout in all but arrives in pieces
+        that each come in time.
+        '''
+        response, _ = self.fetch([
+            b"HTTP/1.1 200 OK\r\n",
+            b"Content-Type: application/json\r\nContent-Length: 2\r\n\r\n",
+            b"[]"], timeout=(1, 0.5))
+        self.assertEqual(response.data, [])
+
+    def test_content_type(self):
+        ''' Tests that only requests with a body get a `Content-Type` '''
+        reply = [b"HTTP/1.1 204 No Content\r\n\r\n"]
+        _, head = self.fetch(reply)
+        self.assertNotIn("Content-Type", head)
+
+        _, head = self.fetch(reply, foo="bar")
+        self.assertIn("Content-Type: application/x-www-form-urlencoded",
+                      head)
+
+    def test_unsupported(self):
+        ''' Tests that options the async client lacks are refused '''
+        self.assertRaises(TypeError, AsyncRestler, "http://nope/", cache=True)
+        self.assertRaises(TypeError, AsyncRestler, "http://nope/",
+                          coalesce=True)
+        api = AsyncRestler("http://nope/", compress_requests=True)
+        self.assertIsNotNone(api.__compress__)
+
+        self.assertRaises(TypeError, api.gather, ["a", "b"])
+        self.assertRaises(TypeError, api.users.map, [1, 2])
+        self.assertRaises(TypeError, api.users.stream)
+        self.assertRaises(TypeError, api.users.paginate)
@@ -0,0 +1,67 @@
+import unittest
+try:
+    import urllib2
+except ImportError:
+    import urllib.request as urllib2
+from restler import Restler
+from restler.url import AuthManager
+from restler.url.auth import PreemptiveBasicAuthHandler
+
+
+class TestAuth(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/api/", http_auth=("user", "pass"),
+                           preemptive_auth=True)
+        self.auth = self.app.__auth__
+
+    def test_scopes(self):
+        ''' Tests that credentials are found by the most specific path
+        Scopes should match on whole path segments and per host.
+        '''
+        self.app.add_credentials("admin", "secret", "/admin")
+        self.assertEqual(self.auth.credentials("http://nope/api/foo"),
+                         ("user", "pass"))
+        self.assertEqual(self.auth.credentials("http://nope/api/admin/x"),
+                         ("admin", "secret"))
+        self.assertEqual(self.auth.credentials("http://nope/api/adminx"),
+                         ("user", "pass"))
+        self.assertIsNone(self.auth.authorization("http://nope/"))
+        self.assertIsNone(self.auth.authorization("http://other/api/"))
+
+    def test_preemptive_header(self):
+        ''' Tests that the Authorization header is added before sending
+        Requests under a registered scope should carry the basic credentials
+        without waiting for a challenge, others should not.
+        '''
+        handler = self.auth.handler
+        request = handler.http_request(self.app.foo.__build__("GET"))
+        self.assertEqual(request.get_header("Authorization"),
+                         "Basic dXNlcjpwYXNz")
+
+        other = Restler("http://other/")
+        request = handler.http_request(other.foo.__build__("GET"))
+        self.assertFalse(request.has_header("Authorization"))
+
+    def test_reactive(self):
+        ''' Tests that credentials are not sent up front by default '''
+        auth = AuthManager(("user", "pass"), "http://nope/")
+        self.assertNotIsInstance(auth.handler, PreemptiveBasicAuthHandler)
+        self.assertEqual(auth.credentials("http://nope/foo"),
+                         ("user", "pass"))
+
+    def test_manager(self):
+        ''' Tests that a password manager passed in is indexed
+        Its credentials are sent up front, the ones it held already as well
+        as the ones added to it afterwards.
+        '''
+        manager = urllib2.HTTPPasswordMgrWithDefaultRealm()
+        manager.add_password(None, "http://nope/api/", "user", "pass")
+        app = Restler("http://nope/api/", http_auth=manager,
+                      preemptive_auth=True)
+        self.assertEqual(app.__auth__.authorization("http://nope/api/foo"),
+                         "Basic dXNlcjpwYXNz")
+
+        manager.add_password(None, ["http://nope/admin"], "admin", "secret")
+        self.assertEqual(app.__auth__.credentials("http://nope/admin/x"),
+                         ("admin", "secret"))
+        self.assertIsNone(app.__auth__.authorization("http://nope/"))
@@ -1,5 +1,6 @@
 import unittest
-from restler import Restler
+import gc
+from restler import Restler, Route
 
 
 class TestBasic(unittest.TestCase):
@@ -57,3 +58,128 @@ class TestBasic(unittest.TestCase):
         '''
         test = self.app.users.test
         self.assertEqual(test, test["/users/test"])
+
+    def test_route_cache(self):
+        ''' Tests that the route cache is bounded
+        The least recently used routes are dropped once the cache is full,
+        routes with their own defaults and the base route are pinned, a
+        dropped route still in use is handed back and empty branches of the
+        lookup are pruned.
+        '''
+        app = Restler("http://127.0.0.1:9001", max_routes=2)
+        users = app.users
+        users.add_params(per_page=100)
+        held = app.repos["1"]
+        app.repos["2"]
+        app.repos["3"]
+        app.repos["4"]
+        self.assertIs(app.users, users)
+        self.assertIn("__route__", app._route.lookup)
+        self.assertNotIn("2", app._route.lookup["repos"])
+        self.assertNotIn("1", app._route.lookup["repos"])
+        self.assertIs(app.repos["1"], held)
+
+        app.repos["5"]
+        app.repos["6"]
+        held.add_params(type="owner")  # given settings after being dropped
+        del held
+        gc.collect()
+        self.assertEqual(app.repos["1"]._default_params, {"type": "owner"})
+
+        report = app._route.memory()
+        self.assertEqual(report["routes"], 5)
+        self.assertEqual(report["pinned"], 3)
+        self.assertEqual(report["evictions"], 6)
+        self.assertTrue(report["bytes"] > 0)
+
+    def test_route_cache_subclass(self):
+        ''' Tests that a route class with another default method is bounded
+        '''
+        class PostRoute(Route):
+            __slots__ = ()
+
+            def __init__(self, *args):
+                Route.__init__(self, *args)
+                self.default_method = "POST"
+
+        class PostRestler(Restler):
+            _route_class = PostRoute
+
+        app = PostRestler("http://127.0.0.1:9001", max_routes=2)
+        for uid in range(5):
+            app.users[str(uid)]
+        self.assertEqual(app._route.memory()["pinned"], 1)
+        self.assertEqual(app._route.memory()["routes"], 3)
+
+    def test_slots(self):
+        ''' Tests that routes do not carry a `__dict__`
+        Unknown attributes still build child routes and per route settings
+        stay on their own route.
+        '''
+        route = self.app.users
+        self.assertEqual(type(route).__dictoffset__, 0)
+        self.assertEqual(route.__dict__,
+                         "http://127.0.0.1:9001/users/__dict__")
+        route._default_headers = [("X-Test", "1")]
+        self.assertEqual(self.app.repos._default_headers, [])
+        self.assertEqual(self.app.users._default_headers, [("X-Test", "1")])
+
+    def test_url(self):
+        ''' Tests that URLs are immutable values
+        Extending a URL builds a new one (carrying over and merging the query)
+        and URLs compare and hash by their string form.
+        '''
+        from restler.url import URL
+
+        base = URL("http://127.0.0.1:9001/api?key=1")
+        users = base + "users?page=2"
+        self.assertEqual(str(base), "http://127.0.0.1:9001/api")
+        self.assertEqual(users.path, ("api", "users"))
+        self.assertEqual(users.query, {"key": "1", "page": "2"})
+        self.assertEqual(base.query, {"key": "1"})
+        self.assertEqual(hash(users), hash("http://127.0.0.1:9001/api/users"))
+        self.assertEqual(users, "http://127.0.0.1:9001/api/users")
+        self.assertRaises(AttributeError, setattr, users, "path", ())
+
+        filtered = base + "?page=3"
+        self.assertEqual(str(filtered), "http://127.0.0.1:9001/api")
+        self.assertEqual(filtered.query, {"key": "1", "page": "3"})
+        self.assertEqual(str(base.child([])), str(base))
+
+        socket = URL("unix:///tmp/app.sock", ["v1"]) + "info"
+        self.assertEqual(socket.path, ("v1", "info"))
+        self.assertEqual(URL("http://127.0.0.1:9001/api", None).path, ("api",))
+
+    def test_url_copy(self):
+        ''' Tests that URLs survive being copied and pickled
+        Copies are the URL itself, pickling builds an equal URL back up.
+        '''
+        import copy
+        import pickle
+        from restler.url import URL
+
+        for url in [URL("http://127.0.0.1:9001/api?key=1") + "users?page=2",
+                    URL("unix:///tmp/app.sock", ["v1"])]:
+            self.assertIs(copy.copy(url), url)
+            self.assertIs(copy.deepcopy({"url": url})["url"], url)
+            loaded = pickle.loads(pickle.dumps(url))
+            self.assertEqual(str(loaded), str(url))
+            self.assertEqual(loaded.path, url.path)
+            self.assertEqual(loaded.query, url.query)
+
+    def test_template(self):
+        ''' Tests that templates build the same routes as the attributes
+        Placeholders are filled in (and quoted) from the keyword arguments,
+        the other arguments are the params of the request.
+        '''
+        repos = self.app.template("/users/{user}/repos?per_page=5")
+        self.assertEqual(repos.route(user="jdost"), self.app.users.jdost.repos)
+        self.assertEqual(str(repos.url(user="a/b")),
+                         "http://127.0.0.1:9001/users/a%2Fb/repos")
+        self.assertRaises(KeyError, repos.route)
+        self.assertEqual(self.app.template("/").route(), self.app)
+
+        self.app.__test__ = True
+        request = repos(user="jdost", type="owner")
+        self.assertEqual(request.get_full_url(), "http://127.0.0.1:9001/users/"
+                         "jdost/repos?per_page=5&type=owner")
@@ -0,0 +1,66 @@
+import unittest
+import io
+import mmap
+import socket
+import tempfile
+from restler import Restler
+from restler.body import length, is_stream, send
+
+
+class TestBody(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/")
+        self.app.__test__ = True
+
+    def test_build(self):
+        ''' Tests that raw bodies are passed through without being copied
+        Bodies of a known size get a `Content-length`, the others are sent
+        chunked.
+        '''
+        payload = b"x" * 100
+        request = self.app.upload("POST", {}, payload)
+        self.assertIs(request.data, payload)
+        self.assertEqual(request.get_header("Content-length"), "100")
+        self.assertEqual(request.get_header("Content-type"),
+                         "application/octet-stream")
+
+        parts = (part for part in [b"a", b"b"])
+        request = self.app.upload("POST", parts)
+        self.assertIs(request.data, parts)
+        self.assertEqual(request.get_header("Transfer-encoding"), "chunked")
+
+    def test_length(self):
+        ''' Tests the size of the supported kinds of bodies '''
+        with tempfile.TemporaryFile() as upload:
+            upload.write(b"y" * 300)
+            upload.seek(100)
+            self.assertEqual(length(upload), 200)
+            self.assertTrue(is_stream(upload))
+
+            mapped = mmap.mmap(upload.fileno(), 0)
+            self.assertEqual(length(mapped), 300)
+            self.assertFalse(is_stream(mapped))
+            mapped.close()
+
+        self.assertEqual(length(memoryview(b"abc")[1:]), 2)
+        self.assertIsNone(length(io.BytesIO(b"abc")))
+        self.assertIsNone(length(iter([b"abc"])))
+
+    def test_send(self):
+        ''' Tests the bytes written to the socket
+        Chunked bodies are framed chunk by chunk (skipping empty ones) and end
+        with the empty chunk, files are sent from where they are positioned.
+        '''
+        sender, receiver = socket.socketpair()
+        self.addCleanup(sender.close)
+        self.addCleanup(receiver.close)
+
+        send(sender, iter([b"abc", b"", u"de"]), chunked=True)
+        self.assertEqual(receiver.recv(100),
+                         b"3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n")
+
+        with tempfile.TemporaryFile() as upload:
+            upload.write(b"0123456789")
+            upload.seek(4)
+            send(sender, upload)
+        self.assertEqual(receiver.recv(100), b"456789")
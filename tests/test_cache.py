@@ -0,0 +1,198 @@
+import unittest
+try:
+    import urllib2
+except ImportError:
+    import urllib.request as urllib2
+from restler import Restler, Response
+from restler.cache import ResponseCache
+from restler.utils import BufferedResponse, parse_headers
+
+
+class TestCache(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/", cache=2)
+        self.cache = self.app.__cache__
+        self.now = 1000.0
+        self.cache.clock = lambda: self.now
+        self.sent = []
+
+    def fetch(self, url, code=200, headers=None, body=b'{"a": 1}',
+              credentials=None, defaults=()):
+        request = urllib2.Request(url)
+
+        def send(request):
+            self.sent.append(request)
+            raw_headers = ["Content-Type: application/json"]
+            raw_headers += ["{}: {}".format(k, v)
+                            for k, v in (headers or {}).items()]
+            raw = "\r\n".join(raw_headers + ["", ""]).encode("ascii")
+            return BufferedResponse(url, code, parse_headers(raw), body)
+
+        return self.cache.fetch(request, send,
+                                lambda raw: Response(raw, self.app),
+                                credentials, defaults)
+
+    def test_max_age(self):
+        ''' Tests that a fresh response is served without a request
+        Within the `max-age` of the response, a response of its own is built
+        for each caller from the stored one and nothing sent.
+        '''
+        first = self.fetch("http://nope/a", headers={
+            "Cache-Control": "max-age=60"})
+        first.data["a"] = 2
+        second = self.fetch("http://nope/a")
+
+        self.assertIsNot(first, second)
+        self.assertEqual(second.data, {"a": 1})
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_revalidation(self):
+        ''' Tests that stale responses are revalidated with their validators
+        Once stale, the request should carry the `ETag` and a `304` should
+        return the cached response.
+        '''
+        first = self.fetch("http://nope/a", headers={"ETag": '"v1"'})
+        second = self.fetch("http://nope/a", code=304, body=b"")
+
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.sent[1].get_header("If-none-match"), '"v1"')
+        self.assertEqual(self.cache.stats["revalidations"], 1)
+
+    def test_revalidation_headers(self):
+        ''' Tests that the headers of a `304` refresh the stored response
+        Its new validator is sent next and its `max-age` makes the entry
+        fresh again.
+        '''
+        self.fetch("http://nope/a", headers={"ETag": '"v1"'})
+        response = self.fetch("http://nope/a", code=304, body=b"", headers={
+            "ETag": '"v2"', "Cache-Control": "max-age=60"})
+        self.assertEqual(response.headers["ETag"], '"v2"')
+        self.assertEqual(response.data, {"a": 1})
+
+        self.now += 30
+        self.fetch("http://nope/a")
+        self.assertEqual(len(self.sent), 2)
+        self.now += 60
+        self.fetch("http://nope/a", code=304, body=b"")
+        self.assertEqual(self.sent[2].get_header("If-none-match"), '"v2"')
+
+    def test_credentials(self):
+        ''' Tests that responses are not shared between credentials '''
+        headers = {"Cache-Control": "max-age=60"}
+        self.fetch("http://nope/a", headers=headers, credentials="Bearer 1")
+        self.fetch("http://nope/a", headers=headers, credentials="Bearer 2")
+        self.fetch("http://nope/a", credentials="Bearer 1")
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_vary(self):
+        ''' Tests that responses with a `Vary` header are served again
+        The key they are stored under is built from the headers sent, so a
+        request sending the same ones finds them and one sending others
+        does not.
+        '''
+        headers = {"Cache-Control": "max-age=60", "Vary": "Accept-Encoding"}
+        gzip = [("Accept-encoding", "gzip")]
+        self.fetch("http://nope/a", headers=headers, defaults=gzip)
+        self.fetch("http://nope/a", defaults=gzip)
+        self.fetch("http://nope/a", defaults=gzip)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.cache.stats["hits"], 2)
+
+        self.fetch("http://nope/a", headers=headers)
+        self.assertEqual(len(self.sent), 2)
+
+    def test_no_store(self):
+        ''' Tests that `no-store` responses are not kept '''
+        self.fetch("http://nope/a", headers={
+            "Cache-Control": "no-store, max-age=60"})
+        self.fetch("http://nope/a")
+
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual(self.cache.stats["entries"], 0)
+
+    def test_eviction(self):
+        ''' Tests the least recently used entry is evicted when full '''
+        for path in ["a", "b", "a", "c"]:
+            self.fetch("http://nope/" + path, headers={
+                "Cache-Control": "max-age=60"})
+
+        self.assertEqual(self.cache.stats["evictions"], 1)
+        self.fetch("http://nope/a")
+        self.fetch("http://nope/b", headers={"Cache-Control": "max-age=60"})
+        self.assertEqual([r.get_full_url() for r in self.sent],
+                         ["http://nope/a", "http://nope/b", "http://nope/c",
+                          "http://nope/b"])
+
+    def test_restler_option(self):
+        ''' Tests the `cache` option of `Restler` '''
+        self.assertIsNone(Restler("http://nope/").__cache__)
+        self.assertEqual(Restler("http://nope/", cache=True).__cache__.size,
+                         ResponseCache.DEFAULT_SIZE)
+
+
+class TestSQLiteCache(TestCache):
+    ''' Runs the cache tests against the on disk cache '''
+    def setUp(self):
+        import os
+        import tempfile
+        from restler.cache import SQLiteCache
+        handle, self.path = tempfile.mkstemp(suffix=".sqlite")
+        os.close(handle)
+        self.app = Restler("http://nope/", cache=self.path)
+        self.cache = self.app.__cache__
+        self.now = 1000.0
+        self.cache.clock = lambda: self.now
+        self.sent = []
+
+    def tearDown(self):
+        import os
+        for suffix in ["", "-wal", "-shm"]:
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_max_age(self):
+        ''' Tests that a fresh response is served from disk
+        Entries are rebuilt from the stored body rather than shared, but no
+        request should be sent.
+        '''
+        self.fetch("http://nope/a", headers={"Cache-Control": "max-age=60"})
+        second = self.fetch("http://nope/a")
+
+        self.assertEqual(second.data, {"a": 1})
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_revalidation(self):
+        ''' Tests that stale entries on disk are revalidated '''
+        self.fetch("http://nope/a", headers={"ETag": '"v1"'})
+        second = self.fetch("http://nope/a", code=304, body=b"")
+
+        self.assertEqual(second.data, {"a": 1})
+        self.assertEqual(self.sent[1].get_header("If-none-match"), '"v1"')
+
+    def test_eviction(self):
+        ''' Tests entries are evicted past the size limit and the TTL '''
+        self.cache.max_bytes = 16
+        for path in ["a", "b", "c"]:
+            self.fetch("http://nope/" + path, headers={
+                "Cache-Control": "max-age=60"})
+        self.assertEqual(self.cache.stats["entries"], 2)
+
+        self.cache.ttl = 30
+        self.now += 31
+        self.assertIsNone(self.cache.get(("GET", "http://nope/c")))
+
+    def test_shared(self):
+        ''' Tests that a second cache on the same file sees the entries
+        This is the case of another process (or a restart) using the cache.
+        '''
+        from restler.cache import SQLiteCache
+        self.fetch("http://nope/a", headers={"Cache-Control": "max-age=60"})
+
+        other = SQLiteCache(self.path)
+        other.clock = lambda: self.now
+        self.cache = other
+        self.assertEqual(self.fetch("http://nope/a").data, {"a": 1})
+        self.assertEqual(len(self.sent), 1)
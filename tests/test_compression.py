@@ -0,0 +1,62 @@
+import unittest
+import json
+import zlib
+from restler import Restler, Response
+from restler.compression import Decompressor, compress
+from restler.utils import BufferedResponse, parse_headers
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/")
+        self.body = json.dumps(list(range(2000))).encode("UTF-8")
+
+    def raw(self, body, encoding):
+        headers = parse_headers("Content-Type: application/json\r\n"
+                                "Content-Encoding: {}\r\n".format(encoding)
+                                .encode("UTF-8"))
+        return BufferedResponse("http://nope/", 200, headers, body)
+
+    def test_gzip(self):
+        ''' Tests that a gzipped body is decoded before it is converted '''
+        response = Response(self.raw(compress(self.body), "gzip"), self.app)
+        self.assertEqual(response.data, list(range(2000)))
+
+    def test_deflate(self):
+        ''' Tests that both zlib wrapped and raw deflate bodies are decoded '''
+        wrapped = zlib.compress(self.body)
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+        bare = compressor.compress(self.body) + compressor.flush()
+        for body in (wrapped, bare):
+            reader = Decompressor(self.raw(body, "deflate"), "deflate")
+            self.assertEqual(reader.read(), self.body)
+
+    def test_incremental(self):
+        ''' Tests that small reads never return more than asked for
+        Reading in small pieces should hand back the whole body and iterating
+        a compressed stream should yield every element.
+        '''
+        reader = Decompressor(self.raw(compress(self.body), "gzip"), "gzip")
+        chunks = []
+        chunk = reader.read(100)
+        while chunk:
+            self.assertTrue(len(chunk) <= 100)
+            chunks.append(chunk)
+            chunk = reader.read(100)
+        self.assertEqual(b"".join(chunks), self.body)
+
+        response = Response(self.raw(compress(self.body), "gzip"), self.app,
+                            stream=True)
+        self.assertEqual(list(response.iter_items(chunk_size=64)),
+                         list(range(2000)))
+
+    def test_request_body(self):
+        ''' Tests that large request bodies are gzipped when enabled '''
+        app = Restler("http://nope/", compress_requests=64)
+        app.__test__ = True
+        small = app.users("POST", foo="bar")
+        large = app.users("POST", foo="bar" * 100)
+        self.assertFalse(small.has_header("Content-encoding"))
+        self.assertEqual(large.get_header("Content-encoding"), "gzip")
+        self.assertEqual(zlib.decompress(bytes(large.data), 31),
+                         b"foo=" + b"bar" * 100)
@@ -0,0 +1,70 @@
+import socket
+import threading
+import unittest
+from restler import Restler
+from restler.url import ConcurrencyLimiter
+from restler.url.concurrency import QueueFullError
+
+
+class TestConcurrencyLimiter(unittest.TestCase):
+    def setUp(self):
+        self.limiter = ConcurrencyLimiter(initial=2, max_queue=1, max_wait=5)
+
+    def test_limit(self):
+        ''' Tests that the requests in flight are capped per host
+        Requests over the limit wait in line, once the line is full they are
+        rejected and other hosts are not affected.
+        '''
+        self.limiter.acquire("a")
+        self.limiter.acquire("a")
+        waiting = threading.Thread(target=self.limiter.acquire, args=("a",))
+        waiting.start()
+        while not self.limiter.stats["a"]["queued"]:
+            waiting.join(0.01)
+
+        self.assertRaises(QueueFullError, self.limiter.acquire, "a")
+        self.limiter.acquire("b")
+        self.assertEqual(self.limiter.stats["a"],
+                         {"limit": 2, "in_flight": 2, "queued": 1})
+
+        self.limiter.release("a")
+        waiting.join(1)
+        self.assertFalse(waiting.is_alive())
+        self.assertEqual(self.limiter.stats["a"],
+                         {"limit": 2, "in_flight": 2, "queued": 0})
+
+    def test_max_wait(self):
+        ''' Tests that a request gives up on waiting after its time is up '''
+        self.limiter.acquire("a")
+        self.limiter.acquire("a")
+        self.assertRaises(socket.timeout, self.limiter.acquire, "a", 0.01)
+        self.assertEqual(self.limiter.stats["a"]["queued"], 0)
+
+    def test_aimd(self):
+        ''' Tests that the limit adapts to how the host is doing
+        The limit grows while it is fully used and responses are fast, and is
+        cut when a request fails or takes much longer than the baseline.
+        '''
+        for _ in range(4):
+            self.limiter.acquire("a")
+            self.limiter.acquire("a")
+            self.limiter.release("a", 0.1)
+            self.limiter.release("a", 0.1)
+        self.assertEqual(self.limiter.stats["a"]["limit"], 3)
+
+        self.limiter.acquire("a")
+        self.limiter.release("a", 1.0)
+        self.assertEqual(self.limiter.stats["a"]["limit"], 2)
+        for _ in range(10):
+            self.limiter.acquire("a")
+            self.limiter.release("a", failed=True)
+        self.assertEqual(self.limiter.stats["a"]["limit"], 1)
+
+    def test_option(self):
+        ''' Tests that the limiter is installed in the connection handler '''
+        app = Restler("http://nope/", concurrency_limit=4)
+        handlers = [handler for handler in app.__opener__.handlers
+                    if getattr(handler, "limiter", None) is not None]
+        self.assertEqual(len(handlers), 1)
+        self.assertIs(handlers[0].limiter, app.__concurrency__)
+        self.assertEqual(app.__concurrency__.initial, 4)
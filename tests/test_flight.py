@@ -0,0 +1,72 @@
+import unittest
+import threading
+from restler import Restler
+from restler.utils import BufferedResponse, parse_headers
+
+
+class TestFlight(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/", coalesce=True)
+        self.opener = OpenerTest()
+        self.app.__opener__ = self.opener
+
+    def call(self, route, results, *args, **kwargs):
+        try:
+            results.append(route(*args, **kwargs))
+        except Exception as err:
+            results.append(err)
+
+    def run_concurrently(self, count, *args, **kwargs):
+        results = []
+        threads = [threading.Thread(target=self.call,
+                                    args=(self.app.config, results) + args,
+                                    kwargs=kwargs)
+                   for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        self.opener.entered.wait(1)
+        self.opener.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesce(self):
+        ''' Tests that identical concurrent requests share one request
+        Every caller should get the same response while only one request is
+        sent out.
+        '''
+        results = self.run_concurrently(5)
+
+        self.assertEqual(len(self.opener.requests), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(results[0].data, {"ok": True})
+        self.assertEqual(self.app.__flights__.stats["coalesced"], 4)
+
+    def test_unsafe_methods(self):
+        ''' Tests that non idempotent requests are never coalesced '''
+        self.opener.release.set()
+        self.app.config("POST")
+        self.app.config("POST")
+        self.assertEqual(len(self.opener.requests), 2)
+
+
+# Helper classes
+
+
+class OpenerTest(object):
+    ''' Object meant to mimic the `urllib2` opener, blocks requests until
+    `release` is set so they overlap
+    '''
+    def __init__(self):
+        self.requests = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+
+    def open(self, request):
+        ''' Records the request and answers with a small JSON body '''
+        self.requests.append(request)
+        self.entered.set()
+        self.release.wait(1)
+        headers = parse_headers(b"Content-Type: application/json\r\n\r\n")
+        return BufferedResponse(request.get_full_url(), 200, headers,
+                                b'{"ok": true}')
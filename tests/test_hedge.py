@@ -0,0 +1,118 @@
+import unittest
+import threading
+from restler import Restler
+from restler.hedge import Hedge
+from restler.utils import BufferedResponse, parse_headers
+
+
+class TestHedge(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/")
+        self.app.__test__ = True
+
+    def test_learned_delay(self):
+        ''' Tests that the delay is learned from the route's latencies
+        No delay should be given before enough samples are in, then the
+        configured percentile of the recent ones.
+        '''
+        hedge = Hedge(percentile=90, window=10, min_samples=5)
+        for latency in range(4):
+            hedge.record("route", latency)
+        self.assertIsNone(hedge.delay("route"))
+        for latency in range(4, 20):
+            hedge.record("route", latency)
+        self.assertEqual(hedge.delay("route"), 19)
+        self.assertEqual(Hedge(delay=0.5).delay("route"), 0.5)
+
+    def test_hedged(self):
+        ''' Tests that a stalled request is raced by a second one
+        The second request should win and the first one be closed once it
+        finally comes back.
+        '''
+        hedge = Hedge(delay=0.05)
+        sender = Sender()
+        response = hedge.call("route", self.app.users(), sender)
+        self.assertIs(response, sender.responses[1])
+        sender.release.set()
+        sender.done.wait(1)
+        self.assertTrue(sender.responses[0].closed)
+        self.assertEqual(hedge.stats["route"], {
+            "requests": 1, "hedged": 1, "hedge_wins": 1, "hedge_rate": 1.0})
+
+    def test_not_hedged(self):
+        ''' Tests that fast and non idempotent requests are sent once '''
+        hedge = Hedge(delay=1)
+        sender = Sender()
+        sender.release.set()
+        hedge.call("route", self.app.users(), sender)
+        hedge.call("route", self.app.users("POST"), sender)
+        self.assertEqual(len(sender.responses), 2)
+        self.assertEqual(hedge.stats["route"]["hedged"], 0)
+        self.assertEqual(hedge.stats["route"]["requests"], 1)
+
+    def test_busy_workers(self):
+        ''' Tests that requests are sent without a hedge once the workers
+        are busy, instead of waiting for one or starting more
+        '''
+        hedge = Hedge(delay=0.05, workers=1)
+        sender = Sender()
+        threading.Timer(0.2, sender.release.set).start()
+        response = hedge.call("route", self.app.users(), sender)
+        self.assertIs(response, sender.responses[0])
+        self.assertEqual(len(sender.responses), 1)
+        self.assertEqual(hedge.stats["route"]["hedged"], 0)
+
+        hedge.call("route", self.app.users(), sender)
+        self.assertEqual(len(sender.responses), 2)
+
+    def test_routes(self):
+        ''' Tests that only the most recently used routes are tracked and
+        that the `key` function can group routes together
+        '''
+        hedge = Hedge(max_routes=2, min_samples=2,
+                      key=lambda url: url.rsplit("/", 1)[0])
+        sender = Sender()
+        sender.release.set()
+        for user in ["1", "2", "3"]:
+            hedge.call("http://nope/users/" + user, self.app.users[user](),
+                       sender)
+        self.assertEqual(hedge.stats["http://nope/users"]["requests"], 3)
+        self.assertEqual(hedge.delay("http://nope/users"),
+                         max(hedge._latencies["http://nope/users"]))
+
+        for path in ["a/1", "b/1", "c/1"]:
+            hedge.record(path.split("/")[0], 0.1)
+        self.assertEqual(list(hedge._latencies), ["b", "c"])
+
+
+# Helper classes
+
+
+class Sender(object):
+    ''' Stands in for sending a request, the first request blocks until
+    `release` is set while the others return right away
+    '''
+    def __init__(self):
+        self.responses = []
+        self.release = threading.Event()
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, request):
+        response = ClosableResponse(request.get_full_url(), 200,
+                                    parse_headers(b""), b"")
+        with self._lock:
+            self.responses.append(response)
+            first = len(self.responses) == 1
+        if first:
+            self.release.wait(1)
+            threading.Timer(0.05, self.done.set).start()
+        return response
+
+
+class ClosableResponse(BufferedResponse):
+    ''' Response that remembers being closed '''
+    closed = False
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,51 @@
+import unittest
+from restler import Restler
+from restler.limiter import RateLimiter, quota
+from restler.utils import parse_headers
+
+
+class TestLimiter(unittest.TestCase):
+    def setUp(self):
+        self.now = 100.0
+        self.limiter = RateLimiter(rate=10)
+        self.limiter.clock = lambda: self.now
+
+    def test_spacing(self):
+        ''' Tests that requests are spread out evenly at the rate
+        Back to back requests each wait one more interval, after the requests
+        are spaced out by themselves none of them waits.
+        '''
+        waits = [self.limiter.reserve() for _ in range(3)]
+        self.assertEqual([round(w, 3) for w in waits], [0, 0.1, 0.2])
+        self.now += 1
+        self.assertEqual(self.limiter.reserve(), 0)
+
+    def test_burst(self):
+        ''' Tests that a burst lets that many requests out at once '''
+        self.limiter.burst = 3
+        waits = [self.limiter.reserve() for _ in range(4)]
+        self.assertEqual([round(w, 3) for w in waits], [0, 0, 0, 0.1])
+
+    def test_tuning(self):
+        ''' Tests that the limiter follows the reported quota
+        The remaining requests should be spread over the rest of the window
+        and nothing should go out once there are none left.
+        '''
+        self.limiter.update(20, 10)
+        self.assertEqual(self.limiter.rate, 2)
+        self.limiter.update(0, 30)
+        self.assertEqual(round(self.limiter.reserve(), 3), 30)
+
+        headers = parse_headers(b"X-RateLimit-Remaining: 5\r\n"
+                                b"X-RateLimit-Reset: 1500000060\r\n")
+        self.assertEqual(quota(headers, now=1500000000), (5, 60))
+        self.assertIsNone(quota(parse_headers(b"")))
+
+    def test_subtree(self):
+        ''' Tests that a route's limiter covers the routes under it '''
+        app = Restler("http://nope/", rate_limit=5)
+        limiter = app.search.rate_limit(1)
+        self.assertIs(app.search.__limiter__(), limiter)
+        self.assertIs(app.search.code.__limiter__(), limiter)
+        self.assertIs(app.users.__limiter__(), app.__limiter__)
+        self.assertEqual(app.__limiter__.rate, 5)
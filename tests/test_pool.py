@@ -0,0 +1,90 @@
+import socket
+import unittest
+from restler import Restler
+from restler.url import ConnectionPool
+from restler.url.pool import still_open
+
+
+class TestPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(size=1)
+        self.key = ("http", "127.0.0.1")
+
+    def test_counters(self):
+        ''' Tests the hit and miss counters of the pool
+        The first checkout for a host is a miss, checking out a released
+        connection is a hit.
+        '''
+        conn, reused = self.pool.acquire(self.key, ConnectionTest)
+        self.assertFalse(reused)
+        self.pool.release(self.key, conn)
+
+        again, reused = self.pool.acquire(self.key, ConnectionTest)
+        self.assertTrue(reused)
+        self.assertIs(again, conn)
+        self.assertEqual(self.pool.stats,
+                         {"hits": 1, "misses": 1, "idle": 0})
+
+    def test_size(self):
+        ''' Tests that the pool does not keep more than `size` connections
+        Releasing more connections than the pool holds should close the extra
+        ones instead of keeping them idle.
+        '''
+        first, _ = self.pool.acquire(self.key, ConnectionTest)
+        second, _ = self.pool.acquire(self.key, ConnectionTest)
+        self.pool.release(self.key, first)
+        self.pool.release(self.key, second)
+
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+        self.assertEqual(self.pool.stats["idle"], 1)
+
+    def test_usable(self):
+        ''' Tests that idle connections closed by the server are skipped
+        When checked with `still_open`, a connection whose socket reached its
+        end is closed and a new one built instead.
+        '''
+        conn = ConnectionTest()
+        conn.sock, server = socket.socketpair()
+        self.pool.release(self.key, conn)
+        again, reused = self.pool.acquire(self.key, ConnectionTest,
+                                          still_open)
+        self.assertIs(again, conn)
+        self.assertTrue(reused)
+
+        self.pool.release(self.key, conn)
+        server.close()
+        again, reused = self.pool.acquire(self.key, ConnectionTest,
+                                          still_open)
+        self.assertIsNot(again, conn)
+        self.assertFalse(reused)
+        self.assertTrue(conn.closed)
+        self.assertEqual(self.pool.stats,
+                         {"hits": 1, "misses": 1, "idle": 0})
+
+    def test_restler_option(self):
+        ''' Tests the `keep_alive` option of `Restler`
+        A pool should only be set up when asked for, with the requested size
+        '''
+        self.assertIsNone(Restler("http://nope/").__pool__)
+        self.assertEqual(Restler("http://nope/", keep_alive=3).__pool__.size,
+                         3)
+        self.assertIs(Restler("http://nope/", keep_alive=self.pool).__pool__,
+                      self.pool)
+
+
+# Helper classes
+
+
+class ConnectionTest(object):
+    ''' Object meant to mimic an open `httplib.HTTPConnection` '''
+    def __init__(self):
+        self.sock = object()
+        self.closed = False
+
+    def close(self):
+        ''' Drops the socket '''
+        if isinstance(self.sock, socket.socket):
+            self.sock.close()
+        self.sock = None
+        self.closed = True
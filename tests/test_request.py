@@ -1,6 +1,6 @@
 import unittest
 import json
-from restler import Restler
+from restler import Restler, core
 
 
 def normalize(s):
@@ -107,3 +107,109 @@ class TestRequest(unittest.TestCase):
         route.params.add_params(foo="bar")
         self.assertDictEqual(self.app.reusable.params._default_params,
                              {"foo": "bar"})
+
+    def test_gather(self):
+        ''' Tests that a batch of calls builds requests in submission order
+        Mixes the accepted call forms and checks each request is built for the
+        right route, method and params.
+        '''
+        requests = list(self.app.gather([
+            self.app.users,
+            "/groups",
+            (self.app.users.test, "POST", {"foo": "bar"}),
+        ], workers=2))
+
+        self.assertEqual(requests[0].get_full_url(), "http://127.0.0.1/users")
+        self.assertEqual(requests[1].get_full_url(), "http://127.0.0.1/groups")
+        self.assertEqual(requests[2].get_method(), "POST")
+        self.assertEqual(normalize(requests[2].data), "foo=bar")
+
+    def test_gather_window(self):
+        ''' Tests that a batch is taken from the calls as it is consumed
+        Only a couple of calls per worker are submitted ahead of the results,
+        with or without a thread pool, and the results keep their order.
+        '''
+        pulled = []
+
+        def calls(count):
+            for uid in range(count):
+                pulled.append(uid)
+                yield self.app.users[str(uid)]
+
+        results = self.app.gather(calls(100), workers=2)
+        next(results)
+        self.assertLessEqual(len(pulled), 4)
+        urls = [request.get_full_url() for request in results]
+        self.assertEqual(len(urls), 99)
+        self.assertEqual(urls[-1], "http://127.0.0.1/users/99")
+
+        self.addCleanup(setattr, core, "ThreadPoolExecutor",
+                        core.ThreadPoolExecutor)
+        core.ThreadPoolExecutor = None
+        del pulled[:]
+        results = self.app.gather(calls(10), ordered=False)
+        self.assertEqual(next(results)[0], 0)
+        self.assertEqual(len(pulled), 1)
+
+    def test_map(self):
+        ''' Tests fanning a route out over path suffixes
+        Every suffix should become a request for the matching child route
+        '''
+        requests = list(self.app.users.map(range(3), method="DELETE"))
+        self.assertEqual([r.get_full_url() for r in requests],
+                         ["http://127.0.0.1/users/0",
+                          "http://127.0.0.1/users/1",
+                          "http://127.0.0.1/users/2"])
+        self.assertEqual(requests[0].get_method(), "DELETE")
+
+    def test_paginate(self):
+        ''' Tests that paginating in test mode builds the first page '''
+        request = self.app.users.paginate(params={"page": "2"},
+                                          concurrency=4)
+        self.assertEqual(request.get_full_url(),
+                         "http://127.0.0.1/users?page=2")
+
+    def test_follow(self):
+        ''' Tests resolving the links between pages into routes
+        Links are resolved in full, a path outside of the base still gives a
+        route and a link to another host ends the paging.
+        '''
+        from restler.paging import Paginator
+        from restler.route import Route
+
+        app = Restler("http://127.0.0.1/api")
+        pages = Paginator(app.items)
+        route, params = pages.follow("/api/items?page=2")
+        self.assertIs(route, app.items)
+        self.assertEqual(params, {"page": "2"})
+
+        route, params = pages.follow("?page=3")
+        self.assertIs(route, app.items)
+        self.assertEqual(params, {"page": "3"})
+
+        route, _ = pages.follow("http://127.0.0.1/v2/items")
+        self.assertIsInstance(route, Route)
+        self.assertEqual(str(route), "http://127.0.0.1/v2/items")
+
+        self.assertEqual(pages.follow("https://127.0.0.1/api/items"),
+                         (None, {}))
+        self.assertEqual(pages.follow("http://other.host/api/items"),
+                         (None, {}))
+
+    def test_prepare(self):
+        ''' Tests that a prepared request is sent as a fresh copy each time
+        The overrides apply to that send only and the prepared request keeps
+        its encoded body and headers.
+        '''
+        prepared = self.app.users.prepare("POST", {"Accept": "text/plain"},
+                                          user="test", _timeout=5)
+        self.assertEqual(prepared.data, b"user=test")
+
+        request = prepared(headers={"If-None-Match": "abc"}, timeout=1)
+        self.assertIsNot(request, prepared.request)
+        self.assertEqual(request.get_method(), "POST")
+        self.assertEqual(request.get_header("If-none-match"), "abc")
+        self.assertEqual(request.timeouts.read, 1)
+        self.assertNotIn("If-none-match", prepared.headers)
+        self.assertEqual(prepared.headers["Accept"], "text/plain")
+        self.assertEqual(prepared().timeouts.read, 5)
@@ -1,5 +1,7 @@
 import unittest
 from restler import Restler, Route, Response, RequestError, ServerError
+from restler.handlers.json_handler import iterparse
+import io
 import json
 
 
@@ -142,6 +144,183 @@ class TestResponse(unittest.TestCase):
             ResponseTest(
                 200, {"Content-Type": "application/json"}, json.dumps(params))
 
+    def test_date_threads(self):
+        ''' Tests that dates parse correctly from concurrent threads
+        Datatype detection should not keep shared state, so responses parsed
+        at the same time in different threads must not mix up their values.
+        '''
+        from threading import Thread
+        results = []
+
+        def parse():
+            for i in range(200):
+                params = {"date": "12/24/99", "dates": ["01/02/03"]}
+                r = ResponseTest(
+                    200, {"Content-Type": "application/json"},
+                    json.dumps(params))
+                results.append(Response(r, self.app).data)
+
+        threads = [Thread(target=parse) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for data in results:
+            self.assertEqual(data["date"].strftime("%Y%m%d"), "19991224")
+            self.assertEqual(data["dates"][0].strftime("%Y%m%d"), "20030102")
+
+    def test_datatype_context(self):
+        ''' Tests that a contextual detector hands its match to the handler
+        The value returned by the detection function should be passed on to
+        the handling function.
+        '''
+        Response.add_datatype(
+            lambda response, value: value.startswith("#") and value[1:],
+            lambda response, value, match: int(match), contextual=True)
+        try:
+            r = ResponseTest(
+                200, {"Content-Type": "application/json"}, "{\"n\":\"#42\"}")
+            self.assertEqual(Response(r, self.app).data["n"], 42)
+        finally:
+            Response.datatypes.pop()
+
+    def test_date_register(self):
+        ''' Tests that date formats registered later are picked up
+        The combined datatype matcher must be rebuilt when a new date format
+        is registered after responses have already been parsed.
+        '''
+        from restler.handlers.date_handler import DateHandler
+        params = {"date": "1999-12-24"}
+        r = ResponseTest(
+            200, {"Content-Type": "application/json"}, json.dumps(params))
+        self.assertEqual(Response(r, self.app).data["date"], "1999-12-24")
+
+        DateHandler.register("[0-9]{4}-[0-9]{2}-[0-9]{2}$", "%Y-%m-%d")
+        try:
+            r = ResponseTest(
+                200, {"Content-Type": "application/json"}, json.dumps(params))
+            response = Response(r, self.app)
+            self.assertEqual(response.data["date"].strftime("%Y%m%d"),
+                             "19991224")
+        finally:
+            DateHandler.types.pop()
+
+    def test_datatype_patterns(self):
+        ''' Tests datatypes registered with patterns instead of detection
+        The context of the matching pattern should be handed to the handler
+        and the detector never called.
+        '''
+        def detector(response, value):
+            raise AssertionError("detector should not be called")
+
+        Response.add_datatype(
+            detector, lambda response, value, base: int(value[2:], base),
+            contextual=True, patterns=[("0x[0-9a-f]+$", 16), ("0b[01]+$", 2)])
+        try:
+            params = {"hex": "0xff", "bin": "0b11", "other": "0xzz"}
+            r = ResponseTest(
+                200, {"Content-Type": "application/json"}, json.dumps(params))
+            response = Response(r, self.app)
+            self.assertEqual(response.data,
+                             {"hex": 255, "bin": 3, "other": "0xzz"})
+        finally:
+            Response.datatypes.pop()
+
+    def test_lazy(self):
+        ''' Tests that lazy parsing only converts values that are read
+        With `LAZY_PARSING` on, values should stay raw until accessed and be
+        converted (and kept) once they are.
+        '''
+        from datetime import datetime
+        self.app.LAZY_PARSING = True
+        params = {"user": {"url": "/users/1", "dates": ["12/24/99"]},
+                  "date": "12/24/99"}
+        r = ResponseTest(
+            200, {"Content-Type": "application/json"}, json.dumps(params))
+        response = Response(r, self.app)
+
+        self.assertTrue(isinstance(response.data, dict))
+        self.assertEqual(dict.__getitem__(response.data, "date"), "12/24/99")
+        self.assertTrue(isinstance(response.date, datetime))
+        self.assertIs(dict.__getitem__(response.data, "date"), response.date)
+
+        user = response.user
+        self.assertTrue(isinstance(user["url"], Route))
+        self.assertTrue(isinstance(user["dates"][0], datetime))
+        self.assertTrue(isinstance(list(user["dates"])[0], datetime))
+        self.assertEqual(user.get("missing", 1), 1)
+
+    def test_lazy_matches_eager(self):
+        ''' Tests that lazy data reads the same as the eagerly parsed data
+        Every way of getting at the values (accessors, copies, comparisons
+        and serializing) should see the converted ones.
+        '''
+        params = {"user": {"url": "/users/1",
+                           "dates": ["12/24/99", "01/01/00"]},
+                  "date": "12/24/99", "count": 2}
+
+        def parse(lazy):
+            self.app.LAZY_PARSING = lazy
+            r = ResponseTest(200, {"Content-Type": "application/json"},
+                             json.dumps(params))
+            return Response(r, self.app).data
+
+        eager = parse(False)
+        reads = [
+            lambda data: sorted(data.items()),
+            lambda data: list(data["user"].values()),
+            lambda data: data.get("date"),
+            lambda data: dict(data),
+            lambda data: dict(**data),
+            lambda data: data["user"]["dates"] + [],
+            lambda data: [] + data["user"]["dates"],
+            lambda data: data["user"]["dates"] * 2,
+            lambda data: data["user"]["dates"][1:],
+            lambda data: data["user"]["dates"].index(
+                eager["user"]["dates"][1]),
+            lambda data: eager["user"]["dates"][0] in data["user"]["dates"],
+            lambda data: json.dumps(data, default=str, sort_keys=True),
+        ]
+        for read in reads:
+            self.assertEqual(repr(read(parse(True))), repr(read(eager)))
+        self.assertEqual(parse(True), eager)
+        self.assertEqual(eager, parse(True))
+
+    def test_iter_items(self):
+        ''' Tests streaming the elements of an array out of the body
+        The elements of a nested array should come out one at a time, read in
+        small chunks and converted by the datatype handlers.
+        '''
+        params = {"meta": {"skip": [1, {"a": "]"}]},
+                  "items": [{"url": "/test"}, "12/24/99", 12345, "\u00e9"]}
+        r = StreamTest(200, {"Content-Type": "application/json"},
+                       json.dumps(params))
+        response = Response(r, self.app, stream=True)
+
+        items = list(response.iter_items(path="items", chunk_size=3))
+        self.assertEqual(len(items), 4)
+        self.assertTrue(isinstance(items[0]["url"], Route))
+        self.assertEqual(items[1].strftime("%Y%m%d"), "19991224")
+        self.assertEqual(items[2], 12345)
+        self.assertEqual(items[3], u"\u00e9")
+
+        r = StreamTest(200, {"Content-Type": "application/json"}, "[]")
+        self.assertEqual(
+            list(Response(r, self.app, stream=True).iter_items()), [])
+
+    def test_iter_numbers(self):
+        ''' Tests streaming numbers cut off at every chunk boundary
+        A number ending the buffer, or cut after its `.` or `e`, should be
+        read on until it is complete.
+        '''
+        body = b'[12.5, 3, -1.5e-3, 2E+10, 0.25]'
+        for chunk_size in range(1, len(body) + 1):
+            items = list(iterparse(io.BytesIO(body), chunk_size=chunk_size))
+            self.assertEqual(items, [12.5, 3, -1.5e-3, 2E+10, 0.25])
+        self.assertRaises(ValueError, list,
+                          iterparse(io.BytesIO(b'[12.]'), chunk_size=2))
+
     def test_errors(self):
         ''' Tests that errors are raised for status codes
         Errors should be raised for URL error responses (4xx and 5xx)
@@ -209,3 +388,15 @@ class ResponseTest(object):
     def geturl(self):
         ''' URL getter '''
         return self.__url
+
+
+class StreamTest(ResponseTest):
+    ''' `ResponseTest` with a body that is consumed as it is read '''
+    def __init__(self, code, headers, data, url=''):
+        ResponseTest.__init__(self, code, headers, data, url)
+        from io import BytesIO
+        self.__body = BytesIO(data.encode("UTF-8"))
+
+    def read(self, size=-1):
+        ''' Body reader, file-like object '''
+        return self.__body.read(size)
@@ -0,0 +1,74 @@
+import unittest
+from restler import Restler, InvalidURLError
+from restler.retry import Retry, RetryBudget, retry_after
+from restler.utils import BufferedResponse, parse_headers
+
+
+class TestRetry(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/")
+        self.app.__test__ = True
+        self.retry = Retry(total=3, backoff=1, max_backoff=5)
+        self.retry.random = lambda: 1.0
+        self.delays = []
+        self.retry.sleep = self.delays.append
+
+    def test_backoff(self):
+        ''' Tests the exponential backoff and the Retry-After override '''
+        self.assertEqual([self.retry.delay(n) for n in range(4)],
+                         [1, 2, 4, 5])
+        headers = parse_headers(b"Retry-After: 3\r\n")
+        self.assertEqual(self.retry.delay(0, headers), 3)
+        headers = parse_headers(b"Retry-After: 3600\r\n")
+        self.assertIsNone(self.retry.delay(0, headers))
+        self.assertEqual(retry_after("Wed, 21 Oct 2015 07:28:00 GMT",
+                                     now=1445412470), 10)
+
+    def test_statuses(self):
+        ''' Tests that only transient failures are retried
+        Retryable statuses should be resent until they succeed while other
+        errors and non idempotent methods are returned as they are.
+        '''
+        codes = [503, 429, 200]
+        result = self.retry.call(self.app.users(), Sender(codes))
+        self.assertEqual(result.getcode(), 200)
+        self.assertEqual(self.delays, [1, 2])
+
+        result = self.retry.call(self.app.users(), Sender([404, 200]))
+        self.assertEqual(result.getcode(), 404)
+        result = self.retry.call(self.app.users("POST"), Sender([503, 200]))
+        self.assertEqual(result.getcode(), 503)
+
+    def test_connection_errors(self):
+        ''' Tests that failing to connect is retried up to the total '''
+        self.assertRaises(InvalidURLError, self.retry.call, self.app.users(),
+                          Sender([None] * 5))
+        self.assertEqual(len(self.delays), 3)
+
+    def test_budget(self):
+        ''' Tests that retries stop once the budget is spent
+        With no allowance per request, only the reserve can be retried.
+        '''
+        self.retry.budget = RetryBudget(ratio=0, reserve=2)
+        result = self.retry.call(self.app.users(), Sender([503] * 5))
+        self.assertEqual(result.getcode(), 503)
+        self.assertEqual(self.retry.budget.stats["retries"], 2)
+        self.assertEqual(self.retry.budget.stats["rejected"], 1)
+
+
+# Helper classes
+
+
+class Sender(object):
+    ''' Stands in for sending a request, answers with the given codes in
+    order, `None` failing to connect
+    '''
+    def __init__(self, codes):
+        self.codes = list(codes)
+
+    def __call__(self, request):
+        code = self.codes.pop(0)
+        if code is None:
+            raise InvalidURLError()
+        return BufferedResponse(request.get_full_url(), code,
+                                parse_headers(b""), b"")
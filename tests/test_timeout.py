@@ -0,0 +1,49 @@
+import unittest
+import socket
+from restler import Restler, Timeout, Deadline
+from restler.timeout import limits
+
+
+class TestTimeout(unittest.TestCase):
+    def setUp(self):
+        self.app = Restler("http://nope/", timeout=(1, 5))
+        self.app.__test__ = True
+
+    def test_coerce(self):
+        ''' Tests the accepted forms of a timeout '''
+        self.assertEqual(Timeout.coerce(3), Timeout(3, 3))
+        self.assertEqual(Timeout.coerce((1, 2)), Timeout(1, 2))
+        self.assertIsNone(Timeout.coerce(None))
+        self.assertRaises(TypeError, Timeout.coerce, "30")
+        self.assertRaises(TypeError, Timeout.coerce, (1, 2, 3))
+        self.assertRaises(TypeError, self.app.users, _timeout="30")
+
+    def test_request_limits(self):
+        ''' Tests that timeouts are taken off of the call, not sent
+        The call's own timeout should win over the `Restler` one and neither
+        should end up in the params.
+        '''
+        request = self.app.users(foo="bar")
+        self.assertEqual(request.timeouts, Timeout(1, 5))
+        self.assertEqual(limits(request), (1, 5))
+
+        request = self.app.users(_timeout=2, foo="bar")
+        self.assertEqual(limits(request), (2, 2))
+        self.assertNotIn("timeout", request.get_full_url())
+
+    def test_param_names(self):
+        ''' Tests that params named like the time limits are still sent '''
+        request = self.app.jobs(timeout="30", deadline="tomorrow")
+        self.assertIn("timeout=30", request.get_full_url())
+        self.assertIn("deadline=tomorrow", request.get_full_url())
+        self.assertEqual(request.timeouts, Timeout(1, 5))
+        self.assertIsNone(request.deadline)
+
+    def test_deadline(self):
+        ''' Tests that a deadline caps the limits by what is left of it '''
+        request = self.app.users(_deadline=Deadline(0.5))
+        connect, read = limits(request)
+        self.assertTrue(0 < connect <= 0.5 and 0 < read <= 0.5)
+
+        request = self.app.users(_deadline=Deadline(-1))
+        self.assertRaises(socket.timeout, limits, request)
@@ -0,0 +1,101 @@
+import unittest
+import io
+import threading
+try:
+    import urllib2
+except ImportError:
+    import urllib.request as urllib2
+from restler.url import TokenProvider
+
+
+class TestToken(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000
+        self.fetched = []
+        self.provider = TokenProvider(self.fetch, margin=10)
+        self.provider.clock = lambda: self.now
+
+    def fetch(self):
+        self.fetched.append(self.now)
+        return "token{}".format(len(self.fetched)), 100
+
+    def wait(self):
+        worker = self.provider._worker
+        if worker:
+            worker.join(1)
+
+    def test_cached(self):
+        ''' Tests that the token is fetched once and reused until expiry '''
+        self.assertEqual(self.provider.token(), "token1")
+        self.now += 50
+        self.assertEqual(self.provider.token(), "token1")
+        self.assertEqual(len(self.fetched), 1)
+        self.assertEqual(self.provider.header("token1"), "Bearer token1")
+
+    def test_background_refresh(self):
+        ''' Tests that a token about to expire is renewed in the background
+        The current token should keep being handed out while the new one is
+        fetched and the new one used afterwards.
+        '''
+        self.provider.token()
+        self.now += 95
+        self.assertEqual(self.provider.token(), "token1")
+        self.wait()
+        self.assertEqual(self.provider.token(), "token2")
+        self.assertEqual(self.fetched, [1000, 1095])
+
+    def test_expired(self):
+        ''' Tests that an expired token is renewed in line '''
+        self.provider.token()
+        self.now += 200
+        self.assertEqual(self.provider.token(), "token2")
+
+    def test_refresh_once(self):
+        ''' Tests that a rejected token is only renewed once
+        Concurrent callers refreshing the same stale token should share the
+        renewal.
+        '''
+        stale = self.provider.token()
+        threads = [threading.Thread(target=self.provider.refresh,
+                                    args=(stale,)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.fetched), 2)
+        self.assertEqual(self.provider.token(), "token2")
+
+    def test_handler(self):
+        ''' Tests that every send of a request is authorized on its own
+        A request sent again gets the current token and can be retried after
+        a `401` again, only the retry itself is not retried.
+        '''
+        handler = self.provider.handler
+        opened = []
+
+        class Opener(object):
+            def open(self, request, timeout=None):
+                opened.append(request)
+                return request
+
+        handler.parent = Opener()
+        request = urllib2.Request("http://nope/")
+        request.timeout = None
+        handler.http_request(request)
+        self.assertEqual(request.get_header("Authorization"), "Bearer token1")
+
+        retry = handler.http_error_401(request, io.BytesIO(), 401, "", {})
+        self.assertIsNot(retry, request)
+        self.assertEqual(retry.get_header("Authorization"), "Bearer token2")
+        self.assertIsNone(
+            handler.http_error_401(retry, io.BytesIO(), 401, "", {}))
+
+        handler.http_request(request)  # sent again, i.e. by a retry policy
+        self.assertEqual(request.get_header("Authorization"), "Bearer token2")
+        handler.http_error_401(request, io.BytesIO(), 401, "", {})
+        self.assertEqual(len(opened), 2)
+
+        own = urllib2.Request("http://nope/",
+                              headers={"Authorization": "Basic abc"})
+        handler.http_request(own)
+        self.assertEqual(own.get_header("Authorization"), "Basic abc")